@@ -0,0 +1,722 @@
+"""
+Asyncio variant of the pipeline client. AsyncTapisPipelineClient implements the same discovery, validation,
+submission, polling and metadata operations as TapisPipelineClient, but calls the Tapis REST APIs directly with an
+async HTTP client (httpx) using keep-alive connections (and HTTP/2 when the h2 package is installed), so that one
+process can overlap many small API calls -- within one pipeline and across many pipelines -- without threads. All
+requests made through a client are bounded by a semaphore, which can be shared between clients.
+
+A cycle follows the same rules as the blocking client's: it uses the same local state (outbox fingerprint, held
+manifests, jobs in flight and their poll schedule; see core.state) and the same write-ahead journal (see core.journal),
+so that manifests are only submitted once their inputs have settled, interrupted work is recovered and jobs are only
+polled when due. Outputs are not delivered to the remote inbox by this client: the completion of a job is journaled as
+an output transfer intent before its terminal status is recorded, and the next run of the blocking client
+(core.pipelines.main) recovers the transfer from the journal and delivers the outputs. Pipelines run with this client
+therefore also need the blocking client to run, e.g., on a slower timer; the two must not run the same pipeline at the
+same time, as they do not lock the local state or the journal. Configs using features this client does not support
+are rejected when the client is created; see AsyncTapisPipelineClient.
+
+Requires httpx: pip install httpx (or "httpx[http2]" for HTTP/2 support).
+"""
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
+from core import errors
+from core.config import Config, parse_pipeline_config, parse_manifest_bytes
+from core.indexes import PIPELINE_INDEXES, get_missing_indexes
+from core.journal import Journal, CLAIM, SUBMIT, STATUS_UPDATE, TRANSFER
+from core.meta import MetadataHelper, is_duplicate_key_error
+from core.pipelines import TapisPipelineClient, CompletedJob, Manifest, META_ERROR_STATUS_KEY, \
+    META_WAITING_STATUS_KEY, ORPHAN_JOB_SEARCH_LIMIT, TAPIS_PIPELINE_MANIFEST_FILENAME_PREFIX, TERMINAL_JOB_STATES, \
+    UNSUBMITTED_STATUSES, WAITING_FOR_INPUTS_STATUS
+from core.settling import DEFAULT_MAX_PENDING_MINUTES, DEFAULT_SETTLE_SECONDS
+from core.state import PipelineState
+
+# default number of Tapis requests a client (or group of clients sharing a semaphore) may have in flight at once
+DEFAULT_MAX_CONCURRENCY = 100
+
+
+def get_http_client(max_concurrency=DEFAULT_MAX_CONCURRENCY):
+    """
+    Returns an httpx.AsyncClient with keep-alive connections, using HTTP/2 if the h2 package is available. The same
+    client can be passed to any number of AsyncTapisPipelineClient objects.
+    """
+    if httpx is None:
+        raise errors.UnexpectedRuntimeError("The httpx package is required for the async pipeline client; "
+                                            "install it with: pip install httpx")
+    limits = httpx.Limits(max_connections=max_concurrency, max_keepalive_connections=max_concurrency)
+    try:
+        return httpx.AsyncClient(http2=True, limits=limits, timeout=60)
+    except ImportError:
+        return httpx.AsyncClient(limits=limits, timeout=60)
+
+
+class AsyncTapisClient(object):
+    """
+    Minimal async client for the Tapis API calls made by the pipelines software.
+    """
+
+    def __init__(self, base_url, http_client, semaphore, access_token=None):
+        self.base_url = base_url.rstrip('/')
+        self.http_client = http_client
+        self.semaphore = semaphore
+        self.access_token = access_token
+
+    async def request(self, method, path, raw=False, **kwargs):
+        """
+        Make a request to the Tapis API at /v3/<path>.
+        :param raw: If True, return the response body as bytes; otherwise return the parsed JSON, unwrapped from
+        the "result" attribute of Tapis responses when present.
+        """
+        headers = {'X-Tapis-Token': self.access_token} if self.access_token else {}
+        async with self.semaphore:
+            response = await self.http_client.request(method, f'{self.base_url}/v3/{path}', headers=headers,
+                                                      **kwargs)
+        response.raise_for_status()
+        if raw:
+            return response.content
+        if not response.content:
+            return None
+        data = response.json()
+        if isinstance(data, dict) and 'result' in data:
+            return data['result']
+        return data
+
+    async def get_tokens(self, username, password):
+        result = await self.request('POST', 'oauth2/tokens', json={'username': username,
+                                                                   'password': password,
+                                                                   'grant_type': 'password'})
+        self.access_token = result['access_token']['access_token']
+
+    # meta --
+
+    async def list_collection_names(self, db):
+        return await self.request('GET', f'meta/{db}')
+
+    async def create_collection(self, db, collection):
+        return await self.request('PUT', f'meta/{db}/{collection}')
+
+    async def list_indexes(self, db, collection):
+        return await self.request('GET', f'meta/{db}/{collection}/_indexes')
+
+    async def create_index(self, db, collection, index_name, request_body):
+        return await self.request('PUT', f'meta/{db}/{collection}/_indexes/{index_name}', json=request_body)
+
+    async def list_documents(self, db, collection, filter, pagesize=100):
+        return await self.request('GET', f'meta/{db}/{collection}', params={'filter': json.dumps(filter),
+                                                                            'pagesize': pagesize})
+
+    async def create_document(self, db, collection, request_body):
+        return await self.request('POST', f'meta/{db}/{collection}', json=request_body)
+
+    async def modify_document(self, db, collection, doc_id, request_body):
+        return await self.request('PATCH', f'meta/{db}/{collection}/{doc_id}', json=request_body)
+
+    # files --
+
+    async def list_files(self, system_id, path):
+        return [Config(f) for f in await self.request('GET', f'files/ops/{system_id}/{path.lstrip("/")}')]
+
+    async def get_contents(self, system_id, path):
+        return await self.request('GET', f'files/content/{system_id}/{path.lstrip("/")}', raw=True)
+
+    # apps and jobs --
+
+    async def get_app(self, app_id, app_version):
+        return await self.request('GET', f'apps/{app_id}/{app_version}')
+
+    async def submit_job(self, job):
+        return Config(await self.request('POST', 'jobs/submit', json=job))
+
+    async def get_job(self, job_uuid):
+        return Config(await self.request('GET', f'jobs/{job_uuid}'))
+
+    async def get_job_list(self, limit, order_by):
+        return [Config(j) for j in await self.request('GET', 'jobs/list', params={'limit': limit,
+                                                                                 'orderBy': order_by})]
+
+
+class AsyncMetadataHelper(MetadataHelper):
+    """
+    MetadataHelper whose create(), get() and update() are coroutines using an AsyncTapisClient.
+    """
+
+    async def create(self):
+        if await self.get():
+            self.logger.info('Metadata record already exists for {}, not creating another.'.format(self.job_name))
+            return False
+        try:
+            await self.tapis_client.create_document(db=self.db,
+                                                    collection=self.collection,
+                                                    request_body=self.get_new_tapis_meta_obj())
+        except Exception as e:
+            if is_duplicate_key_error(e):
+                self.logger.info('Metadata record already exists for {}: {}'.format(self.job_name, e))
+                return False
+            raise
+        self.logger.info('Created metadata record for {}.'.format(self.job_name))
+        return True
+
+    async def get(self):
+        try:
+            return (await self.tapis_client.list_documents(db=self.db,
+                                                           collection=self.collection,
+                                                           filter={'name': self.job_name}))[0]
+        except Exception as e:
+            print(e)
+            return None
+
+    async def update(self, statuskey, additional_info={}):
+        '''
+        Set a new status on the metadata for this job_name, moving the previous status to the history.
+        Returns True if the Tapis call succeeded.
+        '''
+        metadata = await self.get()
+        if not metadata:
+            return False
+        prev_history = metadata['history'] or []
+        prev_history.append({"status": metadata["status"],
+                             "update_time": metadata["last_update_time"],
+                             "additional_info": metadata["additional_info"]})
+        request_body = self.get_tapis_meta_obj(status_key=statuskey,
+                                               additional_info=additional_info,
+                                               history=prev_history,
+                                               set_create_time=False)
+        try:
+            await self.tapis_client.modify_document(db=self.db,
+                                                    collection=self.collection,
+                                                    doc_id=metadata['_id']['$oid'],
+                                                    request_body=request_body)
+        except Exception as e:
+            print(e)
+            return False
+        return True
+
+
+class AsyncTapisPipelineClient(object):
+    """
+    Asyncio variant of TapisPipelineClient. Create instances with the create() coroutine, which also checks the
+    meta collection and the pipeline app. Local remote outboxes, actor pipeline jobs, the 'archive' input staging
+    mode, fan-out and the result cache are not supported; configs using them are rejected with a PipelineConfigError.
+    """
+
+    # configuration parsing, job descriptions, input settling and poll scheduling are shared with the blocking client
+    parse_tapis_credentials = TapisPipelineClient.parse_tapis_credentials
+    parse_remote_outbox_config = TapisPipelineClient.parse_remote_outbox_config
+    parse_remote_inbox_config = TapisPipelineClient.parse_remote_inbox_config
+    parse_remote_box_config = TapisPipelineClient.parse_remote_box_config
+    parse_pipeline_job_config = TapisPipelineClient.parse_pipeline_job_config
+    get_remote_id_from_manifest_name = TapisPipelineClient.get_remote_id_from_manifest_name
+    get_tapis_job_dict_for_manifest = TapisPipelineClient.get_tapis_job_dict_for_manifest
+    get_input_staging_dir = TapisPipelineClient.get_input_staging_dir
+    observe_input = TapisPipelineClient.observe_input
+    record_poll = TapisPipelineClient.record_poll
+    filter_orphan_jobs = staticmethod(TapisPipelineClient.filter_orphan_jobs)
+
+    def __init__(self, config_path=None, http_client=None, semaphore=None):
+        """
+        :param config_path: Path to the pipeline config; defaults to TAPIS_PIPELINES_CONFIG_FILE_PATH.
+        :param http_client: An httpx.AsyncClient to use; e.g., one shared by many pipelines (see get_http_client()).
+        :param semaphore: An asyncio.Semaphore bounding the number of concurrent Tapis requests; share one semaphore
+        between clients to bound requests across pipelines.
+        """
+        self.config_path = config_path or os.environ.get('TAPIS_PIPELINES_CONFIG_FILE_PATH',
+                                                         '/etc/tapis/pipeline_config.json')
+        self.config = parse_pipeline_config(self.config_path)
+        self.name = self.config.pipeline_name
+        self.check_supported_config()
+        self.parse_tapis_credentials()
+        self._owns_http_client = http_client is None
+        self.tapis_client = AsyncTapisClient(base_url=self.tapis_base_url,
+                                             http_client=http_client or get_http_client(),
+                                             semaphore=semaphore or asyncio.Semaphore(DEFAULT_MAX_CONCURRENCY),
+                                             access_token=self.access_token)
+        self._tapis_meta_db = self.config.tapis_config.get('meta_db', 'pipelines')
+        default_meta_collection = f'{self.tapis_username}.{self.name}'
+        self._tapis_meta_collection = self.config.tapis_config.get('meta_collection', default_meta_collection)
+        # the local state and the journal are shared with the blocking client; see TapisPipelineClient
+        state_dir = self.config.get('local_state_dir', tempfile.gettempdir())
+        self.state = PipelineState(state_dir=state_dir, pipeline_name=self.name)
+        self.journal = Journal(state_dir=state_dir, pipeline_name=self.name)
+        settling_config = self.config.get('input_settling', {})
+        self.settle_seconds = settling_config.get('settle_seconds', DEFAULT_SETTLE_SECONDS)
+        self.max_pending_minutes = settling_config.get('max_pending_minutes', DEFAULT_MAX_PENDING_MINUTES)
+        self.remote_outbox = self.parse_remote_outbox_config()
+        # outputs are delivered by the blocking client; see the module docstring
+        self.remote_inbox = self.parse_remote_inbox_config()
+        self.pipeline_job = self.parse_pipeline_job_config(check_app=False)
+
+    def check_supported_config(self):
+        """
+        Check that the pipeline config only uses features supported by the async client, before anything else is
+        set up.
+        :raises: PipelineConfigError listing the unsupported features.
+        """
+        unsupported = []
+        if self.config.get('result_cache', {}).get('enabled', False):
+            unsupported.append("the result cache (result_cache.enabled)")
+        if not self.config.remote_outbox.get('kind') == 'tapis':
+            unsupported.append(f"remote_outbox of kind '{self.config.remote_outbox.get('kind')}' (only 'tapis' is "
+                               f"supported)")
+        app_job = self.config.pipeline_job.get('tapis_app_job')
+        if not app_job:
+            unsupported.append("pipeline jobs other than tapis_app_job")
+        else:
+            if app_job.get('input_staging') == 'archive':
+                unsupported.append("input_staging 'archive'")
+            if app_job.get('fan_out'):
+                unsupported.append("fan_out")
+        if unsupported:
+            msg = f"The async pipeline client does not support: {'; '.join(unsupported)}. Run pipeline " \
+                  f"{self.name} with the blocking client (core.pipelines) instead."
+            print(msg)
+            raise errors.PipelineConfigError(msg)
+
+    @classmethod
+    async def create(cls, config_path=None, http_client=None, semaphore=None):
+        """
+        Create a client and check its setup: get a token if using a password, make sure the meta collection exists
+        and check access to the pipeline app.
+        """
+        client = cls(config_path=config_path, http_client=http_client, semaphore=semaphore)
+        await client.setup()
+        return client
+
+    async def setup(self):
+        if not self.access_token:
+            try:
+                await self.tapis_client.get_tokens(self.tapis_username, self.tapis_password)
+            except Exception as e:
+                raise errors.PipelineConfigFormatError(f"Failed to get a Tapis token using a password. "
+                                                       f"Exception: {e}")
+        try:
+            collections = await self.tapis_client.list_collection_names(db=self._tapis_meta_db)
+        except Exception as e:
+            msg = f'Got exception trying to list collections on db: {self._tapis_meta_db}. ' \
+                  f'Does user {self.tapis_username} have access to the db in the Meta API? Exception: {e}'
+            print(msg)
+            raise errors.PipelineConfigError(msg)
+        if self._tapis_meta_collection not in collections:
+            try:
+                await self.tapis_client.create_collection(db=self._tapis_meta_db,
+                                                          collection=self._tapis_meta_collection)
+            except Exception as e:
+                msg = f'Collection {self._tapis_meta_collection} did not exist and got error trying to created it. ' \
+                      f'Exception: {e}'
+                print(msg)
+                raise errors.PipelineConfigError(msg)
+        await self.ensure_indexes()
+        try:
+            tapis_app = await self.tapis_client.get_app(self.pipeline_job.app_id, self.pipeline_job.app_version)
+        except Exception as e:
+            msg = f"Got exception trying to check access to Tapis app with id: {self.pipeline_job.app_id}; " \
+                  f"version: {self.pipeline_job.app_version}; e: {e}"
+            print(msg)
+            raise errors.PipelineConfigError(msg)
+        inputs = tapis_app['jobAttributes']['fileInputs']
+        if not any(inp.get('meta', {}).get('name') == self.pipeline_job.manifest_input_name for inp in inputs):
+            msg = f"Did not find an input with mame {self.pipeline_job.manifest_input_name}. Found the following " \
+                  f"inputs:\n{inputs}.\nDouble-check your pipeline config."
+            print(msg)
+            raise errors.PipelineConfigError(msg)
+
+    async def ensure_indexes(self):
+        """
+        Create the PIPELINE_INDEXES missing from the metadata collection; see core.indexes.
+        """
+        try:
+            existing_indexes = await self.tapis_client.list_indexes(db=self._tapis_meta_db,
+                                                                    collection=self._tapis_meta_collection)
+        except Exception as e:
+            print(f"Got exception trying to list the indexes on collection {self._tapis_meta_collection}; e: {e}")
+            return
+        if isinstance(existing_indexes, dict):
+            existing_indexes = existing_indexes.get('_embedded', [])
+        for name in get_missing_indexes(existing_indexes, PIPELINE_INDEXES):
+            try:
+                await self.tapis_client.create_index(db=self._tapis_meta_db,
+                                                     collection=self._tapis_meta_collection,
+                                                     index_name=name,
+                                                     request_body=PIPELINE_INDEXES[name])
+            except Exception as e:
+                print(f"Got exception trying to create index {name} on collection {self._tapis_meta_collection}; "
+                      f"e: {e}")
+
+    async def close(self):
+        if self._owns_http_client:
+            await self.tapis_client.http_client.aclose()
+
+    def get_meta_helper(self, remote_id):
+        return AsyncMetadataHelper(tapis_client=self.tapis_client,
+                                   db=self._tapis_meta_db,
+                                   collection=self._tapis_meta_collection,
+                                   job_name=remote_id)
+
+    async def record_status(self, remote_id, statuskey, additional_info={}):
+        """
+        Update the status in the metadata for remote_id, journaling the update; see
+        TapisPipelineClient.record_status().
+        :return: bool -- True if the metadata was updated.
+        """
+        self.journal.intent(STATUS_UPDATE, remote_id, statuskey=statuskey, info=additional_info)
+        try:
+            updated = await self.get_meta_helper(remote_id).update(statuskey=statuskey, additional_info=additional_info)
+        except Exception as e:
+            print(f"Got exception trying to update the metadata for {remote_id} to {statuskey}; e: {e}")
+            updated = False
+        if updated:
+            self.journal.done(STATUS_UPDATE, remote_id, statuskey=statuskey)
+        return updated
+
+    async def check_for_new_manifest_files(self):
+        """
+        Look for new manifest files in the remote outbox and claim them in metadata, concurrently. As with the
+        blocking client, discovery is skipped when the outbox listing looks the same as in the last cycle.
+        :return: List of file objects representing manifest files that are new since the last time the pipeline
+        software ran.
+        """
+        try:
+            file_list = await self.tapis_client.list_files(self.remote_outbox.system_id, self.remote_outbox.path)
+        except Exception as e:
+            print(f"Got exception from Tapis trying to list files on remote outbox; e: {e}")
+            return []
+        fingerprint = PipelineState.get_outbox_fingerprint(file_list)
+        if self.state.outbox_unchanged(fingerprint):
+            print("No changes in the remote outbox since the last cycle; skipping manifest discovery.")
+            return []
+        manifest_files = [f for f in file_list if f.name.startswith(TAPIS_PIPELINE_MANIFEST_FILENAME_PREFIX)]
+        claimed = await asyncio.gather(*[self.claim_manifest_file(f) for f in manifest_files])
+        # the outbox is scanned again by the next cycle if a manifest could not be claimed
+        if None not in claimed:
+            self.state.set_outbox_fingerprint(fingerprint)
+        return [f for f, is_new in zip(manifest_files, claimed) if is_new]
+
+    async def claim_manifest_file(self, manifest_file):
+        """
+        Claim a manifest file by creating its metadata record, journaling the claim.
+        :return: True if the manifest was claimed, False if it was already claimed and None if the claim failed.
+        """
+        remote_id = self.get_remote_id_from_manifest_name(manifest_file.name)
+        m = self.get_meta_helper(remote_id)
+        if await m.get():
+            return False
+        self.journal.intent(CLAIM, remote_id, name=manifest_file.name, path=manifest_file.path,
+                            uri=manifest_file.get('uri'))
+        try:
+            created = await m.create()
+        except Exception as e:
+            print(f"Got exception trying to create the metadata record for manifest {manifest_file.name}; e: {e}")
+            self.journal.abort(CLAIM, remote_id)
+            return None
+        if created:
+            self.journal.done(CLAIM, remote_id)
+        else:
+            self.journal.abort(CLAIM, remote_id)
+        return created
+
+    async def get_pending_manifest_files(self):
+        """
+        Returns the manifest files held in the waiting_for_inputs status by earlier cycles, to be validated again;
+        see TapisPipelineClient.get_pending_manifest_files().
+        """
+        pending = self.state.get_pending_manifests()
+        if pending is None or pending:
+            try:
+                jobs = await self.get_all_remote_job_ids(statuses=[WAITING_FOR_INPUTS_STATUS], raise_on_error=True)
+            except Exception:
+                return []
+            self.state.set_pending_manifests(jobs)
+            pending = self.state.get_pending_manifests()
+        return [Config(record['manifest_file']) for record in pending.values()]
+
+    async def validate_manifest(self, manifest_file):
+        """
+        Determines if a manifest file is valid and its inputs are ready; see TapisPipelineClient.validate_manifest().
+        The input files are checked concurrently.
+        :return: A Manifest, or False if the manifest file was invalid or was held until its inputs are ready.
+        """
+        remote_id = self.get_remote_id_from_manifest_name(manifest_file.name)
+        try:
+            manifest = parse_manifest_bytes(await self.tapis_client.get_contents(self.remote_outbox.system_id,
+                                                                                  manifest_file.path))
+        except Exception as e:
+            msg = f"Got exception trying to retrieve or deserialize the manifest file {manifest_file}; Exception: {e}"
+            print(msg)
+            return await self.hold_manifest(manifest_file, reason=msg)
+        now = time.time()
+        previous_inputs = (self.state.get_pending_manifest(remote_id) or {}).get('inputs', {})
+        listings = await asyncio.gather(*[self.tapis_client.list_files(self.remote_outbox.system_id, f['file_path'])
+                                          for f in manifest['files']], return_exceptions=True)
+        inputs = {}
+        unsettled = []
+        for f, listing in zip(manifest['files'], listings):
+            path = f['file_path']
+            if isinstance(listing, Exception):
+                msg = f'Error checking file at path: {path} in manifest file: {manifest_file.path}; ' \
+                      f'exception: {listing}'
+                print(msg)
+                return await self.hold_manifest(manifest_file, reason=msg, inputs=previous_inputs)
+            if not listing:
+                msg = f'File at path: {path} in manifest file: {manifest_file.path} was not found'
+                print(msg)
+                return await self.hold_manifest(manifest_file, reason=msg, inputs=previous_inputs)
+            inputs[path], settled = self.observe_input(f, listing[0], previous_inputs.get(path, {}), now)
+            if not settled:
+                unsettled.append(path)
+        if unsettled:
+            msg = f"Inputs of manifest file {manifest_file.path} are still being uploaded: {unsettled}"
+            print(msg)
+            return await self.hold_manifest(manifest_file, reason=msg, inputs=inputs)
+        self.state.remove_pending_manifest(remote_id)
+        return Manifest(pipeline_name=self.name,
+                        file_path=manifest_file.path,
+                        remote_id=remote_id,
+                        tapis_url=manifest_file.get('uri'),
+                        inputs=manifest.files)
+
+    async def hold_manifest(self, manifest_file, reason, inputs=None):
+        """
+        Hold a manifest whose inputs are not ready in the waiting_for_inputs status, or set it to ERROR once it has
+        waited for more than max_pending_minutes; see TapisPipelineClient.hold_manifest().
+        :return: False, so that callers can return the result of validate_manifest().
+        """
+        remote_id = self.get_remote_id_from_manifest_name(manifest_file.name)
+        m = self.get_meta_helper(remote_id)
+        now = time.time()
+        record = self.state.get_pending_manifest(remote_id)
+        if record is None:
+            record = {'manifest_file': {'name': manifest_file.name, 'path': manifest_file.path,
+                                        'uri': manifest_file.get('uri')},
+                      'since': now}
+            await m.update(statuskey=META_WAITING_STATUS_KEY,
+                           additional_info={"manifest_file": record['manifest_file'], "debug_data": reason})
+        elif now - record['since'] > self.max_pending_minutes * 60:
+            msg = f"Gave up waiting for the inputs of manifest {manifest_file.path} after " \
+                  f"{self.max_pending_minutes} minutes; {reason}"
+            print(msg)
+            await m.update(statuskey=META_ERROR_STATUS_KEY, additional_info={"debug_data": msg})
+            self.state.remove_pending_manifest(remote_id)
+            return False
+        record['inputs'] = inputs if inputs is not None else record.get('inputs', {})
+        record['reason'] = reason
+        self.state.set_pending_manifest(remote_id, record)
+        return False
+
+    async def submit_job_for_manifest(self, manifest):
+        """
+        Submit a new pipeline job for a manifest object and record it in the metadata, journaling the submission.
+        """
+        job = self.get_tapis_job_dict_for_manifest(manifest)
+        self.journal.intent(SUBMIT, manifest.remote_id, job_names=[job['name']], app_id=job['appId'])
+        try:
+            job_response = await self.tapis_client.submit_job(job)
+        except Exception as e:
+            msg = f"Got exception trying to submit Tapis job for pipeline job manifest: {manifest}; e: {e}"
+            print(msg)
+            await self.get_meta_helper(remote_id=manifest.remote_id).update(statuskey=META_ERROR_STATUS_KEY,
+                                                                            additional_info={"debug_data": msg})
+            self.journal.abort(SUBMIT, manifest.remote_id)
+            return None
+        info = {"kind": "tapis_job",
+                "tapis_job_uuid": job_response.uuid,
+                "tapis_job_status": job_response.status}
+        self.journal.done(SUBMIT, manifest.remote_id, info=info)
+        await self.record_status(manifest.remote_id, statuskey='JOB_SUBMITTED_TO_TAPIS', additional_info=info)
+        self.state.add_in_flight_job(name=manifest.remote_id, additional_info=info)
+        return job_response
+
+    async def get_all_remote_job_ids(self, statuses=[], raise_on_error=False):
+        """
+        Read the metadata records for all jobs with status in statuses.
+        :param raise_on_error: Whether to raise the exception when a query fails instead of returning partial results.
+        """
+        results = await asyncio.gather(*[self.tapis_client.list_documents(db=self._tapis_meta_db,
+                                                                          collection=self._tapis_meta_collection,
+                                                                          filter={'status': s})
+                                         for s in statuses], return_exceptions=True)
+        jobs = []
+        for s, result in zip(statuses, results):
+            if isinstance(result, Exception):
+                print(f"Got exception trying to query Tapis job for jobs in status: {s}; e: {result}")
+                if raise_on_error:
+                    raise result
+                continue
+            jobs.extend(result)
+        return jobs
+
+    async def check_for_completed_pipeline_job(self, job, now):
+        """
+        Poll the Tapis job for one in-flight pipeline job, updating the metadata if it reached a terminal state and
+        scheduling its next poll otherwise (see TapisPipelineClient.schedule_next_poll()).
+        :return: The Tapis job if it completed, otherwise None.
+        """
+        job_uuid = job['additional_info']['tapis_job_uuid']
+        try:
+            tapis_job = await self.tapis_client.get_job(job_uuid)
+        except Exception as e:
+            print(f"Got exception trying to look up job in Tapis for job: {job_uuid}; e: {e}")
+            return None
+        if tapis_job.status in TERMINAL_JOB_STATES:
+            # journaled before the terminal status is recorded so that the blocking client delivers the outputs
+            if self.remote_inbox:
+                completed_job = CompletedJob(remote_id=job['name'], tapis_job=tapis_job)
+                self.journal.intent(TRANSFER, completed_job.transfer_key, tapis_job_uuid=completed_job.uuid,
+                                    remote_id=completed_job.remote_id, output_dir=completed_job.output_dir,
+                                    status=completed_job.status, attempt=completed_job.transfer_attempt)
+            await self.record_status(job['name'], statuskey=tapis_job.status)
+            self.state.remove_in_flight_job(name=job['name'])
+            return tapis_job
+        info = self.record_poll(job, tapis_job, now)
+        if info:
+            await self.get_meta_helper(remote_id=job['name']).update(statuskey='JOB_SUBMITTED_TO_TAPIS',
+                                                                     additional_info=info)
+        return None
+
+    async def check_for_completed_pipeline_jobs(self):
+        """
+        Poll the in-flight pipeline jobs whose next poll is due, concurrently.
+        :return: a list of the Tapis jobs that have just completed.
+        """
+        jobs = self.state.get_in_flight_jobs()
+        if jobs is None:
+            try:
+                jobs = await self.get_all_remote_job_ids(statuses=["JOB_SUBMITTED_TO_TAPIS"], raise_on_error=True)
+            except Exception:
+                return []
+            self.state.set_in_flight_jobs(jobs)
+        now = time.time()
+        due_jobs = [job for job in jobs if self.state.is_poll_due(job['name'], now)]
+        results = await asyncio.gather(*[self.check_for_completed_pipeline_job(job, now) for job in due_jobs])
+        return [tapis_job for tapis_job in results if tapis_job]
+
+    async def find_orphan_jobs(self, job_names, app_id, since):
+        """
+        Search the most recently created Tapis jobs for jobs whose submission was interrupted before their uuid was
+        recorded; see TapisPipelineClient.find_orphan_jobs().
+        :return: list of Tapis job summaries, or None if the search failed.
+        """
+        try:
+            tapis_jobs = await self.tapis_client.get_job_list(limit=ORPHAN_JOB_SEARCH_LIMIT, order_by='created(desc)')
+        except Exception as e:
+            print(f"Got exception trying to list Tapis jobs to look for orphaned submissions; e: {e}")
+            return None
+        return self.filter_orphan_jobs(tapis_jobs, job_names, app_id, since)
+
+    async def recover_from_journal(self):
+        """
+        Replays the journal and recovers the work interrupted by a previous run; see
+        TapisPipelineClient.recover_from_journal(). Output transfers are left for the blocking client.
+        """
+        unfinished = self.journal.get_unfinished()
+        if not unfinished:
+            return
+        self.state.invalidate_in_flight_jobs()
+        for key, entry in unfinished.items():
+            if entry['op'] == TRANSFER:
+                continue
+            print(f"Recovering interrupted {entry['op']} ({entry['phase']}) for {key}.")
+            m = self.get_meta_helper(remote_id=key)
+            metadata = await m.get()
+            if not metadata:
+                self.journal.abort(entry['op'], key)
+                continue
+            if entry['op'] == STATUS_UPDATE:
+                if metadata['status'] == m.STATUS[entry['statuskey']]:
+                    self.journal.done(STATUS_UPDATE, key, statuskey=entry['statuskey'])
+                else:
+                    await self.record_status(key, statuskey=entry['statuskey'], additional_info=entry.get('info', {}))
+                continue
+            if entry['op'] == SUBMIT and entry['phase'] == 'done':
+                self.state.remove_pending_manifest(key)
+                await self.record_status(key, statuskey='JOB_SUBMITTED_TO_TAPIS', additional_info=entry['info'])
+                continue
+            if entry['op'] == SUBMIT:
+                if metadata['status'] not in UNSUBMITTED_STATUSES:
+                    self.state.remove_pending_manifest(key)
+                    self.journal.abort(SUBMIT, key)
+                    continue
+                orphans = await self.find_orphan_jobs(entry['job_names'], entry['app_id'], entry['ts'])
+                if orphans is None:
+                    continue
+                if orphans:
+                    info = {"kind": "tapis_job",
+                            "tapis_job_uuid": orphans[0].uuid,
+                            "tapis_job_status": orphans[0].status,
+                            "recovered": True}
+                    self.state.remove_pending_manifest(key)
+                    self.journal.done(SUBMIT, key, info=info)
+                    await self.record_status(key, statuskey='JOB_SUBMITTED_TO_TAPIS', additional_info=info)
+                    continue
+            elif metadata['status'] not in UNSUBMITTED_STATUSES or metadata['status'] == WAITING_FOR_INPUTS_STATUS:
+                self.journal.abort(entry['op'], key)
+                continue
+            await self.process_manifest_file(Config(name=entry['name'], path=entry['path'], uri=entry.get('uri')))
+
+    async def process_manifest_file(self, manifest_file):
+        manifest = await self.validate_manifest(manifest_file)
+        if manifest:
+            await self.submit_job_for_manifest(manifest)
+        else:
+            self.journal.abort(CLAIM, self.get_remote_id_from_manifest_name(manifest_file.name))
+
+    async def run_cycle(self):
+        """
+        Run one cycle of the pipeline, as core.pipelines.main() does: recover the work interrupted by a previous run,
+        discover, validate and submit new manifests and the manifests held by earlier cycles, then poll the in-flight
+        jobs that are due. The local state is saved at the end of the cycle.
+        :return: a list of the Tapis jobs that have just completed.
+        """
+        await self.recover_from_journal()
+        pending_manifest_files = await self.get_pending_manifest_files()
+        new_manifest_files = await self.check_for_new_manifest_files()
+        await asyncio.gather(*[self.process_manifest_file(f) for f in pending_manifest_files + new_manifest_files])
+        completed_jobs = await self.check_for_completed_pipeline_jobs()
+        self.journal.compact()
+        self.state.save()
+        return completed_jobs
+
+
+async def run_pipelines(config_paths, max_concurrency=DEFAULT_MAX_CONCURRENCY):
+    """
+    Run one cycle of each pipeline in config_paths concurrently, sharing one HTTP client and one semaphore.
+    :return: dict mapping each config path to its completed Tapis jobs, or to the exception raised for it.
+    """
+    http_client = get_http_client(max_concurrency)
+    semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def run_one(path):
+        client = await AsyncTapisPipelineClient.create(config_path=path, http_client=http_client,
+                                                       semaphore=semaphore)
+        return await client.run_cycle()
+
+    try:
+        results = await asyncio.gather(*[run_one(path) for path in config_paths], return_exceptions=True)
+    finally:
+        await http_client.aclose()
+    return dict(zip(config_paths, results))
+
+
+def main():
+    """
+    Run one cycle of every pipeline whose config path is given on the command line, or of the pipeline at
+    TAPIS_PIPELINES_CONFIG_FILE_PATH when none are given.
+    """
+    config_paths = sys.argv[1:] or [os.environ.get('TAPIS_PIPELINES_CONFIG_FILE_PATH',
+                                                   '/etc/tapis/pipeline_config.json')]
+    for path, result in asyncio.run(run_pipelines(config_paths)).items():
+        if isinstance(result, BaseException):
+            print(f"Pipeline {path} failed: {result}")
+        else:
+            print(f"Pipeline {path}: {len(result)} job(s) completed.")
+
+
+if __name__ == '__main__':
+    main()
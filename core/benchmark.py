@@ -0,0 +1,49 @@
+"""
+Cold-start benchmark for cron runs. A run that finds nothing to do spends most of its time starting up, so the
+benchmark reports the time to import the pipeline modules (each import in a fresh interpreter, so nothing is already
+loaded) and the time to create a Tapis client and make its first call.
+"""
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+# number of fresh interpreters each import is timed in; the median is reported
+IMPORT_BENCHMARK_RUNS = 5
+
+# modules whose import time is reported
+BENCHMARK_MODULES = ['core.pipelines', 'tapipy.tapis']
+
+
+def measure_import_seconds(module, runs=IMPORT_BENCHMARK_RUNS):
+    """
+    Import module in runs fresh interpreters and return the median import time in seconds, or None if the module
+    cannot be imported.
+    """
+    root_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join([root_dir] + sys.path))
+    code = f'import time; start = time.perf_counter(); import {module}; print(time.perf_counter() - start)'
+    times = []
+    for _ in range(runs):
+        result = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, env=env)
+        if result.returncode != 0:
+            print(f"Could not import {module}: {result.stderr.strip().splitlines()[-1:]}")
+            return None
+        times.append(float(result.stdout.strip().splitlines()[-1]))
+    return statistics.median(times)
+
+
+def measure_first_call(make_client, call):
+    """
+    Time creating a client with make_client() and then making its first API call with call(client).
+    :return: dict with client_seconds and first_call_seconds, or with the error if either step failed.
+    """
+    start = time.perf_counter()
+    try:
+        client = make_client()
+        created = time.perf_counter()
+        call(client)
+    except Exception as e:
+        return {'error': str(e)}
+    return {'client_seconds': created - start, 'first_call_seconds': time.perf_counter() - created}
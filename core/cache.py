@@ -0,0 +1,114 @@
+"""
+Content-addressed cache of pipeline job results. Each entry maps a key computed from the pipeline app id/version and
+the checksums of a manifest's inputs to the Tapis job that already processed those exact inputs, so that a manifest
+re-sending identical inputs can be completed from the prior outputs instead of running a new job. The md5_checksum
+declared in a manifest is only verified for a local remote outbox; for a Tapis remote outbox, the key also includes the
+size and lastModified of each input, so that an input replaced without updating its declared checksum is not matched.
+"""
+import hashlib
+import json
+import time
+
+
+class ResultCache(object):
+    """
+    Class for reading and writing result cache entries in a dedicated Meta API collection.
+    """
+
+    def __init__(self, tapis_client, db, collection, max_age_days=None, max_entries=None):
+        self.tapis_client = tapis_client
+        self.db = db
+        self.collection = collection
+        self.max_age_days = max_age_days
+        self.max_entries = max_entries
+
+    @staticmethod
+    def get_cache_key(app_id, app_version, input_checksums, input_observations=None):
+        """
+        Compute the cache key for a set of inputs processed by a specific app version.
+        :param app_id: (str) The id of the Tapis app.
+        :param app_version: (str) The version of the Tapis app.
+        :param input_checksums: (dict) Mapping of input file path to checksum.
+        :param input_observations: (dict) Mapping of input file path to its size and lastModified (see
+        core.settling.get_observation()), for inputs whose checksum could not be verified; or None.
+        :return: (str) hex digest identifying the inputs and app version.
+        """
+        data = {"app_id": app_id,
+                "app_version": app_version,
+                "inputs": sorted(input_checksums.items())}
+        if input_observations:
+            data["observations"] = sorted([path, list(observation)] for path, observation in input_observations.items())
+        return hashlib.sha256(json.dumps(data, sort_keys=True).encode('utf-8')).hexdigest()
+
+    def get(self, cache_key):
+        """
+        Look up the cache entry for a key.
+        Returns None if there is no entry or the Tapis call does not succeed.
+        """
+        try:
+            entries = json.loads(self.tapis_client.meta.listDocuments(db=self.db,
+                                                                      collection=self.collection,
+                                                                      filter=str({'cache_key': cache_key})))
+        except Exception as e:
+            print(f"Got exception trying to look up result cache entry {cache_key}; e: {e}")
+            return None
+        if not entries:
+            return None
+        entry = entries[0]
+        if self.max_age_days and entry['create_timestamp'] < time.time() - self.max_age_days * 86400:
+            return None
+        return entry
+
+    def add(self, cache_key, tapis_job_uuid, remote_id):
+        """
+        Record that the job with uuid tapis_job_uuid, submitted for the manifest with remote_id, produced the
+        outputs for cache_key. Evicts stale entries after adding.
+        """
+        if self.get(cache_key):
+            return
+        try:
+            self.tapis_client.meta.createDocument(db=self.db,
+                                                  collection=self.collection,
+                                                  request_body={'cache_key': cache_key,
+                                                                'tapis_job_uuid': tapis_job_uuid,
+                                                                'remote_id': remote_id,
+                                                                'create_timestamp': time.time()})
+        except Exception as e:
+            print(f"Got exception trying to add result cache entry {cache_key}; e: {e}")
+            return
+        self.evict()
+
+    def evict(self):
+        """
+        Delete entries older than max_age_days and, beyond the newest max_entries entries, the oldest entries.
+        """
+        stale = []
+        try:
+            if self.max_age_days:
+                cutoff = time.time() - self.max_age_days * 86400
+                stale.extend(json.loads(self.tapis_client.meta.listDocuments(
+                    db=self.db,
+                    collection=self.collection,
+                    pagesize=1000,
+                    filter=str({'create_timestamp': {'$lt': cutoff}}))))
+            if self.max_entries:
+                # the second page, sorted newest first, holds the entries past max_entries.
+                stale.extend(json.loads(self.tapis_client.meta.listDocuments(
+                    db=self.db,
+                    collection=self.collection,
+                    page=2,
+                    pagesize=self.max_entries,
+                    sort=str({'create_timestamp': -1}))))
+        except Exception as e:
+            print(f"Got exception trying to list result cache entries for eviction; e: {e}")
+            return
+        evicted = set()
+        for entry in stale:
+            doc_id = entry['_id']['$oid']
+            if doc_id in evicted:
+                continue
+            try:
+                self.tapis_client.meta.deleteDocument(db=self.db, collection=self.collection, docId=doc_id)
+                evicted.add(doc_id)
+            except Exception as e:
+                print(f"Got exception trying to evict result cache entry {entry['cache_key']}; e: {e}")
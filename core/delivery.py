@@ -0,0 +1,136 @@
+"""
+Delivery of job outputs to the remote inbox. The outputs of each completed pipeline job are copied to a directory for
+its manifest in the remote inbox, next to an output manifest listing the path, size and md5 checksum of every
+output. Transfers are incremental: an output is only downloaded again if its size or lastModified in the job archive
+changed since the last delivery (or the inbox copy is missing), and only uploaded if its checksum changed. Outputs
+are downloaded in chunks to a temporary file rather than into memory. Every delivery also appends an entry to a
+rolling index file at the root of the inbox, so that consumers can tail the index instead of listing the whole inbox
+to find new outputs. The index is only ever appended to: once it holds MAX_INDEX_ENTRIES entries, it is moved aside to
+a segment file named after the time of the rotation and a new index is started, as with log rotation, so consumers
+should follow it by name (e.g., tail -F). The output manifest records the jobs whose delivery was indexed, so that a
+delivery interrupted before its index entry was appended is indexed by the retry. The Files API cannot append to a
+file, so on a Tapis system inbox the index is read, updated and uploaded again while holding a lock document in the
+pipeline's Meta API collection; pipelines delivering to the same inbox must therefore share their metadata collection.
+"""
+import hashlib
+import json
+from datetime import datetime, timezone
+
+from core.settling import get_observation
+
+# name of the output manifest written in the delivery directory of each manifest
+OUTPUT_MANIFEST_FILENAME = "tapis_pipeline_output_manifest.json"
+
+# name of the index file, at the root of the remote inbox, with one JSON line per delivery
+OUTPUT_INDEX_FILENAME = "tapis_pipeline_output_index.jsonl"
+
+# number of deliveries in the index file before it is rotated to a segment file
+MAX_INDEX_ENTRIES = 1000
+
+# prefix of the name of the Meta API lock document held while updating the index of a Tapis system inbox
+OUTPUT_INDEX_LOCK_PREFIX = "tapis_pipeline_output_index_lock:"
+
+
+def get_relative_path(path, root):
+    """
+    Returns path relative to the directory root; both are paths on the same system, with or without a leading '/'.
+    """
+    path = path.strip('/')
+    root = root.strip('/')
+    if root and path.startswith(f'{root}/'):
+        return path[len(root) + 1:]
+    return path
+
+
+def parse_output_manifest(contents):
+    """
+    Returns the output manifest from the contents of an output manifest file, or an empty manifest if there was no
+    file or it cannot be parsed.
+    """
+    if contents:
+        try:
+            output_manifest = json.loads(contents)
+            if isinstance(output_manifest, dict) and isinstance(output_manifest.get('files'), dict):
+                return output_manifest
+        except ValueError:
+            print("Could not parse the existing output manifest; all outputs will be checked again.")
+    return {'files': {}}
+
+
+def needs_download(path, listing, previous_entry, inbox_sizes):
+    """
+    Returns True unless the output at path was already delivered from a source with the same size and lastModified
+    and the inbox still has a file of the size delivered.
+    :param path: (str) The path of the output relative to the delivery directory.
+    :param listing: The file listing of the output in the job archive.
+    :param previous_entry: The entry for path in the previous output manifest, or None.
+    :param inbox_sizes: (dict) Mapping of path, relative to the delivery directory, to size of the files in the inbox.
+    """
+    if not previous_entry:
+        return True
+    if previous_entry.get('source') != get_observation(listing):
+        return True
+    return inbox_sizes.get(path) != previous_entry.get('size')
+
+
+def is_unchanged(path, md5_checksum, previous_entry, inbox_sizes):
+    """
+    Returns True if a downloaded output has the same checksum as the file already delivered to the inbox.
+    """
+    return bool(previous_entry) and previous_entry.get('md5_checksum') == md5_checksum and \
+        inbox_sizes.get(path) == previous_entry.get('size')
+
+
+def get_index_entry(output_manifest, output_manifest_path, tapis_job_uuid, copied, unchanged):
+    """
+    Returns the index entry for a delivery.
+    :param copied: (list) The paths of the outputs copied by the delivery.
+    :param unchanged: (list) The paths of the outputs that were already in the inbox.
+    """
+    return {'remote_id': output_manifest['remote_id'],
+            'output_manifest': output_manifest_path,
+            'tapis_job_uuid': tapis_job_uuid,
+            'copied': copied,
+            'unchanged': len(unchanged),
+            'delivered_at': datetime.now(timezone.utc).isoformat()}
+
+
+def get_file_md5(file, chunk_size=1024 * 1024):
+    """
+    Returns the md5 checksum and size of the contents of a file object, read in chunks from its current position.
+    """
+    md5 = hashlib.md5()
+    size = 0
+    for chunk in iter(lambda: file.read(chunk_size), b''):
+        md5.update(chunk)
+        size += len(chunk)
+    return md5.hexdigest(), size
+
+
+def get_index_line(entry):
+    """
+    Returns the line for an entry in the index file.
+    """
+    return (json.dumps(entry) + '\n').encode('utf-8')
+
+
+def append_index_entry(contents, entry):
+    """
+    Returns the contents of the index file with entry appended.
+    :param contents: (bytes) The current contents of the index file, or None if there is none yet.
+    """
+    return (contents or b'') + get_index_line(entry)
+
+
+def needs_rotation(contents, max_entries=MAX_INDEX_ENTRIES):
+    """
+    Returns True if the index file with these contents is full and must be rotated before the next entry is appended.
+    """
+    return bool(contents) and contents.count(b'\n') >= max_entries
+
+
+def get_index_segment_name(now):
+    """
+    Returns the name of the segment file an index file rotated at now (a datetime) is moved to.
+    """
+    return f"{OUTPUT_INDEX_FILENAME[:-len('.jsonl')]}.{now.strftime('%Y%m%dT%H%M%S%fZ')}.jsonl"
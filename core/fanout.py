@@ -0,0 +1,32 @@
+"""
+Helpers for the fan-out mode of a pipeline job, where a manifest's files are split into shards that are processed by
+separate Tapis jobs and, optionally, merged by a gather job once every shard job has finished.
+"""
+import math
+
+
+def split_inputs(inputs, shard_count, shard_by='count', input_sizes=None, min_files_per_shard=1):
+    """
+    Split a manifest's inputs into shards.
+    :param inputs: (list) The manifest's file objects.
+    :param shard_count: (int) The maximum number of shards to create.
+    :param shard_by: (str) 'count' to give every shard about the same number of files, or 'bytes' to give every shard
+    about the same number of bytes.
+    :param input_sizes: (dict) Mapping of input file path to size in bytes; required for shard_by 'bytes'.
+    :param min_files_per_shard: (int) Fewer shards are created if needed so that each has at least this many files.
+    :return: list of non-empty lists of file objects.
+    """
+    shard_count = max(min(shard_count, math.ceil(len(inputs) / max(min_files_per_shard, 1))), 1)
+    if shard_by == 'bytes' and input_sizes:
+        # greedy: assign the largest remaining file to the shard with the fewest bytes so far.
+        shards = [[] for _ in range(shard_count)]
+        shard_bytes = [0] * shard_count
+        for inp in sorted(inputs, key=lambda i: input_sizes.get(i['file_path'], 0), reverse=True):
+            idx = shard_bytes.index(min(shard_bytes))
+            shards[idx].append(inp)
+            shard_bytes[idx] += input_sizes.get(inp['file_path'], 0)
+    else:
+        # contiguous chunks, keeping the manifest's order within each shard.
+        size = math.ceil(len(inputs) / shard_count)
+        shards = [inputs[i:i + size] for i in range(0, len(inputs), size)]
+    return [s for s in shards if s]
@@ -0,0 +1,152 @@
+"""
+Index management for the Meta API collections used by a pipeline. Every metadata lookup filters on `name`
+(MetadataHelper.get) or `status` (get_all_remote_job_ids), and the result cache looks entries up by `cache_key` and
+evicts them by `create_timestamp`; without indexes on these fields each lookup is a scan of the whole collection.
+Within a status, jobs are ordered by `last_update_timestamp` (epoch seconds) rather than by the formatted
+`last_update_time` string, which does not sort in time order.
+"""
+import json
+
+# indexes on the pipeline's metadata collection, by index name, in the Meta API's createIndex format
+PIPELINE_INDEXES = {
+    'name_unique': {"keys": {"name": 1}, "ops": {"unique": True}},
+    'status_last_update_timestamp': {"keys": {"status": 1, "last_update_timestamp": 1}},
+}
+
+# indexes on the result cache collection
+RESULT_CACHE_INDEXES = {
+    'cache_key': {"keys": {"cache_key": 1}},
+    'create_timestamp': {"keys": {"create_timestamp": -1}},
+}
+
+# name of the aggregation registered on a collection to read its index usage statistics
+INDEX_STATS_AGGREGATION = 'pipeline_index_stats'
+
+
+def _parse_result(result):
+    if type(result) == bytes:
+        result = json.loads(result)
+    # the list endpoints may wrap the records in an "_embedded" document
+    if isinstance(result, dict):
+        result = result.get('_embedded', [])
+    return result
+
+
+def index_matches(existing, spec):
+    """
+    Returns True if an existing index (as returned by listIndexes) has the same keys, in the same order, as the index
+    spec and is unique if the spec requires it.
+    """
+    if list(existing.get('key', {}).items()) != list(spec['keys'].items()):
+        return False
+    return existing.get('unique', False) or not spec.get('ops', {}).get('unique', False)
+
+
+def get_missing_indexes(existing_indexes, required_indexes):
+    """
+    Returns the names of the required indexes that are not matched by any existing index. Existing indexes are
+    matched on their keys rather than their names so that equivalent indexes created by an administrator count.
+    :param existing_indexes: (list) The indexes returned by listIndexes.
+    :param required_indexes: (dict) Mapping of index name to spec; e.g., PIPELINE_INDEXES.
+    :return: list of index names.
+    """
+    return [name for name, spec in required_indexes.items()
+            if not any(index_matches(existing, spec) for existing in existing_indexes)]
+
+
+class MetaIndexManager(object):
+    """
+    Class for creating and reporting on the indexes of the Meta API collections in a db.
+    """
+
+    def __init__(self, tapis_client, db):
+        self.tapis_client = tapis_client
+        self.db = db
+
+    def list_indexes(self, collection):
+        return _parse_result(self.tapis_client.meta.listIndexes(db=self.db, collection=collection))
+
+    def ensure_indexes(self, collection, required_indexes):
+        """
+        Create the required indexes missing from collection. Failures are reported but not fatal: the pipeline works
+        without the indexes, only more slowly. A unique index cannot be created while the collection contains
+        duplicate values for its keys.
+        :return: list of the names of the indexes created.
+        """
+        try:
+            missing = get_missing_indexes(self.list_indexes(collection), required_indexes)
+        except Exception as e:
+            print(f"Got exception trying to list the indexes on collection {collection}; e: {e}")
+            return []
+        created = []
+        for name in missing:
+            try:
+                self.tapis_client.meta.createIndex(db=self.db,
+                                                   collection=collection,
+                                                   indexName=name,
+                                                   request_body=required_indexes[name])
+                created.append(name)
+            except Exception as e:
+                print(f"Got exception trying to create index {name} on collection {collection}; e: {e}")
+        if created:
+            print(f"Created indexes {created} on collection {collection}.")
+        return created
+
+    def get_index_usage(self, collection):
+        """
+        Returns the usage statistics of the collection's indexes, as a dictionary mapping index name to the number
+        of operations that used it and the time the count started, or None if the server does not provide them.
+        """
+        try:
+            try:
+                result = self.tapis_client.meta.useAggregation(db=self.db,
+                                                               collection=collection,
+                                                               aggregation=INDEX_STATS_AGGREGATION)
+            except Exception:
+                self.tapis_client.meta.addAggregation(db=self.db,
+                                                      collection=collection,
+                                                      aggregation=INDEX_STATS_AGGREGATION,
+                                                      request_body={"type": "pipeline",
+                                                                    "uri": INDEX_STATS_AGGREGATION,
+                                                                    "stages": [{"$indexStats": {}}]})
+                result = self.tapis_client.meta.useAggregation(db=self.db,
+                                                               collection=collection,
+                                                               aggregation=INDEX_STATS_AGGREGATION)
+        except Exception as e:
+            print(f"Could not read index usage for collection {collection}; e: {e}")
+            return None
+        usage = {}
+        for record in _parse_result(result):
+            accesses = record.get('accesses', {})
+            ops = accesses.get('ops', 0)
+            # counts may be returned in extended JSON; e.g., {"$numberLong": "12"}
+            if isinstance(ops, dict):
+                ops = int(ops.get('$numberLong', 0))
+            usage[record.get('name')] = {'ops': ops, 'since': accesses.get('since')}
+        return usage
+
+    def report(self, collection, required_indexes):
+        """
+        Returns a report on the indexes of collection: each existing index with its keys and usage, and the required
+        indexes that are missing. If the indexes cannot be listed, the report has the error instead.
+        """
+        try:
+            existing_indexes = self.list_indexes(collection)
+        except Exception as e:
+            msg = f"Could not list the indexes on collection {collection}; does it exist and does the user have " \
+                  f"access to it? e: {e}"
+            print(msg)
+            return {'collection': collection,
+                    'error': msg}
+        usage = self.get_index_usage(collection)
+        indexes = []
+        for existing in existing_indexes:
+            name = existing.get('_id', existing.get('name'))
+            indexes.append({'name': name,
+                            'keys': existing.get('key'),
+                            'unique': existing.get('unique', False),
+                            'ops': usage.get(name, {}).get('ops') if usage is not None else None,
+                            'since': usage.get(name, {}).get('since') if usage is not None else None})
+        return {'collection': collection,
+                'indexes': indexes,
+                'missing': get_missing_indexes(existing_indexes, required_indexes)}
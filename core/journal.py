@@ -0,0 +1,100 @@
+"""
+Local write-ahead journal of pipeline transitions. Before each remote call that moves a manifest or job forward
+(claiming a manifest, submitting a job, updating its status, transferring outputs), an "intent" entry is appended to
+the journal; once the call succeeds, a "done" entry is appended (or an "abort" entry if the work was abandoned).
+On startup, the entries are replayed to find exactly the work that was interrupted, which can then be recovered
+without rescanning everything or submitting duplicate jobs.
+"""
+import json
+import os
+import time
+
+# operations recorded in the journal
+CLAIM = 'claim'
+SUBMIT = 'submit'
+STATUS_UPDATE = 'status_update'
+TRANSFER = 'transfer'
+
+# operations that complete the journal's interest in a key once done
+FINAL_OPS = [STATUS_UPDATE, TRANSFER]
+
+
+class Journal(object):
+    """
+    Class for appending to and replaying the journal file of a pipeline. Entries are JSON Lines records with the
+    operation, the phase (intent, done or abort), the key the operation applies to (the manifest's remote_id, or the
+    Tapis job uuid for transfers), a timestamp and any additional data.
+    """
+
+    def __init__(self, state_dir, pipeline_name):
+        self.path = os.path.join(state_dir, f'tapis_pipelines_journal_{pipeline_name}.jsonl')
+
+    def append(self, op, phase, key, **data):
+        """
+        Append an entry and flush it to disk before returning.
+        """
+        entry = dict(data, op=op, phase=phase, key=key, ts=time.time())
+        with open(self.path, 'a') as f:
+            f.write(json.dumps(entry) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+
+    def intent(self, op, key, **data):
+        self.append(op, 'intent', key, **data)
+
+    def done(self, op, key, **data):
+        self.append(op, 'done', key, **data)
+
+    def abort(self, op, key, **data):
+        self.append(op, 'abort', key, **data)
+
+    def read(self):
+        """
+        Returns all entries in the journal, skipping a partially written last line.
+        """
+        entries = []
+        try:
+            with open(self.path, 'r') as f:
+                for line in f:
+                    try:
+                        entries.append(json.loads(line))
+                    except ValueError:
+                        print(f"Skipping unreadable journal entry in {self.path}: {line}")
+        except FileNotFoundError:
+            pass
+        return entries
+
+    @staticmethod
+    def is_finished(entry):
+        return entry['phase'] == 'abort' or (entry['phase'] == 'done' and entry['op'] in FINAL_OPS)
+
+    def get_unfinished(self):
+        """
+        Replay the journal and return, for each key whose work is unfinished, its last entry merged with the data
+        recorded by the earlier entries for the same key (e.g., the manifest file recorded when it was claimed).
+        :return: dict mapping key to entry.
+        """
+        merged = {}
+        for entry in self.read():
+            if entry['op'] == CLAIM and entry['phase'] == 'intent':
+                # a new claim starts the lifecycle of the key over.
+                merged.pop(entry['key'], None)
+            merged[entry['key']] = dict(merged.get(entry['key'], {}), **entry)
+        return {key: entry for key, entry in merged.items() if not self.is_finished(entry)}
+
+    def compact(self):
+        """
+        Rewrite the journal keeping only the entries for keys whose work is unfinished.
+        """
+        unfinished = self.get_unfinished()
+        entries = [e for e in self.read() if e['key'] in unfinished]
+        try:
+            tmp_path = f'{self.path}.{os.getpid()}'
+            with open(tmp_path, 'w') as f:
+                for entry in entries:
+                    f.write(json.dumps(entry) + '\n')
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.path)
+        except Exception as e:
+            print(f"Couldn't compact journal {self.path}; exception: {e}")
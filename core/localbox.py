@@ -0,0 +1,175 @@
+"""
+Support for the 'local' box kind: a remote outbox on a filesystem that is also mounted on the host running the
+pipeline software (e.g., a shared parallel filesystem). Discovery lists the outbox with os.scandir, input files are
+validated with local stat calls and manifests are read straight from disk, so none of these steps make HTTP calls.
+Tapis jobs still stage their inputs from the Tapis system that exposes the same filesystem.
+
+Waiting for new manifests with inotify requires the inotify_simple package (pip install inotify_simple) on Linux;
+without it, LocalBoxWatcher falls back to polling the outbox with os.scandir.
+"""
+import os
+import time
+from datetime import datetime, timezone
+
+from core.errors import ManifestFormatError
+
+try:
+    import inotify_simple
+except ImportError:
+    inotify_simple = None
+
+# how often LocalBoxWatcher checks the outbox when inotify is not available
+WATCH_POLL_SECONDS = 5
+
+
+class LocalFile(object):
+    """
+    A file in a local box, with the attributes of a Tapis file object used by the pipeline software.
+    """
+    def __init__(self, name, path, uri, size, last_modified, file_type='file'):
+        self.name = name
+        self.path = path
+        self.uri = uri
+        self.size = size
+        self.lastModified = last_modified
+        self.type = file_type
+
+    def __repr__(self):
+        return f'LocalFile({self.path})'
+
+
+class LocalBox(object):
+    """
+    A class representing a local or remote inbox/outbox on a filesystem mounted on the pipeline host. Paths are the
+    paths on the Tapis system identified by system_id, as with a TapisSystemBox; root_dir is the directory on the
+    pipeline host where the root of that system is mounted. Paths are never resolved outside of root_dir.
+    """
+    def __init__(self, system_id, path, root_dir):
+        self.kind = 'local'
+        self.system_id = system_id
+        self.path = path
+        self.root_dir = os.path.realpath(root_dir)
+
+    def get_local_path(self, path):
+        """
+        Returns the path on the pipeline host for a path on the Tapis system, with symbolic links and '..'
+        components resolved. Raises ManifestFormatError if the path resolves outside of root_dir; e.g., a manifest
+        input like ../../etc/passwd.
+        """
+        local_path = os.path.realpath(os.path.join(self.root_dir, path.lstrip('/')))
+        if not local_path == self.root_dir and not local_path.startswith(os.path.join(self.root_dir, '')):
+            raise ManifestFormatError(f"Path {path} resolves to {local_path}, outside of the root_dir "
+                                      f"{self.root_dir} of the local box.")
+        return local_path
+
+    def get_file(self, path, st, is_dir):
+        return LocalFile(name=os.path.basename(path),
+                         path=path,
+                         uri=f'tapis://{self.system_id}/{path.lstrip("/")}',
+                         size=st.st_size,
+                         last_modified=datetime.fromtimestamp(st.st_mtime, timezone.utc).isoformat(),
+                         file_type='dir' if is_dir else 'file')
+
+    def list_files(self, path=None, recurse=False):
+        """
+        List the files in a directory of the box (the box's path by default) with os.scandir, or the file itself if
+        path is a file. Raises FileNotFoundError if path does not exist.
+        :param recurse: If True, list the files in the subdirectories as well, as with the Tapis Files API.
+        :return: list of LocalFile objects.
+        """
+        path = path or self.path
+        local_path = self.get_local_path(path)
+        if not os.path.isdir(local_path):
+            return [self.stat(path)]
+        files = []
+        with os.scandir(local_path) as entries:
+            for entry in entries:
+                files.append(self.get_file(os.path.join(path, entry.name), entry.stat(), entry.is_dir()))
+                if recurse and entry.is_dir():
+                    files.extend(self.list_files(os.path.join(path, entry.name), recurse=True))
+        return files
+
+    def stat(self, path):
+        """
+        Returns a LocalFile for path; raises FileNotFoundError if it does not exist.
+        """
+        local_path = self.get_local_path(path)
+        return self.get_file(path, os.stat(local_path), os.path.isdir(local_path))
+
+    def read(self, path):
+        with open(self.get_local_path(path), 'rb') as f:
+            return f.read()
+
+    def write(self, path, file):
+        """
+        Write the contents of the file object to path, creating parent directories as needed. The file is written
+        under a temporary name and renamed so that readers never see a partial file.
+        """
+        local_path = self.get_local_path(path)
+        os.makedirs(os.path.dirname(local_path), exist_ok=True)
+        tmp_path = f'{local_path}.{os.getpid()}.tmp'
+        with open(tmp_path, 'wb') as f:
+            while True:
+                chunk = file.read(1024 * 1024)
+                if not chunk:
+                    break
+                f.write(chunk)
+        os.replace(tmp_path, local_path)
+
+    def append(self, path, data):
+        """
+        Append bytes to the file at path, creating it if needed. Unlike write(), the file is never replaced, so that
+        readers following it (e.g., with tail -f) see the new data.
+        """
+        local_path = self.get_local_path(path)
+        os.makedirs(os.path.dirname(local_path), exist_ok=True)
+        with open(local_path, 'ab') as f:
+            f.write(data)
+
+    def move(self, path, new_path):
+        os.replace(self.get_local_path(path), self.get_local_path(new_path))
+
+    def delete(self, path):
+        os.remove(self.get_local_path(path))
+
+
+class LocalBoxWatcher(object):
+    """
+    Waits for files whose names start with a prefix to be written to or moved into a local box's directory.
+    """
+    def __init__(self, box, prefix):
+        self.local_path = box.get_local_path(box.path)
+        self.prefix = prefix
+        self.inotify = None
+        if inotify_simple:
+            self.inotify = inotify_simple.INotify()
+            self.inotify.add_watch(self.local_path,
+                                   inotify_simple.flags.CLOSE_WRITE | inotify_simple.flags.MOVED_TO)
+        else:
+            print("inotify_simple is not installed; polling the outbox for new manifest files instead.")
+        self.known = self.list_names()
+
+    def list_names(self):
+        with os.scandir(self.local_path) as entries:
+            return set(e.name for e in entries if e.name.startswith(self.prefix))
+
+    def wait(self, timeout):
+        """
+        Block until a matching file is written to the directory or timeout seconds pass.
+        :return: list of the names of the new matching files (empty on timeout).
+        """
+        deadline = time.time() + timeout
+        while True:
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                return []
+            if self.inotify:
+                names = [e.name for e in self.inotify.read(timeout=int(remaining * 1000))
+                         if e.name.startswith(self.prefix)]
+            else:
+                time.sleep(min(WATCH_POLL_SECONDS, remaining))
+                current = self.list_names()
+                names = sorted(current - self.known)
+                self.known = current
+            if names:
+                return names
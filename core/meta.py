@@ -1,7 +1,111 @@
 import json
 import logging
+import time
+import uuid
 from datetime import datetime
 
+# a lock older than this, in seconds, is assumed to have been left by a process that died and is taken over
+LOCK_STALE_SECONDS = 10 * 60
+
+# how many times, and how many seconds apart, MetaLock.acquire() tries to take a lock held by another process
+LOCK_ATTEMPTS = 10
+LOCK_WAIT_SECONDS = 3
+
+
+def is_duplicate_key_error(e):
+    """
+    Returns True if a failed Meta API call was rejected because a document with the same unique key (e.g., the name
+    of the job, with the unique index on name) already exists: the API returns a 409 or reports MongoDB's E11000
+    duplicate key error.
+    """
+    response = getattr(e, 'response', None)
+    if getattr(response, 'status_code', None) == 409:
+        return True
+    content = getattr(response, 'content', None) or b''
+    if isinstance(content, str):
+        content = content.encode('utf-8')
+    return b'E11000' in content or 'E11000' in str(e)
+
+
+def is_not_found_error(e):
+    """
+    Returns True if a failed Meta API call was rejected because the resource it names (e.g., an aggregation) does not
+    exist: the API returns a 404.
+    """
+    return getattr(getattr(e, 'response', None), 'status_code', None) == 404
+
+
+class MetaLock(object):
+    """
+    A lock held as a document in a Meta API collection. Acquiring the lock creates a document with the lock's name,
+    which fails while another process holds it thanks to the unique index on name (see core.indexes); releasing the
+    lock deletes the document. Lock documents have no status, so they are never mistaken for pipeline jobs.
+    """
+
+    def __init__(self, tapis_client, db, collection, name, stale_seconds=LOCK_STALE_SECONDS):
+        self.tapis_client = tapis_client
+        self.db = db
+        self.collection = collection
+        self.name = name
+        self.stale_seconds = stale_seconds
+        # identifies this holder, so that a lock taken over from this process is not released by it
+        self.owner = uuid.uuid4().hex
+
+    def get(self):
+        """
+        Returns the lock document, or None if the lock is free.
+        """
+        documents = json.loads(self.tapis_client.meta.listDocuments(db=self.db,
+                                                                   collection=self.collection,
+                                                                   filter=str({'name': self.name})))
+        return documents[0] if documents else None
+
+    def delete(self, document):
+        try:
+            self.tapis_client.meta.deleteDocument(db=self.db, collection=self.collection,
+                                                  docId=document['_id']['$oid'])
+        except Exception as e:
+            # another process released or took over the lock first
+            if not is_not_found_error(e):
+                raise
+
+    def acquire(self, attempts=LOCK_ATTEMPTS, wait_seconds=LOCK_WAIT_SECONDS):
+        """
+        Take the lock, waiting wait_seconds between attempts while another process holds it.
+        :return: bool -- False if the lock is still held by another process after the last attempt.
+        """
+        for attempt in range(attempts):
+            if attempt:
+                time.sleep(wait_seconds)
+            document = self.get()
+            if document:
+                if time.time() - document.get('locked_at', 0) < self.stale_seconds:
+                    continue
+                print(f"Taking over the lock {self.name}, held by {document.get('owner')} since "
+                      f"{document.get('locked_at')}.")
+                self.delete(document)
+            try:
+                self.tapis_client.meta.createDocument(db=self.db,
+                                                      collection=self.collection,
+                                                      request_body={'name': self.name,
+                                                                    'kind': 'lock',
+                                                                    'owner': self.owner,
+                                                                    'locked_at': time.time()})
+            except Exception as e:
+                if is_duplicate_key_error(e):
+                    continue
+                raise
+            return True
+        return False
+
+    def release(self):
+        """
+        Release the lock if this process still holds it.
+        """
+        document = self.get()
+        if document and document.get('owner') == self.owner:
+            self.delete(document)
+
 
 class MetadataHelper:
 
@@ -12,6 +116,9 @@ class MetadataHelper:
         self.tapis_client = tapis_client
         self.STATUS = {
             'INIT': 'METADATA_CREATED',
+            'waiting_for_inputs': 'Waiting for input uploads to settle on REMOTE',
+            'pack_input': 'Started packaging of input data on REMOTE',
+            'pack_input_done': 'Finished packaging of input data on REMOTE',
             'transfer_to_local': 'Started data transfer to LOCAL',
             'transfer_to_local_done': 'Finished data transfer to LOCAL',
             'unpack_data_on_local': 'Started data unpack on LOCAL',
@@ -34,11 +141,14 @@ class MetadataHelper:
         self.logger.debug('Created instance for {}'.format(self.job_name))
 
     def get_tapis_meta_obj(self, status_key, history, additional_info, set_create_time=False):
-        now = datetime.now().strftime("%m/%d/%Y, %H:%M:%S")
+        update_time = datetime.now()
+        now = update_time.strftime("%m/%d/%Y, %H:%M:%S")
         request_body = {
             'name': self.job_name,
             'status': self.STATUS[status_key],
             'last_update_time': now,
+            # epoch seconds, which sort and compare in time order unlike last_update_time; see core.indexes
+            'last_update_timestamp': update_time.timestamp(),
             "additional_info": additional_info,
             "history": history,
         }
@@ -53,17 +163,26 @@ class MetadataHelper:
         '''
         if metadata does not exist for this job_name, create it
         job name is likely the input file, e.g. something_12345678_req123.tar
+        returns False if a record already exists for this job_name; raises the exception if the record could not be
+        created for any other reason.
         '''
 
         if self.get():
             self.logger.info('Metadata record already exists for {}, not creating another.'.format(self.job_name))
             return False
         else:
-            self.tapis_client.meta.createDocument(
-                db=self.db,
-                collection=self.collection,
-                request_body=self.get_new_tapis_meta_obj()
-            )
+            try:
+                self.tapis_client.meta.createDocument(
+                    db=self.db,
+                    collection=self.collection,
+                    request_body=self.get_new_tapis_meta_obj()
+                )
+            except Exception as e:
+                # with the unique index on name, this is how a concurrent claim of the same job_name fails.
+                if is_duplicate_key_error(e):
+                    self.logger.info('Metadata record already exists for {}: {}'.format(self.job_name, e))
+                    return False
+                raise
             self.logger.info('Created metadata record for {}.'.format(self.job_name))
             return True
 
@@ -90,6 +209,10 @@ class MetadataHelper:
         print(json.dumps(metadata, indent=2))
 
     def update(self, statuskey, additional_info={}):
+        '''
+        Set a new status on the metadata for this job_name, moving the previous status to the history.
+        Returns True if the Tapis call succeeded.
+        '''
         metadata = self.get()
         prev_status = {
             "status": metadata["status"],
@@ -115,4 +238,6 @@ class MetadataHelper:
                 request_body=request_body)
         except Exception as e:
             print(e)
+            return False
+        return True
 
@@ -1,14 +1,34 @@
 """
 Module for interacting with the Tapis API on behalf of a pipeline.
 """
+import argparse
+import hashlib
+import io
 import json
 import os
 import sys
+import tarfile
+import tempfile
+import time
+from datetime import datetime, timezone
 
-from tapipy.tapis import Tapis
-from core.config import parse_pipeline_config, parse_manifest_bytes
+from core.config import Config, parse_pipeline_config, parse_manifest_bytes
 from core import errors
-from core.meta import MetadataHelper
+from core.benchmark import BENCHMARK_MODULES, IMPORT_BENCHMARK_RUNS, measure_first_call, measure_import_seconds
+from core.cache import ResultCache
+from core.delivery import OUTPUT_INDEX_FILENAME, OUTPUT_INDEX_LOCK_PREFIX, OUTPUT_MANIFEST_FILENAME, \
+    append_index_entry, get_file_md5, get_index_entry, get_index_line, get_index_segment_name, get_relative_path, \
+    is_unchanged, needs_download, needs_rotation, parse_output_manifest
+from core.fanout import split_inputs
+from core.indexes import MetaIndexManager, PIPELINE_INDEXES, RESULT_CACHE_INDEXES
+from core.localbox import LocalBox, LocalBoxWatcher
+from core.journal import Journal, CLAIM, SUBMIT, STATUS_UPDATE, TRANSFER
+from core.meta import MetadataHelper, MetaLock
+from core.polling import get_poll_interval, get_stuck_deadline_minutes
+from core.settling import DEFAULT_MAX_PENDING_MINUTES, DEFAULT_SETTLE_SECONDS, get_md5, get_observation, is_settled
+from core.state import PipelineState
+from core.summary import PipelineSummary, SUMMARY_CACHE_SECONDS
+from core.tapis_client import TapisClient, get_tapipy_client
 
 # all manifest files must have a name that begins with the following string; this is how the pipelines software
 # recognizes manifest files from other kinds of input files:
@@ -17,9 +37,42 @@ TAPIS_PIPELINE_MANIFEST_FILENAME_PREFIX = "tapis_pipeline_manifest_"
 # the key used by the Meta helper class for an error
 META_ERROR_STATUS_KEY = 'ERROR'
 
+# status of a claimed manifest whose inputs are still being uploaded; see validate_manifest()
+META_WAITING_STATUS_KEY = 'waiting_for_inputs'
+WAITING_FOR_INPUTS_STATUS = 'Waiting for input uploads to settle on REMOTE'
+
 # terminal job states for tapis jobs -- TODO
 TERMINAL_JOB_STATES = ['FAILED', 'FINISHED']
 
+# directory in the remote outbox, relative to the outbox path, where input archives are written when the pipeline job
+# uses the 'archive' input staging mode
+INPUT_ARCHIVE_DIR = ".tapis_pipeline_input_archives"
+
+# environment variable used to pass the name of the input archive to the job
+INPUT_ARCHIVE_ENV_VAR = "TAPIS_PIPELINE_INPUT_ARCHIVE"
+
+# directory in the remote outbox, relative to the outbox path, where the manifests for fan-out shard jobs are written
+SHARD_MANIFEST_DIR = ".tapis_pipeline_shard_manifests"
+
+# statuses of a claimed manifest whose job has not been submitted yet
+UNSUBMITTED_STATUSES = ['METADATA_CREATED',
+                        WAITING_FOR_INPUTS_STATUS,
+                        'Started packaging of input data on REMOTE',
+                        'Finished packaging of input data on REMOTE']
+
+# how long the watch command waits for a new manifest file before running a cycle anyway (to poll jobs in flight)
+WATCH_INTERVAL_SECONDS = 5 * 60
+
+# statuses of an actor execution that has completed, successfully or not
+ACTOR_EXECUTION_COMPLETE_STATES = ['COMPLETE']
+ACTOR_EXECUTION_ERROR_STATES = ['ERROR']
+
+# number of the most recently created Tapis jobs searched for a job whose submission was interrupted
+ORPHAN_JOB_SEARCH_LIMIT = 100
+
+# number of runs that try to deliver the outputs of a job to the remote inbox before giving up
+MAX_TRANSFER_ATTEMPTS = 5
+
 
 class TapisPipelineClient(object):
     """
@@ -31,6 +84,111 @@ class TapisPipelineClient(object):
         self.config = parse_pipeline_config(self.config_path)
         self.name = self.config.pipeline_name
         # parse the tapis_config
+        self.parse_tapis_credentials()
+        if self.access_token:
+            msg = f"Using the following config to instantiate the Tapis client. \n" \
+                  f"base_url: {self.tapis_base_url} \n" \
+                  f"username: {self.tapis_username} \n" \
+                  f"access_token: {self.access_token[:5]}...{self.access_token[-5:]}"
+        else:
+            msg = f"Using the following config to instantiate the Tapis client. \n" \
+                  f"base_url: {self.tapis_base_url} \n" \
+                  f"username: {self.tapis_username} \n " \
+                  f"password: {self.tapis_password[1]}..."
+        print(msg)
+        # the local state directory also holds the spec bundle the tapis client is built from
+        state_dir = self.config.get('local_state_dir', tempfile.gettempdir())
+        # instantiate the tapis client -----
+        # tapipy's client by default; with the lazy client, only the resources the pipeline uses are built, on first
+        # use, and tapipy is not imported
+        client_kind = self.config.tapis_config.get('client', 'tapipy')
+        try:
+            if client_kind == 'tapipy':
+                self.tapis_client = get_tapipy_client(base_url=self.tapis_base_url,
+                                                      username=self.tapis_username,
+                                                      access_token=self.access_token,
+                                                      password=self.tapis_password)
+            else:
+                self.tapis_client = TapisClient(base_url=self.tapis_base_url,
+                                                username=self.tapis_username,
+                                                state_dir=state_dir,
+                                                access_token=self.access_token,
+                                                password=self.tapis_password)
+                if not self.access_token:
+                    self.tapis_client.get_tokens()
+        except Exception as e:
+            auth = "an access token" if self.access_token else "a password"
+            raise errors.PipelineConfigFormatError(f"Failed to instantiate the tapis client using {auth}. "
+                                                   f"Exception: {e}")
+        # set up the tapis metadata helper config ---
+        # if the db name isn't provided, try to use "pipelines" as the db name..
+        self._tapis_meta_db = self.config.tapis_config.get('meta_db', 'pipelines')
+        default_meta_collection = f'{self.tapis_username}.{self.name}'
+        self._tapis_meta_collection = self.config.tapis_config.get('meta_collection', default_meta_collection)
+        # local state from previous cycles; if this exact config was verified recently, skip checking the meta
+        # collection and the app again.
+        self.state = PipelineState(state_dir=state_dir, pipeline_name=self.name)
+        # write-ahead journal of transitions; see recover_from_journal()
+        self.journal = Journal(state_dir=state_dir, pipeline_name=self.name)
+        # how long inputs must be stable before a manifest is submitted, and how long to wait for them
+        settling_config = self.config.get('input_settling', {})
+        self.settle_seconds = settling_config.get('settle_seconds', DEFAULT_SETTLE_SECONDS)
+        self.max_pending_minutes = settling_config.get('max_pending_minutes', DEFAULT_MAX_PENDING_MINUTES)
+        config_hash = hashlib.sha256(json.dumps(self.config, sort_keys=True).encode('utf-8')).hexdigest()
+        setup_verified = self.state.setup_is_verified(config_hash)
+        collections = None
+        if not setup_verified:
+            # check to see if we have access to the db
+            try:
+                collections = self.tapis_client.meta.listCollectionNames(db=self._tapis_meta_db)
+            except Exception as e:
+                msg = f'Got exception trying to list collections on db: {self._tapis_meta_db}. ' \
+                      f'Does user {self.tapis_username} have access to the db in the Meta API? Exception: {e}'
+                print(msg)
+                sys.exit(1)
+            if type(collections) == bytes:
+                collections = json.loads(collections)
+            # if the collection does not already exist, try go create it:
+            if self._tapis_meta_collection not in collections:
+                try:
+                    self.tapis_client.meta.createCollection(db=self._tapis_meta_db,
+                                                            collection=self._tapis_meta_collection)
+                except Exception as e:
+                    msg = f'Collection {self._tapis_meta_collection} did not exist and got error trying to ' \
+                          f'created it. \n' \
+                          f'Existing collections: {collections} in db: {self._tapis_meta_db},\n' \
+                          f'Exception: {e}\n'
+                    print(msg)
+                    try:
+                          msg = f'Extra debug info:\n' \
+                                f'Request: {e.request.url}; {e.request.method}; body: {e.request.body}; ' \
+                                f'Response: {e.response.content}'
+                          print(msg)
+                    except Exception as e:
+                        print(f"Couldn't print extra debug info; exception: {e}")
+                    sys.exit(1)
+            # make sure the lookups by name and status are served by indexes --
+            MetaIndexManager(tapis_client=self.tapis_client,
+                             db=self._tapis_meta_db).ensure_indexes(collection=self._tapis_meta_collection,
+                                                                    required_indexes=PIPELINE_INDEXES)
+        # set up the result cache, if configured ---
+        self.result_cache = self.parse_result_cache_config(collections)
+        # parse and check remote outbox ---
+        self.remote_outbox = self.parse_remote_outbox_config()
+        # parse the remote inbox, where job outputs are delivered
+        self.remote_inbox = self.parse_remote_inbox_config()
+        # check and parse the pipeline job
+        self.pipeline_job = self.parse_pipeline_job_config(check_app=not setup_verified)
+        # only stamped when the checks above actually ran, so that they run again after SETUP_CHECK_SECONDS
+        if not setup_verified:
+            self.state.set_setup_verified(config_hash)
+
+    def parse_tapis_credentials(self):
+        """
+        Parses the base_url and username from the tapis_config and finds an access token (in the config or the
+        environment) or, failing that, a password.
+        :return:
+        """
         try:
             self.tapis_base_url =  self.config.tapis_config['base_url']
         except KeyError:
@@ -58,73 +216,6 @@ class TapisPipelineClient(object):
                 raise errors.PipelineConfigError("Could not find an Tapis access token or password. Exiting!")
         else:
             self.tapis_password = None
-        if self.access_token:
-            msg = f"Using the following config to instantiate the Tapis client. \n" \
-                  f"base_url: {self.tapis_base_url} \n" \
-                  f"username: {self.tapis_username} \n" \
-                  f"access_token: {self.access_token[:5]}...{self.access_token[-5:]}"
-        else:
-            msg = f"Using the following config to instantiate the Tapis client. \n" \
-                  f"base_url: {self.tapis_base_url} \n" \
-                  f"username: {self.tapis_username} \n " \
-                  f"password: {self.tapis_password[1]}..."
-        print(msg)
-        # instantiate the tapis client -----
-        if self.access_token:
-            try:
-                self.tapis_client = Tapis(base_url=self.tapis_base_url,
-                                          username=self.tapis_username,
-                                          access_token=self.access_token)
-            except Exception as e:
-                raise errors.PipelineConfigFormatError(f"Failed to instantiate the tapis client using an access token. "
-                                                       f"Exception: {e}")
-        else:
-            try:
-                self.tapis_client = Tapis(base_url=self.tapis_base_url,
-                                          username=self.tapis_username,
-                                          password=self.tapis_password)
-                self.tapis_client.get_tokens()
-            except Exception as e:
-                raise errors.PipelineConfigFormatError(f"Failed to instantiate the tapis client using a password. "
-                                          f"Exception: {e}")
-        # set up the tapis metadata helper config ---
-        # if the db name isn't provided, try to use "pipelines" as the db name..
-        self._tapis_meta_db = self.config.tapis_config.get('meta_db', 'pipelines')
-        # check to see if we have access to the db
-        try:
-            collections = self.tapis_client.meta.listCollectionNames(db=self._tapis_meta_db)
-        except Exception as e:
-            msg = f'Got exception trying to list collections on db: {self._tapis_meta_db}. ' \
-                  f'Does user {self.tapis_username} have access to the db in the Meta API? Exception: {e}'
-            print(msg)
-            sys.exit(1)
-        if type(collections) == bytes:
-            collections = json.loads(collections)
-
-        default_meta_collection = f'{self.tapis_username}.{self.name}'
-        self._tapis_meta_collection = self.config.tapis_config.get('meta_collection', default_meta_collection)
-        # if the collection does not already exist, try go create it:
-        if self._tapis_meta_collection not in collections:
-            try:
-                self.tapis_client.meta.createCollection(db=self._tapis_meta_db,
-                                                        collection=self._tapis_meta_collection)
-            except Exception as e:
-                msg = f'Collection {self._tapis_meta_collection} did not exist and got error trying to created it. \n' \
-                      f'Existing collections: {collections} in db: {self._tapis_meta_db},\n' \
-                      f'Exception: {e}\n'
-                print(msg)
-                try:
-                      msg = f'Extra debug info:\n' \
-                            f'Request: {e.request.url}; {e.request.method}; body: {e.request.body}; ' \
-                            f'Response: {e.response.content}'
-                      print(msg)
-                except Exception as e:
-                    print(f"Couldn't print extra debug info; exception: {e}")
-                sys.exit(1)
-        # parse and check remote outbox ---
-        self.remote_outbox = self.parse_remote_outbox_config()
-        # check and parse the pipeline job
-        self.pipeline_job = self.parse_pipeline_job_config()
 
     def get_meta_helper(self, remote_id):
         """
@@ -146,29 +237,117 @@ class TapisPipelineClient(object):
             print(msg)
             raise errors.UnexpectedRuntimeError(msg)
 
+    def parse_result_cache_config(self, collections):
+        """
+        Parses the optional result_cache config and returns a ResultCache object, or None if the cache is not enabled.
+        :param collections: The list of existing collections in the meta db, or None to skip creating the cache
+        collection (i.e., when the setup was already verified).
+        :return:
+        """
+        cache_config = self.config.get('result_cache', {})
+        if not cache_config.get('enabled', False):
+            return None
+        collection = cache_config.get('meta_collection', f'{self._tapis_meta_collection}.result_cache')
+        if collections is not None and collection not in collections:
+            try:
+                self.tapis_client.meta.createCollection(db=self._tapis_meta_db, collection=collection)
+            except Exception as e:
+                msg = f'Result cache collection {collection} did not exist and got error trying to created it. ' \
+                      f'Exception: {e}'
+                print(msg)
+                sys.exit(1)
+        if collections is not None:
+            MetaIndexManager(tapis_client=self.tapis_client,
+                             db=self._tapis_meta_db).ensure_indexes(collection=collection,
+                                                                    required_indexes=RESULT_CACHE_INDEXES)
+        return ResultCache(tapis_client=self.tapis_client,
+                           db=self._tapis_meta_db,
+                           collection=collection,
+                           max_age_days=cache_config.get('max_age_days'),
+                           max_entries=cache_config.get('max_entries'))
+
     def parse_remote_outbox_config(self):
         """
         Parses the remote outbox JSON config and creates a Box object with it.
         :return:
         """
-        if self.config.remote_outbox['kind'] == 'tapis':
-            return TapisSystemBox(system_id=self.config.remote_outbox['box_definition']['system_id'],
-                                  path=self.config.remote_outbox['box_definition']['path'])
+        return self.parse_remote_box_config(self.config.remote_outbox, 'remote outbox')
+
+    def parse_remote_inbox_config(self):
+        """
+        Parses the remote inbox JSON config and creates a Box object with it. Job outputs can only be delivered to
+        the kinds of boxes supported for the remote outbox; for other kinds, None is returned and outputs are not
+        delivered.
+        :return:
+        """
+        try:
+            return self.parse_remote_box_config(self.config.remote_inbox, 'remote inbox')
+        except (NotImplementedError, errors.PipelineConfigError) as e:
+            print(f"Job outputs will not be delivered to the remote inbox; e: {e}")
+            return None
+
+    def parse_remote_box_config(self, box_config, box_name):
+        """
+        Creates a Box object from a remote inbox or outbox config.
+        :param box_name: (str) The name of the box, for error messages.
+        :return:
+        """
+        if box_config['kind'] == 'tapis':
+            return TapisSystemBox(system_id=box_config['box_definition']['system_id'],
+                                  path=box_config['box_definition']['path'])
+        elif box_config['kind'] == 'local':
+            box_definition = box_config['box_definition']
+            if not box_definition.get('root_dir'):
+                msg = f"The {box_name.replace(' ', '_')} config of kind 'local' requires a root_dir: the directory " \
+                      f"on this host where the root of system {box_definition['system_id']} is mounted."
+                print(msg)
+                raise errors.PipelineConfigError(msg)
+            box = LocalBox(system_id=box_definition['system_id'],
+                           path=box_definition['path'],
+                           root_dir=box_definition['root_dir'])
+            if not os.path.isdir(box.get_local_path(box.path)):
+                msg = f"The local {box_name} {box.path} was not found at {box.get_local_path(box.path)} on " \
+                      f"this host. Check the root_dir in the {box_name.replace(' ', '_')} config."
+                print(msg)
+                raise errors.PipelineConfigError(msg)
+            return box
         else:
-            raise NotImplementedError(f"Currently only support kind 'tapis' for remote_outbox configs. "
-                                      f"Found: {self.config.remote_outbox['kind']}")
+            raise NotImplementedError(f"Currently only support kinds 'tapis' and 'local' for "
+                                      f"{box_name.replace(' ', '_')} configs. Found: {box_config['kind']}")
 
-    def parse_pipeline_job_config(self):
+    def parse_pipeline_job_config(self, check_app=True):
         """
         Parses the pipelin_job config and returns a pipeline job object.
+        :param check_app: Whether to check access to the app and its manifest input with the Tapis Apps API.
         :return:
         """
         # tapis app job type ---
         if 'tapis_app_job' in self.config.pipeline_job.keys():
             app = TapisPipelineApp(app_id=self.config.pipeline_job['tapis_app_job']['app_id'],
                                    app_version=self.config.pipeline_job['tapis_app_job']['app_version'],
-                                   manifest_input_name=self.config.pipeline_job['tapis_app_job']['manifest_input_name']
+                                   manifest_input_name=self.config.pipeline_job['tapis_app_job']['manifest_input_name'],
+                                   input_staging=self.config.pipeline_job['tapis_app_job'].get('input_staging',
+                                                                                               'files'),
+                                   compress_input_archive=self.config.pipeline_job['tapis_app_job'].get(
+                                       'compress_input_archive', True),
+                                   max_queue_minutes=self.config.pipeline_job['tapis_app_job'].get(
+                                       'max_queue_minutes'),
+                                   fan_out=self.config.pipeline_job['tapis_app_job'].get('fan_out')
                                    )
+            if app.input_staging == 'archive' and not self.config.remote_outbox['kind'] == 'local':
+                msg = f"input_staging 'archive' requires a remote_outbox of kind 'local'; found kind " \
+                      f"{self.config.remote_outbox['kind']}. Packing the inputs of a Tapis system outbox would " \
+                      f"download and upload every input again; use 'files' or 'directory' staging instead. " \
+                      f"Exiting..."
+                print(msg)
+                raise errors.PipelineConfigError(msg)
+            if app.fan_out and app.fan_out.get('gather_app_id') and not app.fan_out.get('gather_app_version'):
+                msg = f"The fan_out config sets gather_app_id {app.fan_out['gather_app_id']} but no " \
+                      f"gather_app_version. Double-check your pipeline config. Exiting..."
+                print(msg)
+                raise errors.PipelineConfigError(msg)
+            if not check_app:
+                return app
             # check for access to the version of the tapis app
             try:
                 tapis_app = self.tapis_client.apps.getApp(appId=app.app_id, appVersion=app.app_version)
@@ -198,7 +377,18 @@ class TapisPipelineClient(object):
                 raise errors.PipelineConfigError(msg)
             return app
         elif 'tapis_actor_job' in self.config.pipeline_job.keys():
-            raise NotImplementedError(f"Currently do not support tapis_actor_job type.")
+            actor = TapisPipelineActor(actor_id=self.config.pipeline_job['tapis_actor_job']['actor_id'],
+                                       batch_size=self.config.pipeline_job['tapis_actor_job'].get('batch_size', 1))
+            if not check_app:
+                return actor
+            # check for access to the actor
+            try:
+                self.tapis_client.actors.get_actor(actor_id=actor.actor_id)
+            except Exception as e:
+                msg = f"Got exception trying to check access to Tapis actor with id: {actor.actor_id}; e: {e}"
+                print(msg)
+                sys.exit(1)
+            return actor
         else:
             msg = "Did not find a tapis_app_job or tapis_actor_job pipeline in the config. Exiting..."
             print(msg)
@@ -209,10 +399,8 @@ class TapisPipelineClient(object):
         Look for new manifest files in the remote outbox; if new manifest file found, claim it in metadata.
         :return:
         """
-        if not self.remote_outbox.kind == 'tapis':
-            raise NotImplementedError(f"Currently only support kind 'tapis' for remote_outbox configs. "
-                                      f"Found: {self.config.remote_outbox['kind']}")
-
+        if self.remote_outbox.kind == 'local':
+            return self.check_local_box_for_new_manifest_files()
         return self.check_tapis_system_for_new_manifest_files()
 
     def check_tapis_system_for_new_manifest_files(self):
@@ -228,6 +416,34 @@ class TapisPipelineClient(object):
             msg = f"Got exception from Tapis trying to list files on remote outbox. Will exit; e: {e}"
             print(msg)
             sys.exit(1)
+        return self.claim_new_manifest_files(file_list)
+
+    def check_local_box_for_new_manifest_files(self):
+        """
+        Check for new manifest files in a local remote outbox, listing the directory with os.scandir instead of the
+        Tapis Files API.
+        :return: List of LocalFile objects representing manifest files that are new since the last time the pipeline
+        software ran. This function will create new metadata records for each file in the list.
+        """
+        try:
+            file_list = self.remote_outbox.list_files()
+        except Exception as e:
+            msg = f"Got exception trying to list files in the local remote outbox. Will exit; e: {e}"
+            print(msg)
+            sys.exit(1)
+        return self.claim_new_manifest_files(file_list)
+
+    def claim_new_manifest_files(self, file_list):
+        """
+        Claim the manifest files in a listing of the remote outbox that are not already claimed.
+        :param file_list: List of file objects in the remote outbox.
+        :return: List of the file objects representing manifest files that were claimed.
+        """
+        # if the listing looks the same as the last full scan, there can't be any new manifest files.
+        fingerprint = PipelineState.get_outbox_fingerprint(file_list)
+        if self.state.outbox_unchanged(fingerprint):
+            print("No changes in the remote outbox since the last cycle; skipping manifest discovery.")
+            return []
         manifest_files = []
         for f in file_list:
             # manifest files must have a name that starts with
@@ -235,18 +451,105 @@ class TapisPipelineClient(object):
                 manifest_files.append(f)
         # check for manifest files that are not already claimed -- i.e., have an entry in metadata.
         new_manifest_files = []
+        claims_failed = False
         for f in manifest_files:
             job_id = self.get_remote_id_from_manifest_name(f.name)
             m = MetadataHelper(tapis_client=self.tapis_client,
                                db=self._tapis_meta_db,
                                collection=self._tapis_meta_collection,
                                job_name=job_id)
+            # skip manifests that are already claimed before journaling the claim of a new one
+            if m.get():
+                continue
+            self.journal.intent(CLAIM, job_id, name=f.name, path=f.path, uri=f.uri)
             # the following method will return True if it creates a new meta record and false if there a
             # metadata entry already exists for this job, create it and add it to the
-            if m.create():
+            try:
+                created = m.create()
+            except Exception as e:
+                print(f"Got exception trying to create the metadata record for manifest {f.name}; e: {e}")
+                created = False
+                claims_failed = True
+            if created:
+                self.journal.done(CLAIM, job_id)
                 new_manifest_files.append(f)
+            else:
+                self.journal.abort(CLAIM, job_id)
+        # the outbox is scanned again by the next cycle if a manifest could not be claimed
+        if not claims_failed:
+            self.state.set_outbox_fingerprint(fingerprint)
         return new_manifest_files
 
+    def list_outbox_files(self, path):
+        """
+        List a path in the remote outbox; with os.scandir for a local box and the Tapis Files API otherwise.
+        """
+        return self.list_box_files(self.remote_outbox, path)
+
+    def read_outbox_file(self, path):
+        """
+        Returns the contents of a file in the remote outbox; read from disk for a local box.
+        """
+        return self.read_box_file(self.remote_outbox, path)
+
+    def write_outbox_file(self, path, file):
+        """
+        Write the contents of a file object to a path in the remote outbox; written to disk for a local box.
+        """
+        return self.write_box_file(self.remote_outbox, path, file)
+
+    def list_box_files(self, box, path, recurse=False):
+        """
+        List a path in a remote box; with os.scandir for a local box and the Tapis Files API otherwise.
+        :param recurse: If True, list the files in the subdirectories of path as well.
+        """
+        if box.kind == 'local':
+            return box.list_files(path, recurse=recurse)
+        if recurse:
+            return self.tapis_client.files.listFiles(systemId=box.system_id, path=path, recurse=True)
+        return self.tapis_client.files.listFiles(systemId=box.system_id, path=path)
+
+    def read_box_file(self, box, path):
+        """
+        Returns the contents of a file in a remote box; read from disk for a local box.
+        """
+        if box.kind == 'local':
+            return box.read(path)
+        return self.tapis_client.files.getContents(systemId=box.system_id, path=path)
+
+    def write_box_file(self, box, path, file):
+        """
+        Write the contents of a file object to a path in a remote box; written to disk for a local box.
+        """
+        if box.kind == 'local':
+            return box.write(path, file)
+        return self.tapis_client.files.insert(systemId=box.system_id, path=path, file=file)
+
+    def move_box_file(self, box, path, new_path):
+        """
+        Move a file in a remote box to new_path; renamed on disk for a local box.
+        """
+        if box.kind == 'local':
+            return box.move(path, new_path)
+        return self.tapis_client.files.moveCopy(systemId=box.system_id, path=path, operation='MOVE', newPath=new_path)
+
+    def delete_box_file(self, box, path):
+        """
+        Delete a file in a remote box; removed from disk for a local box.
+        """
+        if box.kind == 'local':
+            return box.delete(path)
+        return self.tapis_client.files.delete(systemId=box.system_id, path=path)
+
+    def download_tapis_file(self, system_id, path, file):
+        """
+        Write the contents of a file on a Tapis system to a file object. The lazy client streams the file in chunks;
+        tapipy's client (tapis_config.client 'tapipy') has no streaming download, so the file is read into memory.
+        """
+        if hasattr(self.tapis_client, 'download'):
+            return self.tapis_client.download(system_id=system_id, path=path, file=file)
+        file.write(self.tapis_client.files.getContents(systemId=system_id, path=path))
+
     def get_remote_id_from_manifest_name(self, file_name):
         """
         Computes the job_id from a manifest file name. This is just the last part of the name, after the
@@ -258,52 +561,227 @@ class TapisPipelineClient(object):
 
     def validate_manifest(self, manifest_file):
         """
-        Determines if a manifest file is valid: downloads the raw bytes, strips newlines and converts to JSON, and then
-        validates against the manifest jsonschema.
+        Determines if a manifest file is valid and its inputs are ready: downloads the raw bytes, strips newlines and
+        converts to JSON, validates against the manifest jsonschema and then checks that every input has finished
+        uploading. A manifest that cannot be read yet or whose inputs are missing or still changing is held in the
+        waiting_for_inputs status (see hold_manifest()) and checked again by the next cycles.
         :param manifest_file: A tapis file object representing a manifest file.
-        :return: bool -- True indicates the manifest file was valid, fale indicates it was invalid.
+        :return: A Manifest if the manifest file was valid and its inputs are ready, False otherwise.
         """
+        remote_id = self.get_remote_id_from_manifest_name(manifest_file.name)
         # parse manifest file and determine what input files are associated with the manifest; check that all
         # associated inputs files exist in the remote outbox.
         try:
-            manifest_bytes = self.tapis_client.files.getContents(systemId=self.remote_outbox.system_id,
-                                                                 path=manifest_file.path)
+            manifest_bytes = self.read_outbox_file(manifest_file.path)
         except Exception as e:
-            # TODO -- we should probably try a certain number of times and then eventually give up on this manifest..
             msg = f"Got exception trying to retrieve manifest file {manifest_file}; Exception: {e}"
             print(msg)
-            m = self.get_meta_helper(self.get_remote_id_from_manifest_name(manifest_file.name))
-            m.update(statuskey=META_ERROR_STATUS_KEY, additional_info={"debug_data": msg})
-            return False
-        # parse and validate the manifest bytestream
+            return self.hold_manifest(manifest_file, reason=msg)
+        # parse and validate the manifest bytestream; the manifest itself may not be completely uploaded yet.
         try:
             manifest = parse_manifest_bytes(manifest_bytes)
         except Exception as e:
             msg = f"Got exception trying to deserialize the manifest file {manifest_file}; Exception: {e}"
             print(msg)
-            m = self.get_meta_helper(self.get_remote_id_from_manifest_name(manifest_file.name))
-            m.update(statuskey=META_ERROR_STATUS_KEY, additional_info={"debug_data": msg})
-            return False
-        # make sure every file listed in the manifest is on the remote system.
+            return self.hold_manifest(manifest_file, reason=msg)
+        # make sure every file listed in the manifest is on the remote system and settled, recording a checksum for
+        # each input for use with the result cache: the md5_checksum from the manifest or, for a local box, the md5
+        # computed from the file. A Tapis box can't compute checksums, so a manifest with an input that has no
+        # md5_checksum gets no cache key, and since the declared checksums can't be verified either, the size and
+        # lastModified of every input are part of the key.
+        now = time.time()
+        previous_inputs = (self.state.get_pending_manifest(remote_id) or {}).get('inputs', {})
+        inputs = {}
+        unsettled = []
+        input_checksums = {}
+        input_sizes = {}
         for f in manifest['files']:
             path = f['file_path']
             try:
-                self.tapis_client.files.listFiles(systemId=self.remote_outbox.system_id,
-                                                  path=path)
+                listing = self.list_outbox_files(path)
+            except errors.ManifestFormatError as e:
+                # e.g., a path outside of a local box; waiting for the next cycle won't fix it.
+                msg = f'Invalid file path: {path} in manifest file: {manifest_file.path}; {e.msg}'
+                print(msg)
+                return self.reject_manifest(manifest_file, reason=msg)
             except Exception as e:
-                # the file either doesn't exist or there was some other problem, so we cannot process this manifest
-                # file.
+                # the file either doesn't exist yet or there was some other problem; try again next cycle.
                 msg = f'Error checking file at path: {path} in manifest file: {manifest_file.path}; exception: {e}'
                 print(msg)
-                m = self.get_meta_helper(self.get_remote_id_from_manifest_name(manifest_file.name))
-                m.update(statuskey=META_ERROR_STATUS_KEY, additional_info={"debug_data": msg})
-                return False
+                return self.hold_manifest(manifest_file, reason=msg, inputs=previous_inputs)
+            if not listing:
+                msg = f'File at path: {path} in manifest file: {manifest_file.path} was not found'
+                print(msg)
+                return self.hold_manifest(manifest_file, reason=msg, inputs=previous_inputs)
+            inputs[path], settled = self.observe_input(f, listing[0], previous_inputs.get(path, {}), now)
+            if not settled:
+                unsettled.append(path)
+            elif not f.get('md5_checksum') and self.result_cache and self.remote_outbox.kind == 'local':
+                # as with md5_matches, only computed again when the file changed.
+                if 'md5' not in inputs[path]:
+                    try:
+                        inputs[path]['md5'] = get_md5(self.remote_outbox.get_local_path(path))
+                    except OSError as e:
+                        print(f"Got exception computing the md5 checksum of {path}; e: {e}")
+                        inputs[path]['md5'] = None
+            checksum = (f.get('md5_checksum') or '').lower() or inputs[path].get('md5')
+            if checksum and input_checksums is not None:
+                input_checksums[path] = checksum
+            else:
+                input_checksums = None
+            input_sizes[path] = listing[0].size
+        if unsettled:
+            msg = f"Inputs of manifest file {manifest_file.path} are still being uploaded or do not match their " \
+                  f"md5_checksum: {unsettled}"
+            print(msg)
+            return self.hold_manifest(manifest_file, reason=msg, inputs=inputs)
+        if self.result_cache and input_checksums is None:
+            print(f"Not using the result cache for manifest {manifest_file.path}: not every input has an "
+                  f"md5_checksum.")
+        input_observations = None
+        if not self.remote_outbox.kind == 'local':
+            input_observations = {path: record['observation'] for path, record in inputs.items()}
+        self.state.remove_pending_manifest(remote_id)
         # create an honest Manifest object
         return Manifest(pipeline_name=self.name,
                         file_path=manifest_file.path,
-                        remote_id=self.get_remote_id_from_manifest_name(manifest_file.name),
+                        remote_id=remote_id,
                         tapis_url=manifest_file.uri,
-                        inputs=manifest.files)
+                        inputs=manifest.files,
+                        input_checksums=input_checksums,
+                        input_observations=input_observations,
+                        input_sizes=input_sizes)
+
+    def observe_input(self, f, listing, previous, now):
+        """
+        Records the latest observation of an input of a manifest and decides whether the input has finished
+        uploading: its md5_checksum in the manifest matches the file (local boxes only), or it is settled (see
+        core.settling.is_settled()).
+        :param f: The entry for the input in the manifest.
+        :param listing: The file listing of the input.
+        :param previous: The record for the input from the previous validation of the manifest, or {}.
+        :param now: (float) The time of the observation.
+        :return: tuple of (the record for the input, bool -- whether the input is ready).
+        """
+        path = f['file_path']
+        observation = get_observation(listing)
+        record = dict(previous) if previous.get('observation') == observation else {
+            'observation': observation, 'observed_at': now}
+        if f.get('md5_checksum') and self.remote_outbox.kind == 'local':
+            # the checksum is only computed again when the file changed.
+            if 'md5_matches' not in record:
+                try:
+                    md5 = get_md5(self.remote_outbox.get_local_path(path))
+                except OSError as e:
+                    print(f"Got exception computing the md5 checksum of {path}; e: {e}")
+                    md5 = None
+                record['md5_matches'] = md5 == f['md5_checksum'].lower()
+            return record, record['md5_matches']
+        return record, is_settled(observation, previous.get('observation'), record['observed_at'], now,
+                                  settle_seconds=self.settle_seconds)
+
+    def reject_manifest(self, manifest_file, reason):
+        """
+        Set a manifest that can never be valid to ERROR, so that it is not validated again.
+        :return: False, so that callers can return the result of validate_manifest().
+        """
+        remote_id = self.get_remote_id_from_manifest_name(manifest_file.name)
+        m = self.get_meta_helper(remote_id=remote_id)
+        m.update(statuskey=META_ERROR_STATUS_KEY, additional_info={"debug_data": reason})
+        self.state.remove_pending_manifest(remote_id)
+        return False
+
+    def hold_manifest(self, manifest_file, reason, inputs=None):
+        """
+        Hold a manifest whose inputs are not ready in the waiting_for_inputs status, recording the observations of
+        its inputs so that the next cycle can tell whether they are still changing. Once the manifest has waited for
+        more than max_pending_minutes, it is set to ERROR instead.
+        :param manifest_file: A tapis file object representing a manifest file.
+        :param reason: (str) Why the manifest is not ready.
+        :param inputs: (dict) The latest observation of each input; see validate_manifest().
+        :return: False, so that callers can return the result of validate_manifest().
+        """
+        remote_id = self.get_remote_id_from_manifest_name(manifest_file.name)
+        m = self.get_meta_helper(remote_id)
+        now = time.time()
+        record = self.state.get_pending_manifest(remote_id)
+        if record is None:
+            record = {'manifest_file': {'name': manifest_file.name, 'path': manifest_file.path,
+                                        'uri': manifest_file.uri},
+                      'since': now}
+            m.update(statuskey=META_WAITING_STATUS_KEY,
+                     additional_info={"manifest_file": record['manifest_file'], "debug_data": reason})
+        elif now - record['since'] > self.max_pending_minutes * 60:
+            msg = f"Gave up waiting for the inputs of manifest {manifest_file.path} after " \
+                  f"{self.max_pending_minutes} minutes; {reason}"
+            print(msg)
+            m.update(statuskey=META_ERROR_STATUS_KEY, additional_info={"debug_data": msg})
+            self.state.remove_pending_manifest(remote_id)
+            return False
+        record['inputs'] = inputs if inputs is not None else record.get('inputs', {})
+        record['reason'] = reason
+        self.state.set_pending_manifest(remote_id, record)
+        return False
+
+    def get_pending_manifest_files(self):
+        """
+        Returns the manifest files held in the waiting_for_inputs status by earlier cycles, to be validated again.
+        Whenever manifests are pending, their metadata is read again so that a manifest whose job was submitted by a
+        run that did not save the local state (e.g., one that crashed) is not submitted a second time.
+        :return: list of Config objects with the name, path and uri of each manifest file.
+        """
+        pending = self.state.get_pending_manifests()
+        if pending is None or pending:
+            try:
+                jobs = self.get_all_remote_job_ids(statuses=[WAITING_FOR_INPUTS_STATUS], raise_on_error=True)
+            except Exception:
+                return []
+            self.state.set_pending_manifests(jobs)
+            pending = self.state.get_pending_manifests()
+        return [Config(record['manifest_file']) for record in pending.values()]
+
+    def get_cache_key_for_manifest(self, manifest):
+        """
+        Returns the result cache key for a manifest, or None if the result cache is not enabled.
+        :param manifest: An instance of a Manifest.
+        :return:
+        """
+        if not self.result_cache or manifest.input_checksums is None or not self.pipeline_job.kind == 'tapis_app':
+            return None
+        return ResultCache.get_cache_key(app_id=self.pipeline_job.app_id,
+                                         app_version=self.pipeline_job.app_version,
+                                         input_checksums=manifest.input_checksums,
+                                         input_observations=manifest.input_observations)
+
+    def complete_manifest_from_cache(self, manifest):
+        """
+        Checks the result cache for a prior job that processed the same inputs with the same app version. If one is
+        found, the manifest is marked FINISHED and linked to the prior job instead of submitting a new job.
+        :param manifest: An instance of a Manifest; e.g., as generated from a call to validate_manifest().
+        :return: A CompletedJob for the prior Tapis job whose outputs satisfy this manifest, or None if there was no
+        usable cache entry.
+        """
+        cache_key = self.get_cache_key_for_manifest(manifest)
+        if not cache_key:
+            return None
+        entry = self.result_cache.get(cache_key)
+        if not entry:
+            return None
+        try:
+            tapis_job = self.tapis_client.jobs.getJob(jobUuid=entry['tapis_job_uuid'])
+        except Exception as e:
+            print(f"Got exception trying to look up cached job {entry['tapis_job_uuid']}; will submit a new job; "
+                  f"e: {e}")
+            return None
+        print(f"Inputs for manifest {manifest.remote_id} were already processed by job {tapis_job.uuid}; "
+              f"using its outputs.")
+        info = {"kind": "result_cache",
+                "tapis_job_uuid": tapis_job.uuid,
+                "tapis_job_status": tapis_job.status,
+                "cache_key": cache_key,
+                "cached_from_remote_id": entry['remote_id']}
+        self.record_status(manifest.remote_id, statuskey='FINISHED', additional_info=info)
+        return CompletedJob(remote_id=manifest.remote_id, tapis_job=tapis_job)
 
     def get_tapis_job_dict_for_manifest(self, manifest):
         """
@@ -326,32 +804,113 @@ class TapisPipelineClient(object):
             }]
         }
         # now add additional inputs --
-        for inp in manifest.inputs:
-            inp_path = inp['file_path']
+        input_dir = None
+        if self.pipeline_job.input_staging == 'directory':
+            input_dir = self.get_input_staging_dir(manifest)
+        if self.pipeline_job.input_staging == 'archive':
+            # a single input for the archive created by pack_manifest_inputs(); the job unpacks it.
+            archive_name = os.path.basename(manifest.input_archive_path)
+            job['fileInputs'].append({
+                "sourceUrl": f"tapis://{self.remote_outbox.system_id}/{manifest.input_archive_path}",
+                "targetPath": archive_name
+            })
+            job['parameterSet'] = {"envVariables": [{"key": INPUT_ARCHIVE_ENV_VAR, "value": archive_name}]}
+        elif input_dir:
+            # a single input for the deepest directory containing every input file.
             job['fileInputs'].append({
-                # "sourceUrl": f"tapis://{self.tapis_client.tenant_id}/{self.remote_outbox.system_id}/{inp_path}",
-                "sourceUrl": f"tapis://{self.remote_outbox.system_id}/{inp_path}",
-                "targetPath": inp_path
+                "sourceUrl": f"tapis://{self.remote_outbox.system_id}/{input_dir}",
+                "targetPath": input_dir.strip('/')
             })
+        else:
+            for inp in manifest.inputs:
+                inp_path = inp['file_path']
+                job['fileInputs'].append({
+                    # "sourceUrl": f"tapis://{self.tapis_client.tenant_id}/{self.remote_outbox.system_id}/{inp_path}",
+                    "sourceUrl": f"tapis://{self.remote_outbox.system_id}/{inp_path}",
+                    "targetPath": inp_path
+                })
         return job
 
-    def submit_job_for_manifest(self, manifest):
+    def get_input_staging_dir(self, manifest):
+        """
+        Returns the deepest directory containing every input file of a manifest, to be staged as a single input for
+        'directory' input staging, or None if that directory cannot be staged: it is the root of the system or it
+        contains the remote outbox, whose manifests (and every other pipeline's inputs) would be staged as well, or,
+        for a fan-out shard, it contains inputs of the other shards. The inputs of such manifests are staged file by
+        file instead.
         """
-        Submit a new pipeline job for a manifest object.
+        paths = [inp['file_path'].strip('/') for inp in manifest.inputs]
+        input_dir = os.path.dirname(os.path.commonprefix(paths))
+        outbox_path = self.remote_outbox.path.strip('/')
+        if not input_dir or outbox_path == input_dir or outbox_path.startswith(f'{input_dir}/'):
+            print(f"Cannot stage directory '{input_dir}' for manifest {manifest.remote_id} since it is the root of "
+                  f"the system or contains the remote outbox; staging its input files one by one.")
+            return None
+        other_shard_paths = [inp['file_path'].strip('/') for inp in manifest.parent_inputs or []
+                             if inp['file_path'].strip('/') not in paths]
+        if any(path.startswith(f'{input_dir}/') for path in other_shard_paths):
+            print(f"Cannot stage directory '{input_dir}' for shard {manifest.remote_id} since it contains inputs of "
+                  f"other shards; staging its input files one by one.")
+            return None
+        return input_dir
+
+    def pack_manifest_inputs(self, manifest):
+        """
+        Packs all input files for a manifest into a single tar archive (gzip-compressed if configured) and uploads it
+        to the remote outbox so that the job stages one file instead of one per input. On success, sets the
+        input_archive_path attribute on the manifest. The archive is deleted once the job reaches a terminal state
+        (see delete_input_archive()).
         :param manifest: An instance of a Manifest; e.g., as generated from a call to validate_manifest().
-        :return:
+        :return: bool -- True if the archive was created and uploaded.
+        """
+        m = self.get_meta_helper(remote_id=manifest.parent_remote_id or manifest.remote_id)
+        m.update(statuskey='pack_input')
+        extension = 'tar.gz' if self.pipeline_job.compress_input_archive else 'tar'
+        mode = 'w:gz' if self.pipeline_job.compress_input_archive else 'w'
+        archive_path = os.path.join(self.remote_outbox.path, INPUT_ARCHIVE_DIR, f'{manifest.remote_id}.{extension}')
+        try:
+            with tempfile.TemporaryFile() as archive_file:
+                with tarfile.open(fileobj=archive_file, mode=mode) as archive:
+                    # 'archive' staging requires a local remote outbox; see parse_pipeline_job_config()
+                    for inp in manifest.inputs:
+                        inp_path = inp['file_path']
+                        archive.add(self.remote_outbox.get_local_path(inp_path), arcname=inp_path.lstrip('/'))
+                archive_file.seek(0)
+                self.write_outbox_file(archive_path, archive_file)
+        except Exception as e:
+            msg = f"Got exception trying to pack inputs for manifest {manifest.remote_id} into archive " \
+                  f"{archive_path}; e: {e}"
+            print(msg)
+            m.update(statuskey=META_ERROR_STATUS_KEY, additional_info={"debug_data": msg})
+            return False
+        manifest.input_archive_path = archive_path
+        m.update(statuskey='pack_input_done', additional_info={"input_archive_path": archive_path})
+        return True
+
+    def delete_input_archive(self, remote_id, archive_path):
+        """
+        Delete the input archive of a job from the remote outbox once the job no longer needs it: it has reached a
+        terminal state or could not be submitted. Failures are only printed; a leftover archive does no harm.
+        :param remote_id: The remote_id of the manifest, for the log messages.
+        :param archive_path: The path of the archive in the remote outbox, or None if the job's inputs were not packed.
+        """
+        if not archive_path:
+            return
+        try:
+            self.delete_box_file(self.remote_outbox, archive_path)
+        except Exception as e:
+            print(f"Got exception trying to delete input archive {archive_path} for {remote_id}; e: {e}")
+
+    def submit_tapis_job(self, job, manifest):
+        """
+        Submit a Tapis job, printing debug data if the submission fails.
+        :param job: The job description; e.g., as generated from a call to get_tapis_job_dict_for_manifest().
+        :param manifest: The Manifest the job is for; used in messages.
+        :return: The Tapis job response, or None if the job could not be submitted.
         """
-        # when submitting a job to process manifest file and associated inputs.
-        if not self.remote_outbox.kind == 'tapis':
-            raise NotImplementedError(f"Currently only support kind 'tapis' for remote_outbox configs. "
-                                      f"Found: {self.config.remote_outbox['kind']}")
-        if not self.pipeline_job.kind == 'tapis_app':
-            raise NotImplementedError(f"Currently only support kind 'tapis_app' for pipeline jobs. "
-                                      f"Found: {self.pipeline_job.kind}")
-        job = self.get_tapis_job_dict_for_manifest(manifest)
         print(f"submitting job: {job}")
         try:
-            job_response = self.tapis_client.jobs.submitJob(**job)
+            return self.tapis_client.jobs.submitJob(**job)
         except Exception as e:
             msg = f"Got exception trying to submit Tapis job for pipeline job manifest: {manifest}; e: {e}\n"
             print(msg)
@@ -362,22 +921,258 @@ class TapisPipelineClient(object):
                 print(msg)
             except Exception as e:
                 print(f"Couldn't print extra debug info; exception: {e}")
-                # TODO -- if we could not submit the job, we need to set the manifest to an error state;
-                # however it might be best to try the job a few times before setting it to error.
-                m = self.get_meta_helper(remote_id=manifest.remote_id)
-                m.update(statuskey=META_ERROR_STATUS_KEY, additional_info={"debug_data": msg})
-                return None
+            return None
+
+    def submit_job_for_manifest(self, manifest):
+        """
+        Submit a new pipeline job for a manifest object. If the pipeline job is configured to fan out, one job is
+        submitted per shard of the manifest's files instead (see submit_fan_out_jobs_for_manifest()).
+        :param manifest: An instance of a Manifest; e.g., as generated from a call to validate_manifest().
+        :return:
+        """
+        # when submitting a job to process manifest file and associated inputs.
+        if self.remote_outbox.kind not in ['tapis', 'local']:
+            raise NotImplementedError(f"Currently only support kinds 'tapis' and 'local' for remote_outbox configs. "
+                                      f"Found: {self.config.remote_outbox['kind']}")
+        if self.pipeline_job.kind == 'tapis_actor':
+            return self.send_manifests_to_actor([manifest])
+        if not self.pipeline_job.kind == 'tapis_app':
+            raise NotImplementedError(f"Currently only support kinds 'tapis_app' and 'tapis_actor' for pipeline jobs. "
+                                      f"Found: {self.pipeline_job.kind}")
+        if self.pipeline_job.fan_out:
+            fan_out = self.pipeline_job.fan_out
+            shards = split_inputs(manifest.inputs,
+                                  shard_count=fan_out['shard_count'],
+                                  shard_by=fan_out.get('shard_by', 'count'),
+                                  input_sizes=manifest.input_sizes,
+                                  min_files_per_shard=fan_out.get('min_files_per_shard', 1))
+            if len(shards) > 1:
+                return self.submit_fan_out_jobs_for_manifest(manifest, shards)
+        if self.pipeline_job.input_staging == 'archive' and not self.pack_manifest_inputs(manifest):
+            return None
+        job = self.get_tapis_job_dict_for_manifest(manifest)
+        self.journal.intent(SUBMIT, manifest.remote_id, job_names=[job['name']], app_id=job['appId'])
+        job_response = self.submit_tapis_job(job, manifest)
+        if not job_response:
+            self.delete_input_archive(manifest.remote_id, manifest.input_archive_path)
+            m = self.get_meta_helper(remote_id=manifest.remote_id)
+            m.update(statuskey=META_ERROR_STATUS_KEY,
+                     additional_info={"debug_data": f"Could not submit Tapis job for manifest {manifest.remote_id}"})
+            self.journal.abort(SUBMIT, manifest.remote_id)
+            return None
         # update the metadata with the new tapis job --
-        m = self.get_meta_helper(remote_id=manifest.remote_id)
         info = {"kind": "tapis_job",
                 "tapis_job_uuid": job_response.uuid,
-                "tapis_job_status": job_response.status}
-        m.update(statuskey='JOB_SUBMITTED_TO_TAPIS', additional_info=info)
+                "tapis_job_status": job_response.status,
+                "cache_key": self.get_cache_key_for_manifest(manifest)}
+        if manifest.input_archive_path:
+            info['input_archive_path'] = manifest.input_archive_path
+        self.journal.done(SUBMIT, manifest.remote_id, info=info)
+        self.record_status(manifest.remote_id, statuskey='JOB_SUBMITTED_TO_TAPIS', additional_info=info)
+        self.state.add_in_flight_job(name=manifest.remote_id, additional_info=info)
+        return job_response
+
+    def submit_jobs_for_manifests(self, manifests):
+        """
+        Submit pipeline jobs for a list of manifests. For a tapis_actor pipeline job with a batch_size greater than 1,
+        the manifests are sent to the actor in batches of up to batch_size manifests per message; otherwise, one job is
+        submitted per manifest (see submit_job_for_manifest()).
+        :param manifests: list of Manifest objects; e.g., as generated from calls to validate_manifest().
+        :return:
+        """
+        if self.pipeline_job.kind == 'tapis_actor' and self.pipeline_job.batch_size > 1:
+            batch_size = self.pipeline_job.batch_size
+            for i in range(0, len(manifests), batch_size):
+                self.send_manifests_to_actor(manifests[i:i + batch_size])
+            return
+        for manifest in manifests:
+            self.submit_job_for_manifest(manifest)
+
+    def get_actor_message_for_manifests(self, manifests):
+        """
+        Returns the JSON message sent to the pipeline's actor for a list of manifests.
+        """
+        return {"pipeline_name": self.name,
+                "remote_outbox": {"kind": self.remote_outbox.kind,
+                                  "system_id": self.remote_outbox.system_id,
+                                  "path": self.remote_outbox.path},
+                "manifests": [{"remote_id": manifest.remote_id,
+                               "manifest_path": manifest.file_path,
+                               "manifest_url": manifest.tapis_url,
+                               "inputs": manifest.inputs} for manifest in manifests]}
+
+    def send_manifests_to_actor(self, manifests):
+        """
+        Send one message with a list of manifests to the pipeline's actor. The execution id of the resulting actor
+        execution is recorded in the metadata of every manifest in the message.
+        :param manifests: list of Manifest objects.
+        :return: The execution id, or None if the message could not be sent.
+        """
+        actor_id = self.pipeline_job.actor_id
+        for manifest in manifests:
+            self.journal.intent(SUBMIT, manifest.remote_id, actor_id=actor_id)
+        try:
+            response = self.tapis_client.actors.send_message(
+                actor_id=actor_id, message=self.get_actor_message_for_manifests(manifests))
+        except Exception as e:
+            msg = f"Got exception trying to send manifests {[m.remote_id for m in manifests]} to actor {actor_id}; " \
+                  f"e: {e}"
+            print(msg)
+            for manifest in manifests:
+                m = self.get_meta_helper(remote_id=manifest.remote_id)
+                m.update(statuskey=META_ERROR_STATUS_KEY, additional_info={"debug_data": msg})
+                self.journal.abort(SUBMIT, manifest.remote_id)
+            return None
+        for manifest in manifests:
+            info = {"kind": "tapis_actor",
+                    "actor_id": actor_id,
+                    "execution_id": response.executionId,
+                    "execution_status": "SUBMITTED",
+                    "batch": [m.remote_id for m in manifests]}
+            self.journal.done(SUBMIT, manifest.remote_id, info=info)
+            self.record_status(manifest.remote_id, statuskey='JOB_SUBMITTED_TO_TAPIS', additional_info=info)
+            self.state.add_in_flight_job(name=manifest.remote_id, additional_info=info)
+        return response.executionId
 
-    def get_all_remote_job_ids(self, statuses=[]):
+    def get_actor_executions(self, actor_id):
+        """
+        Returns the executions of an actor, as a dictionary mapping execution id to execution summary, with one
+        Tapis call; or None if the call failed.
+        """
+        try:
+            result = self.tapis_client.actors.list_executions(actor_id=actor_id)
+        except Exception as e:
+            print(f"Got exception trying to list the executions of actor {actor_id}; e: {e}")
+            return None
+        return {execution.id: execution for execution in result.executions}
+
+    def get_actor_execution_status(self, actor_id, execution_id):
+        """
+        Returns the final status of a completed actor execution: FINISHED if it exited with code 0 and FAILED
+        otherwise; or None if the execution could not be looked up.
+        """
+        try:
+            execution = self.tapis_client.actors.get_execution(actor_id=actor_id, execution_id=execution_id)
+        except Exception as e:
+            print(f"Got exception trying to look up execution {execution_id} of actor {actor_id}; e: {e}")
+            return None
+        return 'FINISHED' if str(getattr(execution, 'exit_code', 0)) == '0' else 'FAILED'
+
+    def check_actor_job(self, job, executions, final_statuses):
+        """
+        Checks the actor execution of an in-flight job against the executions listed for the actor, marking the job
+        FINISHED or FAILED once the execution is done. Actors write their own outputs, so nothing is returned for
+        remote transfer.
+        :param job: The in-flight job record from the metadata, with kind 'tapis_actor'.
+        :param executions: The actor's executions, from get_actor_executions().
+        :param final_statuses: dict caching the final status of each execution id, shared by the jobs in a batch.
+        :return:
+        """
+        info = job['additional_info']
+        execution = executions.get(info['execution_id'])
+        if not execution:
+            return
+        if execution.status in ACTOR_EXECUTION_ERROR_STATES:
+            final_statuses[info['execution_id']] = 'FAILED'
+        elif execution.status in ACTOR_EXECUTION_COMPLETE_STATES and info['execution_id'] not in final_statuses:
+            final_statuses[info['execution_id']] = self.get_actor_execution_status(info['actor_id'],
+                                                                                   info['execution_id'])
+        final_status = final_statuses.get(info['execution_id'])
+        if not final_status:
+            return
+        info['execution_status'] = execution.status
+        self.record_status(job['name'], statuskey=final_status, additional_info=info)
+        self.state.remove_in_flight_job(name=job['name'])
+
+    def submit_fan_out_jobs_for_manifest(self, manifest, shards):
+        """
+        Submit one job per shard of a manifest's files. A manifest listing only the shard's files is written to the
+        remote outbox for each shard and used as the shard job's manifest input. The shard jobs are tracked in the
+        additional_info of the manifest's metadata.
+        :param manifest: An instance of a Manifest; e.g., as generated from a call to validate_manifest().
+        :param shards: (list) The manifest's inputs split into shards; e.g., by split_inputs().
+        :return:
+        """
+        info = {"kind": "fan_out",
+                "manifest_path": manifest.file_path,
+                "tapis_job_name": manifest.tapis_job_name,
+                "shards": []}
+        shard_manifests = []
+        for idx, shard_inputs in enumerate(shards):
+            shard_remote_id = f'{manifest.remote_id}.shard{idx}'
+            shard_manifests.append(Manifest(pipeline_name=self.name,
+                                            file_path=os.path.join(self.remote_outbox.path, SHARD_MANIFEST_DIR,
+                                                                   f'{shard_remote_id}.json'),
+                                            remote_id=shard_remote_id,
+                                            tapis_url=None,
+                                            inputs=shard_inputs,
+                                            parent_remote_id=manifest.remote_id,
+                                            parent_inputs=manifest.inputs))
+        self.journal.intent(SUBMIT, manifest.remote_id, job_names=[s.tapis_job_name for s in shard_manifests],
+                            app_id=self.pipeline_job.app_id)
+        for idx, shard_manifest in enumerate(shard_manifests):
+            try:
+                self.write_outbox_file(shard_manifest.file_path,
+                                       io.BytesIO(json.dumps({"files": shard_manifest.inputs}).encode('utf-8')))
+            except Exception as e:
+                msg = f"Got exception trying to write shard manifest {shard_manifest.file_path}; e: {e}"
+                print(msg)
+                return self.fail_fan_out_submission(manifest, info, msg)
+            if self.pipeline_job.input_staging == 'archive' and not self.pack_manifest_inputs(shard_manifest):
+                return self.fail_fan_out_submission(manifest, info, f"Could not pack the inputs of shard {idx} of "
+                                                                    f"manifest {manifest.remote_id}")
+            job_response = self.submit_tapis_job(self.get_tapis_job_dict_for_manifest(shard_manifest), shard_manifest)
+            if not job_response:
+                self.delete_input_archive(shard_manifest.remote_id, shard_manifest.input_archive_path)
+                return self.fail_fan_out_submission(manifest, info, f"Could not submit Tapis job for shard {idx} of "
+                                                                    f"manifest {manifest.remote_id}")
+            info['shards'].append({"shard": idx,
+                                   "manifest_path": shard_manifest.file_path,
+                                   "tapis_job_uuid": job_response.uuid,
+                                   "tapis_job_status": job_response.status})
+            if shard_manifest.input_archive_path:
+                info['shards'][-1]['input_archive_path'] = shard_manifest.input_archive_path
+        self.journal.done(SUBMIT, manifest.remote_id, info=info)
+        self.record_status(manifest.remote_id, statuskey='JOB_SUBMITTED_TO_TAPIS', additional_info=info)
+        self.state.add_in_flight_job(name=manifest.remote_id, additional_info=info)
+        return info['shards']
+
+    def fail_fan_out_submission(self, manifest, info, msg):
+        """
+        Set a manifest whose fan-out submission failed part way to the error status. The shard jobs that were already
+        submitted are cancelled so that they do not run without a gather job; they are recorded, with the status they
+        were left in, in the additional_info of the manifest's metadata.
+        :param manifest: The manifest whose shard jobs were being submitted.
+        :param info: The fan-out additional_info built so far by submit_fan_out_jobs_for_manifest().
+        :param msg: (str) A description of the failure.
+        :return: None
+        """
+        for shard in info['shards']:
+            if self.cancel_tapis_job(shard['tapis_job_uuid']):
+                shard['tapis_job_status'] = 'CANCELLED'
+                self.delete_input_archive(manifest.remote_id, shard.get('input_archive_path'))
+        m = self.get_meta_helper(remote_id=manifest.remote_id)
+        m.update(statuskey=META_ERROR_STATUS_KEY, additional_info=dict(info, debug_data=msg))
+        self.journal.abort(SUBMIT, manifest.remote_id)
+        return None
+
+    def cancel_tapis_job(self, job_uuid):
+        """
+        Cancel a Tapis job, printing the exception if it could not be cancelled.
+        :return: bool -- True if the job was cancelled.
+        """
+        try:
+            self.tapis_client.jobs.cancelJob(jobUuid=job_uuid)
+        except Exception as e:
+            print(f"Got exception trying to cancel Tapis job {job_uuid}; e: {e}")
+            return False
+        return True
+
+    def get_all_remote_job_ids(self, statuses=[], raise_on_error=False):
         """
         Helper method to read the metadata and get all remote job id's with status in a list of specified statuses.
         :param status: A list of statuses to filter all jobs by.
+        :param raise_on_error: Whether to raise the exception when a query fails instead of returning partial results.
         :return:
         """
         result = []
@@ -394,52 +1189,564 @@ class TapisPipelineClient(object):
                           f'Request: {e.request.url}; {e.request.method}; body: {e.request.body}; ' \
                           f'Response: {e.response.content}'
                     print(msg)
-                except Exception as e:
-                    print(f"Couldn't print extra debug info; exception: {e}")
+                except Exception as debug_e:
+                    print(f"Couldn't print extra debug info; exception: {debug_e}")
+                if raise_on_error:
+                    raise e
                 # TODO -- need to fail something in this case...
         return result
 
     def check_for_completed_pipeline_jobs(self):
         """
         Reads the metadata for existing jobs in flight and checks with Tapis to determine if those jobs (i.e., actor
-        executions or job executions) have completed.
+        executions or job executions) have completed. Each job is only polled once its next_poll_at (see
+        schedule_next_poll()) has passed.
         :return: a list of pipeline jobs that have just completed processing and need are ready for remote transfer.
         """
         completed_jobs = []
-        # get the list of metadata jobs in status "processing_data"
-        jobs = self.get_all_remote_job_ids(statuses=["JOB_SUBMITTED_TO_TAPIS"])
-        for job in jobs:
+        # get the list of metadata jobs in status "processing_data"; the list stored by a recent cycle is used when
+        # available since only this software moves jobs in and out of that status.
+        jobs = self.state.get_in_flight_jobs()
+        if jobs is None:
+            try:
+                jobs = self.get_all_remote_job_ids(statuses=["JOB_SUBMITTED_TO_TAPIS"], raise_on_error=True)
+            except Exception:
+                return completed_jobs
+            self.state.set_in_flight_jobs(jobs)
+        if not jobs:
+            print("No pipeline jobs in flight.")
+            return completed_jobs
+        now = time.time()
+        # the executions of each actor are listed once per cycle, for all of the actor's jobs in flight
+        actor_executions = {}
+        actor_final_statuses = {}
+        for job in list(jobs):
+            if not self.state.is_poll_due(job['name'], now):
+                continue
+            if job['additional_info'].get('kind') == 'fan_out':
+                completed_jobs.extend(self.check_fan_out_job(job, now))
+                continue
+            if job['additional_info'].get('kind') == 'tapis_actor':
+                actor_id = job['additional_info']['actor_id']
+                if actor_id not in actor_executions:
+                    actor_executions[actor_id] = self.get_actor_executions(actor_id)
+                if actor_executions[actor_id] is not None:
+                    self.check_actor_job(job, actor_executions[actor_id], actor_final_statuses)
+                continue
             # get job uuid
             job_uuid = job['additional_info']['tapis_job_uuid']
             # check if any of the corresponding tapis jobs have completed
-            try:
-                tapis_job = self.tapis_client.jobs.getJob(jobUuid=job_uuid)
-            except Exception as e:
-                msg = f"Got exception trying to look up job in Tapis for job: {job_uuid}; e: {e}\n"
-                print(msg)
-                try:
-                    msg = f"Additional debug data:\n" \
-                          f'Request: {e.request.url}; {e.request.method}; body: {e.request.body}; ' \
-                          f'Response: {e.response.content}'
-                    print(msg)
-                except Exception as e:
-                    print(f"Couldn't print extra debug info; exception: {e}")
+            tapis_job = self.get_tapis_job(job_uuid)
+            if not tapis_job:
                 # TODO -- do we need to fail the job??
                 continue
             if tapis_job.status in TERMINAL_JOB_STATES:
-                m = self.get_meta_helper(remote_id=job['name'])
-                m.update(statuskey=tapis_job.status)
-                completed_jobs.append(tapis_job)
+                self.delete_input_archive(job['name'], job['additional_info'].get('input_archive_path'))
+                self.record_status(job['name'], statuskey=tapis_job.status)
+                completed_jobs.append(CompletedJob(remote_id=job['name'], tapis_job=tapis_job))
+                self.state.remove_in_flight_job(name=job['name'])
+                cache_key = job['additional_info'].get('cache_key')
+                if self.result_cache and cache_key and tapis_job.status == 'FINISHED':
+                    self.result_cache.add(cache_key=cache_key, tapis_job_uuid=job_uuid, remote_id=job['name'])
+            else:
+                self.schedule_next_poll(job, tapis_job, now)
         return completed_jobs
 
+    def get_tapis_job(self, job_uuid):
+        """
+        Look up a Tapis job, printing debug data if the lookup fails.
+        :param job_uuid: The uuid of the Tapis job.
+        :return: The Tapis job object, or None if the lookup failed.
+        """
+        try:
+            return self.tapis_client.jobs.getJob(jobUuid=job_uuid)
+        except Exception as e:
+            msg = f"Got exception trying to look up job in Tapis for job: {job_uuid}; e: {e}\n"
+            print(msg)
+            try:
+                msg = f"Additional debug data:\n" \
+                      f'Request: {e.request.url}; {e.request.method}; body: {e.request.body}; ' \
+                      f'Response: {e.response.content}'
+                print(msg)
+            except Exception as e:
+                print(f"Couldn't print extra debug info; exception: {e}")
+            return None
+
+    def check_fan_out_job(self, job, now):
+        """
+        Polls the shard jobs of a fan-out pipeline job that have not yet reached a terminal state. Once every shard
+        job is terminal, either submits the gather job (if one is configured and all shards finished) or marks the
+        pipeline job FINISHED or FAILED.
+        :param job: The in-flight job record from the metadata, with kind 'fan_out'.
+        :param now: (float) The time of the poll.
+        :return: a list of CompletedJob objects whose outputs are ready for remote transfer; the outputs of each shard
+        job are delivered to a shard<N> directory.
+        """
+        info = job['additional_info']
+        tapis_jobs = {}
+        first_running = None
+        changed = False
+        for shard in info['shards']:
+            if shard['tapis_job_status'] in TERMINAL_JOB_STATES:
+                continue
+            tapis_job = self.get_tapis_job(shard['tapis_job_uuid'])
+            if not tapis_job:
+                return []
+            tapis_jobs[shard['shard']] = tapis_job
+            if tapis_job.status in TERMINAL_JOB_STATES:
+                shard['tapis_job_status'] = tapis_job.status
+                self.delete_input_archive(job['name'], shard.get('input_archive_path'))
+                changed = True
+            elif not first_running:
+                first_running = tapis_job
+        m = self.get_meta_helper(remote_id=job['name'])
+        if first_running:
+            if changed:
+                m.update(statuskey='JOB_SUBMITTED_TO_TAPIS', additional_info=info)
+                self.state.update_in_flight_job(name=job['name'], additional_info=info)
+            self.schedule_next_poll(job, first_running, now)
+            return []
+        # every shard is terminal; look up the shard jobs not polled in this cycle.
+        for shard in info['shards']:
+            if shard['shard'] not in tapis_jobs:
+                tapis_job = self.get_tapis_job(shard['tapis_job_uuid'])
+                if not tapis_job:
+                    return []
+                tapis_jobs[shard['shard']] = tapis_job
+        all_finished = all(shard['tapis_job_status'] == 'FINISHED' for shard in info['shards'])
+        if all_finished and self.pipeline_job.fan_out.get('gather_app_id'):
+            self.submit_gather_job(job, tapis_jobs)
+            return []
+        status = 'FINISHED' if all_finished else 'FAILED'
+        self.record_status(job['name'], statuskey=status, additional_info=info)
+        self.state.remove_in_flight_job(name=job['name'])
+        return [CompletedJob(remote_id=job['name'],
+                             tapis_job=tapis_jobs[shard['shard']],
+                             output_dir=f"shard{shard['shard']}",
+                             status=status) for shard in info['shards']]
+
+    def submit_gather_job(self, job, tapis_jobs):
+        """
+        Submit the gather job for a fan-out pipeline job whose shard jobs have all finished. The gather job gets the
+        pipeline manifest and, as shard<N>, the output directory of each shard job. The pipeline job then tracks the
+        gather job like any other Tapis job.
+        :param job: The in-flight job record from the metadata, with kind 'fan_out'.
+        :param tapis_jobs: (dict) Mapping of shard number to finished Tapis shard job.
+        :return:
+        """
+        fan_out = self.pipeline_job.fan_out
+        info = job['additional_info']
+        gather_job = {
+            "name": info['tapis_job_name'],
+            "appId": fan_out['gather_app_id'],
+            "appVersion": fan_out['gather_app_version'],
+            "fileInputs": [{
+                "sourceUrl": f"tapis://{self.remote_outbox.system_id}/{info['manifest_path']}",
+                "meta": {
+                    "name": fan_out.get('gather_manifest_input_name', 'manifest'),
+                    "required": True
+                }
+            }]
+        }
+        for shard_number, tapis_job in sorted(tapis_jobs.items()):
+            gather_job['fileInputs'].append({
+                "sourceUrl": f"tapis://{tapis_job.archiveSystemId}/{tapis_job.archiveSystemDir}",
+                "targetPath": f"shard{shard_number}"
+            })
+        m = self.get_meta_helper(remote_id=job['name'])
+        self.journal.intent(SUBMIT, job['name'], job_names=[gather_job['name']], app_id=gather_job['appId'],
+                            gather=True)
+        job_response = self.submit_tapis_job(gather_job, job['name'])
+        if not job_response:
+            msg = f"Could not submit gather job for {job['name']}"
+            m.update(statuskey=META_ERROR_STATUS_KEY, additional_info=dict(info, debug_data=msg))
+            self.journal.abort(SUBMIT, job['name'])
+            self.state.remove_in_flight_job(name=job['name'])
+            return None
+        gather_info = {"kind": "tapis_job",
+                       "gather": True,
+                       "tapis_job_uuid": job_response.uuid,
+                       "tapis_job_status": job_response.status,
+                       "shards": info['shards']}
+        self.journal.done(SUBMIT, job['name'], info=gather_info)
+        self.record_status(job['name'], statuskey='JOB_SUBMITTED_TO_TAPIS', additional_info=gather_info)
+        self.state.update_in_flight_job(name=job['name'], additional_info=gather_info)
+        return job_response
+
+    def schedule_next_poll(self, job, tapis_job, now):
+        """
+        Records the status observed for a non-terminal job and sets when it should next be polled, based on that
+        status, how long the job has been in it and the job's maxMinutes. Flags the job in the metadata the first
+        time it is found past the deadline for its status.
+        :param job: The in-flight job record from the metadata.
+        :param tapis_job: The Tapis job object from the latest poll.
+        :param now: (float) The time of the poll.
+        :return:
+        """
+        info = self.record_poll(job, tapis_job, now)
+        if info:
+            m = self.get_meta_helper(remote_id=job['name'])
+            m.update(statuskey='JOB_SUBMITTED_TO_TAPIS', additional_info=info)
+
+    def record_poll(self, job, tapis_job, now):
+        """
+        Records a poll of a non-terminal job in the local state and sets when the job should next be polled; see
+        schedule_next_poll().
+        :return: the additional_info to flag the job as stuck with, the first time it is found past its deadline;
+        otherwise None.
+        """
+        max_minutes = getattr(tapis_job, 'maxMinutes', None)
+        entry = self.state.record_poll(job['name'], tapis_job.status, now)
+        interval = get_poll_interval(tapis_job.status, entry['polls_in_status'], max_minutes)
+        self.state.set_next_poll(job['name'], now + interval)
+        deadline_minutes = get_stuck_deadline_minutes(tapis_job.status, max_minutes,
+                                                      self.pipeline_job.max_queue_minutes)
+        minutes_in_status = (now - entry['status_since']) / 60
+        if minutes_in_status > deadline_minutes and not entry.get('flagged_stuck'):
+            msg = f"Job {tapis_job.uuid} for {job['name']} has been {tapis_job.status} for at least " \
+                  f"{int(minutes_in_status)} minutes; deadline is {deadline_minutes} minutes."
+            print(msg)
+            entry['flagged_stuck'] = True
+            return dict(job['additional_info'], tapis_job_status=tapis_job.status, stuck=True, debug_data=msg)
+        return None
+
+    def record_status(self, remote_id, statuskey, additional_info={}):
+        """
+        Update the status in the metadata for remote_id, journaling the update before making it so that it can be
+        re-applied by recover_from_journal() if the update is interrupted.
+        :return: bool -- True if the metadata was updated.
+        """
+        self.journal.intent(STATUS_UPDATE, remote_id, statuskey=statuskey, info=additional_info)
+        m = self.get_meta_helper(remote_id=remote_id)
+        try:
+            updated = m.update(statuskey=statuskey, additional_info=additional_info)
+        except Exception as e:
+            print(f"Got exception trying to update the metadata for {remote_id} to {statuskey}; e: {e}")
+            updated = False
+        if updated:
+            self.journal.done(STATUS_UPDATE, remote_id, statuskey=statuskey)
+        return updated
+
+    def find_orphan_jobs(self, job_names, app_id, since):
+        """
+        Search the most recently created Tapis jobs for jobs with one of job_names, for app_id, created at or after
+        since; i.e., jobs whose submission was interrupted before their uuid was recorded.
+        :return: list of Tapis job summaries, or None if the search failed.
+        """
+        try:
+            tapis_jobs = self.tapis_client.jobs.getJobList(limit=ORPHAN_JOB_SEARCH_LIMIT, orderBy='created(desc)')
+        except Exception as e:
+            print(f"Got exception trying to list Tapis jobs to look for orphaned submissions; e: {e}")
+            return None
+        return self.filter_orphan_jobs(tapis_jobs, job_names, app_id, since)
+
+    @staticmethod
+    def filter_orphan_jobs(tapis_jobs, job_names, app_id, since):
+        """
+        Returns the Tapis jobs in a job listing with one of job_names, for app_id, created at or after since.
+        """
+        orphans = []
+        for tapis_job in tapis_jobs:
+            try:
+                created = datetime.fromisoformat(str(tapis_job.created).replace('Z', '+00:00')).timestamp()
+            except ValueError:
+                continue
+            # allow some clock skew between this host and Tapis.
+            if tapis_job.name in job_names and tapis_job.appId == app_id and created >= since - 60:
+                orphans.append(tapis_job)
+        return orphans
+
+    def recover_from_journal(self):
+        """
+        Replays the journal and recovers the work interrupted by a previous run: manifests claimed but never
+        submitted are validated and submitted, jobs submitted without their uuid being recorded are found in Tapis
+        and recorded (instead of being submitted again), interrupted status updates are re-applied and interrupted
+        output transfers are returned so they can be run again.
+        :return: a list of CompletedJob objects whose outputs still need to be transferred.
+        """
+        unfinished = self.journal.get_unfinished()
+        if not unfinished:
+            return []
+        # recovery changes the metadata outside of the normal cycle, so re-read the jobs in flight.
+        self.state.invalidate_in_flight_jobs()
+        jobs_to_transfer = []
+        for key, entry in unfinished.items():
+            print(f"Recovering interrupted {entry['op']} ({entry['phase']}) for {key}.")
+            if entry['op'] == TRANSFER:
+                # transfers are keyed on CompletedJob.transfer_key; entries written before the job uuid was
+                # recorded separately are keyed on the job uuid alone
+                job_uuid = entry.get('tapis_job_uuid', key)
+                if not entry.get('remote_id'):
+                    print(f"The interrupted transfer of the outputs of job {job_uuid} does not record its manifest; "
+                          f"not retrying it.")
+                    self.journal.abort(TRANSFER, key)
+                    continue
+                if entry.get('attempt', 1) >= MAX_TRANSFER_ATTEMPTS:
+                    print(f"Giving up on transferring the outputs of job {job_uuid} for {entry['remote_id']} after "
+                          f"{entry['attempt']} attempts.")
+                    self.journal.abort(TRANSFER, key)
+                    continue
+                tapis_job = self.get_tapis_job(job_uuid)
+                if tapis_job:
+                    jobs_to_transfer.append(CompletedJob(remote_id=entry['remote_id'],
+                                                         tapis_job=tapis_job,
+                                                         output_dir=entry.get('output_dir', ''),
+                                                         status=entry.get('status'),
+                                                         transfer_attempt=entry.get('attempt', 1) + 1))
+                continue
+            m = self.get_meta_helper(remote_id=key)
+            metadata = m.get()
+            if not metadata:
+                # the claim never reached the Meta API; discovery will find the manifest again.
+                self.journal.abort(entry['op'], key)
+                continue
+            if entry['op'] == STATUS_UPDATE:
+                if metadata['status'] == m.STATUS[entry['statuskey']]:
+                    self.journal.done(STATUS_UPDATE, key, statuskey=entry['statuskey'])
+                else:
+                    self.record_status(key, statuskey=entry['statuskey'], additional_info=entry.get('info', {}))
+                continue
+            if entry['op'] == SUBMIT and entry['phase'] == 'done':
+                # the manifest may have been held before it was submitted; it must not be validated again.
+                self.state.remove_pending_manifest(key)
+                self.record_status(key, statuskey='JOB_SUBMITTED_TO_TAPIS', additional_info=entry['info'])
+                continue
+            if entry['op'] == SUBMIT:
+                if not entry.get('gather') and metadata['status'] not in UNSUBMITTED_STATUSES:
+                    self.state.remove_pending_manifest(key)
+                    self.journal.abort(SUBMIT, key)
+                    continue
+                # actor messages can't be matched to the executions they started, so an interrupted message is sent
+                # again below; actors must tolerate receiving a manifest more than once.
+                orphans = [] if entry.get('actor_id') else self.find_orphan_jobs(entry['job_names'], entry['app_id'],
+                                                                                 entry['ts'])
+                if orphans is None:
+                    # can't tell whether the job was submitted; try again on the next run rather than risk a
+                    # duplicate submission.
+                    continue
+                if orphans and len(entry['job_names']) == 1:
+                    info = {"kind": "tapis_job",
+                            "tapis_job_uuid": orphans[0].uuid,
+                            "tapis_job_status": orphans[0].status,
+                            "recovered": True}
+                    if entry.get('gather'):
+                        info.update(gather=True, shards=metadata['additional_info'].get('shards', []))
+                    elif isinstance(metadata['additional_info'], dict) and \
+                            metadata['additional_info'].get('input_archive_path'):
+                        # the manifest's inputs were packed before its job was submitted
+                        info['input_archive_path'] = metadata['additional_info']['input_archive_path']
+                    self.state.remove_pending_manifest(key)
+                    self.journal.done(SUBMIT, key, info=info)
+                    self.record_status(key, statuskey='JOB_SUBMITTED_TO_TAPIS', additional_info=info)
+                    continue
+                if orphans:
+                    # without a record of every shard there is no gather job to wait for them, so the shard jobs
+                    # that were submitted are cancelled rather than left running, as in fail_fan_out_submission().
+                    shards = [{"tapis_job_uuid": j.uuid,
+                               "tapis_job_status": 'CANCELLED' if self.cancel_tapis_job(j.uuid) else j.status}
+                              for j in orphans]
+                    msg = f"Submission of the fan-out jobs for {key} was interrupted; cancelled the jobs " \
+                          f"{[j.uuid for j in orphans]} found for it in Tapis. Not resubmitting."
+                    print(msg)
+                    self.state.remove_pending_manifest(key)
+                    m.update(statuskey=META_ERROR_STATUS_KEY, additional_info={"debug_data": msg, "shards": shards})
+                    self.journal.abort(SUBMIT, key)
+                    continue
+                if entry.get('gather'):
+                    # the gather job was never submitted; the next poll of the shard jobs submits it.
+                    self.journal.abort(SUBMIT, key)
+                    continue
+            elif metadata['status'] not in UNSUBMITTED_STATUSES or metadata['status'] == WAITING_FOR_INPUTS_STATUS:
+                # a held manifest is validated again through get_pending_manifest_files().
+                self.journal.abort(entry['op'], key)
+                continue
+            # the manifest was claimed but its job was never submitted: validate and submit it now.
+            manifest = self.validate_manifest(Config(name=entry['name'], path=entry['path'], uri=entry.get('uri')))
+            if not manifest:
+                self.journal.abort(CLAIM, key)
+                continue
+            cached_job = self.complete_manifest_from_cache(manifest)
+            if cached_job:
+                jobs_to_transfer.append(cached_job)
+            else:
+                self.submit_job_for_manifest(manifest)
+        return jobs_to_transfer
+
+    def get_index_reports(self, create_missing=False):
+        """
+        Returns a report on the indexes of the pipeline's Meta API collections (the metadata collection and, if
+        enabled, the result cache collection): each existing index with the number of operations that used it, and
+        the required indexes that are missing.
+        :param create_missing: If True, create the missing indexes before reporting.
+        :return: list of dict, one per collection.
+        """
+        manager = MetaIndexManager(tapis_client=self.tapis_client, db=self._tapis_meta_db)
+        collections = [(self._tapis_meta_collection, PIPELINE_INDEXES)]
+        if self.result_cache:
+            collections.append((self.result_cache.collection, RESULT_CACHE_INDEXES))
+        reports = []
+        for collection, required_indexes in collections:
+            if create_missing:
+                manager.ensure_indexes(collection=collection, required_indexes=required_indexes)
+            reports.append(manager.report(collection=collection, required_indexes=required_indexes))
+        return reports
+
+    def get_pipeline_summary(self, cache_seconds=SUMMARY_CACHE_SECONDS):
+        """
+        Returns a summary of the pipeline's jobs computed by the Meta API: the number of jobs and the age of the
+        oldest job in each status, and the p50/p95 durations between status transitions. Summaries are cached locally
+        for cache_seconds so that dashboards and alerting can poll this cheaply.
+        :param cache_seconds: How long, in seconds, a previously computed summary can be reused.
+        :return: dict
+        """
+        return PipelineSummary(tapis_client=self.tapis_client,
+                               db=self._tapis_meta_db,
+                               collection=self._tapis_meta_collection,
+                               state_dir=self.config.get('local_state_dir', tempfile.gettempdir()),
+                               cache_seconds=cache_seconds).get()
+
     def copy_completed_job_outputs_to_remote_inbox(self, job):
         """
         The last step in a pipeline job life-cycle, this step copies the outputs from a recently completed job to
-        the remote outbox.
-        :param job:
-        :return:
+        the manifest's directory in the remote inbox and publishes the output manifest (path, size and md5 checksum
+        of every output) next to them. Only the outputs that are new or changed since the last delivery are copied,
+        and an entry for the delivery is appended to the index file at the root of the inbox; see core.delivery.
+        :param job: A CompletedJob.
+        :return: bool -- False if the delivery failed and should be retried.
+        """
+        if not self.remote_inbox:
+            return True
+        if not job.status == 'FINISHED':
+            print(f"Not delivering the outputs of job {job.uuid} for {job.remote_id}; status: {job.status}")
+            return True
+        delivery_dir = os.path.join(self.remote_inbox.path, job.remote_id)
+        output_manifest_path = os.path.join(delivery_dir, OUTPUT_MANIFEST_FILENAME)
+        info = {"kind": "delivery",
+                "tapis_job_uuid": job.uuid,
+                "tapis_job_status": job.status,
+                "output_manifest": output_manifest_path}
+        self.record_status(job.remote_id, statuskey='transfer_to_remote', additional_info=info)
+        # what was delivered before: the files in the delivery directory and the previous output manifest. The
+        # directory does not exist before the first delivery.
+        try:
+            inbox_files = self.list_box_files(self.remote_inbox, delivery_dir, recurse=True)
+        except Exception:
+            inbox_files = []
+        inbox_sizes = {get_relative_path(f.path, delivery_dir): f.size for f in inbox_files if not f.type == 'dir'}
+        previous = parse_output_manifest(None)
+        if OUTPUT_MANIFEST_FILENAME in inbox_sizes:
+            try:
+                previous = parse_output_manifest(self.read_box_file(self.remote_inbox, output_manifest_path))
+            except Exception as e:
+                print(f"Got exception trying to read the output manifest {output_manifest_path}; e: {e}")
+        # entries for the other shard directories of a fan-out job are kept; the rest are replaced by this delivery
+        files = {path: entry for path, entry in previous['files'].items()
+                 if job.output_dir and not path.startswith(f'{job.output_dir}/')}
+        tapis_jobs = {uuid: entry for uuid, entry in previous.get('tapis_jobs', {}).items()
+                      if job.output_dir and not entry.get('output_dir') == job.output_dir}
+        tapis_jobs[job.uuid] = {"status": job.status, "output_dir": job.output_dir}
+        archive_system_id = job.tapis_job.archiveSystemId
+        archive_dir = job.tapis_job.archiveSystemDir
+        copied = []
+        unchanged = []
+        try:
+            outputs = [f for f in self.tapis_client.files.listFiles(systemId=archive_system_id,
+                                                                    path=archive_dir,
+                                                                    recurse=True) if not f.type == 'dir']
+            for f in outputs:
+                path = os.path.join(job.output_dir, get_relative_path(f.path, archive_dir))
+                previous_entry = previous['files'].get(path)
+                if not needs_download(path, f, previous_entry, inbox_sizes):
+                    files[path] = previous_entry
+                    unchanged.append(path)
+                    continue
+                with tempfile.TemporaryFile() as output_file:
+                    self.download_tapis_file(archive_system_id, f.path, output_file)
+                    output_file.seek(0)
+                    md5_checksum, size = get_file_md5(output_file)
+                    if is_unchanged(path, md5_checksum, previous_entry, inbox_sizes):
+                        unchanged.append(path)
+                    else:
+                        output_file.seek(0)
+                        self.write_box_file(self.remote_inbox, os.path.join(delivery_dir, path), output_file)
+                        copied.append(path)
+                files[path] = {"size": size,
+                               "md5_checksum": md5_checksum,
+                               "source": get_observation(f),
+                               "tapis_job_uuid": job.uuid}
+            # the jobs whose delivery has an entry in the index, kept for the jobs still in the output manifest
+            indexed_job_uuids = [uuid for uuid in previous.get('indexed_job_uuids', []) if uuid in tapis_jobs]
+            if copied or not files == previous['files'] or job.uuid not in indexed_job_uuids:
+                # the output manifest is written after the outputs so that consumers never see missing files
+                output_manifest = {"remote_id": job.remote_id,
+                                   "pipeline_name": self.name,
+                                   "tapis_jobs": tapis_jobs,
+                                   "indexed_job_uuids": indexed_job_uuids,
+                                   "updated_at": datetime.now(timezone.utc).isoformat(),
+                                   "files": files}
+                self.write_box_file(self.remote_inbox, output_manifest_path,
+                                    io.BytesIO(json.dumps(output_manifest, indent=2).encode('utf-8')))
+                self.append_to_output_index(get_index_entry(output_manifest, output_manifest_path, job.uuid,
+                                                            copied, unchanged))
+                # recorded once the entry is appended, so that a retry of an interrupted delivery still indexes it
+                indexed_job_uuids.append(job.uuid)
+                self.write_box_file(self.remote_inbox, output_manifest_path,
+                                    io.BytesIO(json.dumps(output_manifest, indent=2).encode('utf-8')))
+        except Exception as e:
+            msg = f"Got exception trying to deliver the outputs of job {job.uuid} for {job.remote_id} to the " \
+                  f"remote inbox; copied {len(copied)} files before the error; e: {getattr(e, 'msg', e)}"
+            print(msg)
+            self.record_status(job.remote_id, statuskey=META_ERROR_STATUS_KEY,
+                               additional_info=dict(info, debug_data=msg))
+            return False
+        print(f"Delivered the outputs of job {job.uuid} for {job.remote_id}: copied {len(copied)} files, "
+              f"{len(unchanged)} unchanged.")
+        self.record_status(job.remote_id, statuskey='transfer_to_remote_done',
+                           additional_info=dict(info, copied=len(copied), unchanged=len(unchanged)))
+        return True
+
+    def append_to_output_index(self, entry):
+        """
+        Append an entry to the rolling index file at the root of the remote inbox. A full index file is first moved
+        to a segment file and a new one is started; see core.delivery. On a Tapis system inbox, the index is updated
+        while holding a Meta API lock so that concurrent deliveries do not overwrite each other's entries; an error is
+        raised if the lock cannot be taken, so that the delivery is retried.
+        """
+        if self.remote_inbox.kind == 'local':
+            self.update_output_index(entry)
+            return
+        index_path = os.path.join(self.remote_inbox.path, OUTPUT_INDEX_FILENAME)
+        lock = MetaLock(tapis_client=self.tapis_client,
+                        db=self._tapis_meta_db,
+                        collection=self._tapis_meta_collection,
+                        name=f'{OUTPUT_INDEX_LOCK_PREFIX}{self.remote_inbox.system_id}:{index_path}')
+        if not lock.acquire():
+            raise errors.UnexpectedRuntimeError(f"Couldn't lock the output index {index_path}; another run is "
+                                                f"updating it.")
+        try:
+            self.update_output_index(entry)
+        finally:
+            lock.release()
+
+    def update_output_index(self, entry):
+        """
+        Append an entry to the index file, rotating it first if it is full; see append_to_output_index().
         """
-        pass
+        index_path = os.path.join(self.remote_inbox.path, OUTPUT_INDEX_FILENAME)
+        try:
+            contents = self.read_box_file(self.remote_inbox, index_path)
+        except Exception:
+            # there is no index file before the first delivery
+            contents = None
+        if needs_rotation(contents):
+            segment_path = os.path.join(self.remote_inbox.path, get_index_segment_name(datetime.now(timezone.utc)))
+            self.move_box_file(self.remote_inbox, index_path, segment_path)
+            contents = None
+        if self.remote_inbox.kind == 'local':
+            self.remote_inbox.append(index_path, get_index_line(entry))
+        else:
+            # the Files API cannot append to a file, so the index file is uploaded again with the entry appended
+            self.write_box_file(self.remote_inbox, index_path, io.BytesIO(append_index_entry(contents, entry)))
 
 
 class TapisSystemBox(object):
@@ -452,22 +1759,41 @@ class TapisSystemBox(object):
         self.path = path
 
 
+class TapisPipelineActor(object):
+    """
+    Class representing a Tapis actor serving as the pipeline job
+    """
+    def __init__(self, actor_id, batch_size=1):
+        self.kind = 'tapis_actor'
+        self.actor_id = actor_id
+        # the maximum number of manifests sent to the actor in one message
+        self.batch_size = batch_size
+
+
 class TapisPipelineApp(object):
     """
     Class representing a Tapis app serving as the pipeline job
     """
-    def __init__(self, app_id, app_version, manifest_input_name):
+    def __init__(self, app_id, app_version, manifest_input_name, input_staging='files', compress_input_archive=True,
+                 max_queue_minutes=None, fan_out=None):
         self.kind = 'tapis_app'
         self.app_id = app_id
         self.app_version = app_version
         self.manifest_input_name = manifest_input_name
+        # one of 'files', 'directory' or 'archive'; see the configschema for details.
+        self.input_staging = input_staging
+        self.compress_input_archive = compress_input_archive
+        self.max_queue_minutes = max_queue_minutes
+        # the fan_out config (see the configschema), or None to submit a single job per manifest
+        self.fan_out = fan_out
 
 
 class Manifest(object):
     """
     Class representing a manifest object.
     """
-    def __init__(self, pipeline_name, file_path, remote_id, tapis_url, inputs):
+    def __init__(self, pipeline_name, file_path, remote_id, tapis_url, inputs, input_checksums=None, input_sizes=None,
+                 parent_remote_id=None, parent_inputs=None, input_observations=None):
         self.kind = 'tapis_file'
         self.pipeline_name = pipeline_name
         self.remote_id = remote_id
@@ -486,6 +1812,38 @@ class Manifest(object):
             self.tapis_job_name = f"{pipeline_name_fragment}.{remote_id}"
         self.tapis_url = tapis_url
         self.inputs = inputs
+        # mapping of input file path to checksum, used to compute the result cache key
+        self.input_checksums = input_checksums
+        # mapping of input file path to its size and lastModified, also used to compute the result cache key when the
+        # checksums could not be verified (Tapis boxes)
+        self.input_observations = input_observations
+        # path, in the remote outbox, of the archive of all inputs; set when inputs are packed for 'archive' staging
+        self.input_archive_path = None
+        # mapping of input file path to size in bytes, used to balance fan-out shards
+        self.input_sizes = input_sizes
+        # for the manifest of a fan-out shard, the remote_id and the inputs of the pipeline manifest it was split from
+        self.parent_remote_id = parent_remote_id
+        self.parent_inputs = parent_inputs
+
+
+class CompletedJob(object):
+    """
+    Class representing a completed Tapis job whose outputs are ready to be delivered to the remote inbox, along with
+    the manifest it ran for.
+    """
+    def __init__(self, remote_id, tapis_job, output_dir='', status=None, transfer_attempt=1):
+        self.remote_id = remote_id
+        self.tapis_job = tapis_job
+        self.uuid = tapis_job.uuid
+        # the status of the pipeline job; for a fan-out shard job, this is the status of the whole pipeline job
+        self.status = status or tapis_job.status
+        # directory, relative to the manifest's delivery directory in the remote inbox, the outputs are copied to
+        self.output_dir = output_dir
+        # failed transfers are retried by later runs, up to MAX_TRANSFER_ATTEMPTS
+        self.transfer_attempt = transfer_attempt
+        # the journal key of the transfer: a Tapis job's outputs can be delivered for several manifests (result cache
+        # hits) and, for a fan-out shard, to its own output directory
+        self.transfer_key = f'{self.uuid}:{remote_id}:{output_dir}'
 
 
 def main():
@@ -500,19 +1858,145 @@ def main():
     :return:
     """
     t = TapisPipelineClient()
-    # step 1 -- look for new manifest files and submit new pipeline jobs
+    # step 0 -- recover the work interrupted by a previous run, if any
+    recovered_jobs = t.recover_from_journal()
+    # step 1 -- look for new manifest files and submit new pipeline jobs, along with the manifests held by earlier
+    # cycles until their inputs finished uploading
+    pending_manifest_files = t.get_pending_manifest_files()
     new_manifest_files = t.check_for_new_manifest_files()
-    # for each new manifest, check if it is valid, and if it is, submit a new job for it
-    for f in new_manifest_files:
+    # for each new manifest, check if it is valid, and if it is, submit a new job for it unless the result cache
+    # already has outputs for the same inputs
+    cached_jobs = []
+    manifests_to_submit = []
+    for f in pending_manifest_files + new_manifest_files:
         manifest = t.validate_manifest(f)
-        if manifest:
-            t.submit_job_for_manifest(manifest)
+        if not manifest:
+            t.journal.abort(CLAIM, t.get_remote_id_from_manifest_name(f.name))
+            continue
+        cached_job = t.complete_manifest_from_cache(manifest)
+        if cached_job:
+            cached_jobs.append(cached_job)
+        else:
+            manifests_to_submit.append(manifest)
+    t.submit_jobs_for_manifests(manifests_to_submit)
     # step 2 -- check for completed pipeline jobs and update metadata accordingly
-    completed_jobs = t.check_for_completed_pipeline_jobs()
+    completed_jobs = recovered_jobs + cached_jobs + t.check_for_completed_pipeline_jobs()
     # step 3/4 -- for each completed job, copy the output files with the manifest to the remote inbox.
     for job in completed_jobs:
-        t.copy_completed_job_outputs_to_remote_inbox(job)
+        t.journal.intent(TRANSFER, job.transfer_key, tapis_job_uuid=job.uuid, remote_id=job.remote_id,
+                         output_dir=job.output_dir, status=job.status, attempt=job.transfer_attempt)
+        # a failed transfer is left unfinished in the journal so that the next run retries it
+        if t.copy_completed_job_outputs_to_remote_inbox(job):
+            t.journal.done(TRANSFER, job.transfer_key)
+    # record what this cycle observed so the next cycle can skip unchanged work
+    t.journal.compact()
+    t.state.save()
+
+
+def summary(cache_seconds=SUMMARY_CACHE_SECONDS):
+    """
+    Print the pipeline summary as JSON.
+    :return:
+    """
+    t = TapisPipelineClient()
+    print(json.dumps(t.get_pipeline_summary(cache_seconds=cache_seconds), indent=2))
+
+
+def watch(interval=WATCH_INTERVAL_SECONDS):
+    """
+    Run pipeline cycles continuously for a pipeline with a local remote outbox: a cycle runs as soon as a new manifest
+    file is written to the outbox (detected with inotify when available), and at least every interval seconds to
+    poll the jobs in flight.
+    :return:
+    """
+    t = TapisPipelineClient()
+    if not t.remote_outbox.kind == 'local':
+        print(f"The watch command requires a remote_outbox of kind 'local'. Found: {t.remote_outbox.kind}")
+        sys.exit(1)
+    watcher = LocalBoxWatcher(box=t.remote_outbox, prefix=TAPIS_PIPELINE_MANIFEST_FILENAME_PREFIX)
+    while True:
+        main()
+        new_manifest_names = watcher.wait(timeout=interval)
+        if new_manifest_names:
+            print(f"New manifest files in the remote outbox: {new_manifest_names}")
+
+
+def indexes(create_missing=False):
+    """
+    Print the index report for the pipeline's collections as JSON.
+    :return:
+    """
+    t = TapisPipelineClient()
+    print(json.dumps(t.get_index_reports(create_missing=create_missing), indent=2))
+
+
+def benchmark(runs=IMPORT_BENCHMARK_RUNS):
+    """
+    Print the cold-start benchmark as JSON: the import time of the pipeline modules, and the time to create each kind
+    of Tapis client and make a first Meta API call, with the spec bundle cached and without it.
+    :return:
+    """
+    results = {'import_seconds': {module: measure_import_seconds(module, runs) for module in BENCHMARK_MODULES}}
+    start = time.perf_counter()
+    t = TapisPipelineClient()
+    results['pipeline_client_init_seconds'] = time.perf_counter() - start
+    access_token = t.access_token or getattr(t.tapis_client.access_token, 'access_token', t.tapis_client.access_token)
+    state_dir = t.config.get('local_state_dir', tempfile.gettempdir())
+
+    def first_call(client):
+        return client.meta.listCollectionNames(db=t._tapis_meta_db)
+
+    with tempfile.TemporaryDirectory() as empty_state_dir:
+        results['first_call'] = {
+            'lazy': measure_first_call(lambda: TapisClient(base_url=t.tapis_base_url, username=t.tapis_username,
+                                                           state_dir=state_dir, access_token=access_token),
+                                       first_call),
+            'lazy_without_spec_bundle': measure_first_call(lambda: TapisClient(base_url=t.tapis_base_url,
+                                                                               username=t.tapis_username,
+                                                                               state_dir=empty_state_dir,
+                                                                               access_token=access_token),
+                                                           first_call),
+            'tapipy': measure_first_call(lambda: get_tapipy_client(base_url=t.tapis_base_url,
+                                                                   username=t.tapis_username,
+                                                                   access_token=access_token),
+                                         first_call),
+        }
+    print(json.dumps(results, indent=2))
+
+
+def cli():
+    """
+    Command line entrypoint. With no command, runs one cycle of the pipeline (see main()).
+    :return:
+    """
+    parser = argparse.ArgumentParser(description="Tapis Pipelines")
+    subparsers = parser.add_subparsers(dest='command')
+    subparsers.add_parser('run', help="Run one cycle of the pipeline (the default).")
+    summary_parser = subparsers.add_parser('summary', help="Print counts per status and transition durations.")
+    summary_parser.add_argument('--cache-seconds', type=int, default=SUMMARY_CACHE_SECONDS,
+                                help="Reuse a summary computed within this many seconds.")
+    watch_parser = subparsers.add_parser('watch', help="Run cycles continuously, as new manifest files arrive in a "
+                                                       "local remote outbox.")
+    watch_parser.add_argument('--interval', type=int, default=WATCH_INTERVAL_SECONDS,
+                              help="Run a cycle at least every this many seconds.")
+    indexes_parser = subparsers.add_parser('indexes', help="Report index usage and missing indexes on the "
+                                                           "pipeline's Meta API collections.")
+    indexes_parser.add_argument('--create', action='store_true', help="Create the missing indexes.")
+    benchmark_parser = subparsers.add_parser('benchmark', help="Report import and first-call times for cold starts.")
+    benchmark_parser.add_argument('--runs', type=int, default=IMPORT_BENCHMARK_RUNS,
+                                  help="Number of fresh interpreters each import is timed in.")
+    args = parser.parse_args()
+    if args.command == 'summary':
+        summary(cache_seconds=args.cache_seconds)
+    elif args.command == 'watch':
+        watch(interval=args.interval)
+    elif args.command == 'indexes':
+        indexes(create_missing=args.create)
+    elif args.command == 'benchmark':
+        benchmark(runs=args.runs)
+    else:
+        main()
 
 
 if __name__ == '__main__':
-    main()
\ No newline at end of file
+    cli()
\ No newline at end of file
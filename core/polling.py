@@ -0,0 +1,60 @@
+"""
+Poll scheduling for in-flight Tapis jobs. The interval until a job is polled again depends on the last Tapis status
+observed for it, how many times it has been observed in that status (long-queued jobs back off exponentially) and
+the job's maxMinutes. Jobs that stay in a status past a deadline are reported as stuck.
+"""
+
+# interval used for states a job typically passes through quickly (staging, archiving, etc.)
+TRANSIENT_STATE_POLL_SECONDS = 60
+
+# first interval for a QUEUED job; doubled for each consecutive poll that still finds the job QUEUED
+QUEUED_BASE_POLL_SECONDS = 300
+
+# largest interval used for any job
+MAX_POLL_SECONDS = 60 * 60
+
+# bounds on the interval used for RUNNING jobs, which is otherwise a fraction of the job's maxMinutes
+RUNNING_MIN_POLL_SECONDS = 60
+RUNNING_MAX_POLL_SECONDS = 15 * 60
+
+# how long a job may stay QUEUED before it is flagged as stuck, unless max_queue_minutes is configured
+DEFAULT_MAX_QUEUE_MINUTES = 48 * 60
+
+# how long past its maxMinutes a RUNNING job may go before it is flagged as stuck
+RUNNING_GRACE_MINUTES = 30
+
+# how long a job may stay in any other non-terminal state before it is flagged as stuck
+MAX_TRANSIENT_STATE_MINUTES = 6 * 60
+
+TRANSIENT_JOB_STATES = ['PENDING', 'PROCESSING_INPUTS', 'STAGING_INPUTS', 'STAGING_JOB', 'SUBMITTING_JOB',
+                        'ARCHIVING', 'BLOCKED']
+
+
+def get_poll_interval(status, polls_in_status, max_minutes=None):
+    """
+    Returns the number of seconds to wait before polling a job again.
+    :param status: (str) The last Tapis status observed for the job.
+    :param polls_in_status: (int) The number of consecutive polls that have observed the job in this status.
+    :param max_minutes: (int) The job's maxMinutes, if known.
+    :return: int
+    """
+    if status == 'QUEUED':
+        return min(QUEUED_BASE_POLL_SECONDS * 2 ** max(polls_in_status - 1, 0), MAX_POLL_SECONDS)
+    if status == 'RUNNING':
+        if not max_minutes:
+            return RUNNING_MAX_POLL_SECONDS
+        return max(min(max_minutes * 60 // 4, RUNNING_MAX_POLL_SECONDS), RUNNING_MIN_POLL_SECONDS)
+    if status in TRANSIENT_JOB_STATES:
+        return TRANSIENT_STATE_POLL_SECONDS
+    return QUEUED_BASE_POLL_SECONDS
+
+
+def get_stuck_deadline_minutes(status, max_minutes=None, max_queue_minutes=None):
+    """
+    Returns how many minutes a job may stay in status before it is considered stuck.
+    """
+    if status == 'QUEUED':
+        return max_queue_minutes or DEFAULT_MAX_QUEUE_MINUTES
+    if status == 'RUNNING' and max_minutes:
+        return max_minutes + RUNNING_GRACE_MINUTES
+    return MAX_TRANSIENT_STATE_MINUTES
@@ -0,0 +1,59 @@
+"""
+Upload-settling detection for manifest inputs. A manifest can appear in the remote outbox before its inputs have
+finished uploading, so the size and lastModified of each input are observed across cycles and the manifest is only
+submitted once every input is settled: its md5 checksum matches the one in the manifest, it has not been modified for
+settle_seconds, or it was observed unchanged over at least settle_seconds.
+"""
+import hashlib
+from datetime import datetime
+
+# how long an input must go unmodified before it is considered completely uploaded
+DEFAULT_SETTLE_SECONDS = 60
+
+# how long a manifest may wait for its inputs before it is set to ERROR
+DEFAULT_MAX_PENDING_MINUTES = 24 * 60
+
+
+def get_observation(listing):
+    """
+    Returns the observation of an input from its file listing: its size and lastModified.
+    """
+    return [listing.size, str(listing.lastModified)]
+
+
+def get_age_seconds(last_modified, now):
+    """
+    Returns the number of seconds since an ISO formatted lastModified, or None if it cannot be parsed.
+    """
+    try:
+        return now - datetime.fromisoformat(str(last_modified).replace('Z', '+00:00')).timestamp()
+    except ValueError:
+        return None
+
+
+def get_md5(path, chunk_size=1024 * 1024):
+    """
+    Compute the md5 checksum of a local file.
+    """
+    md5 = hashlib.md5()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            md5.update(chunk)
+    return md5.hexdigest()
+
+
+def is_settled(observation, previous_observation, previous_observed_at, now, settle_seconds=DEFAULT_SETTLE_SECONDS):
+    """
+    Returns True if an input is settled: either its lastModified is at least settle_seconds old, or the same size and
+    lastModified were already observed at least settle_seconds ago.
+    :param observation: The current observation of the input; see get_observation().
+    :param previous_observation: The observation of the input made by an earlier cycle, or None.
+    :param previous_observed_at: (float) When the earlier observation was made.
+    :param now: (float) When the current observation was made.
+    """
+    if settle_seconds <= 0:
+        return True
+    age = get_age_seconds(observation[1], now)
+    if age is not None and age >= settle_seconds:
+        return True
+    return observation == previous_observation and now - previous_observed_at >= settle_seconds
@@ -0,0 +1,178 @@
+"""
+Local state kept between pipeline cycles. The state records what the previous cycle observed -- a fingerprint of the
+remote outbox listing, the jobs in flight and when the pipeline setup was last verified -- so that a cycle can skip
+work (and Tapis API calls) when nothing relevant has changed.
+"""
+import json
+import os
+import time
+
+# how long a verified setup (meta collection exists, app is accessible) is trusted before checking again
+SETUP_CHECK_SECONDS = 24 * 60 * 60
+
+# how long the outbox fingerprint and the in-flight jobs are trusted before doing a full scan anyway
+FULL_SCAN_SECONDS = 60 * 60
+
+
+class PipelineState(object):
+    """
+    Class for reading and writing the local state file of a pipeline.
+    """
+
+    def __init__(self, state_dir, pipeline_name):
+        self.path = os.path.join(state_dir, f'tapis_pipelines_state_{pipeline_name}.json')
+        self.data = {}
+        try:
+            with open(self.path, 'r') as f:
+                self.data = json.load(f)
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            print(f"Couldn't read pipeline state at {self.path}; starting from an empty state. Exception: {e}")
+
+    def save(self):
+        """
+        Write the state to disk atomically.
+        """
+        try:
+            tmp_path = f'{self.path}.{os.getpid()}'
+            with open(tmp_path, 'w') as f:
+                json.dump(self.data, f)
+            os.replace(tmp_path, self.path)
+        except Exception as e:
+            print(f"Couldn't write pipeline state to {self.path}; exception: {e}")
+
+    def _is_fresh(self, key, max_age):
+        return time.time() - self.data.get(key, 0) < max_age
+
+    # setup --
+
+    def setup_is_verified(self, config_hash):
+        """
+        Returns True if the setup for this exact config was verified within SETUP_CHECK_SECONDS.
+        """
+        return self.data.get('config_hash') == config_hash and self._is_fresh('setup_verified_at', SETUP_CHECK_SECONDS)
+
+    def set_setup_verified(self, config_hash):
+        self.data['config_hash'] = config_hash
+        self.data['setup_verified_at'] = time.time()
+
+    # remote outbox --
+
+    @staticmethod
+    def get_outbox_fingerprint(file_list):
+        """
+        Compute a cheap fingerprint of a remote outbox listing: the number of files and the latest lastModified.
+        """
+        return [len(file_list), max([str(f.lastModified) for f in file_list], default='')]
+
+    def outbox_unchanged(self, fingerprint):
+        """
+        Returns True if the outbox fingerprint matches the one stored by a recent full scan.
+        """
+        return self.data.get('outbox_fingerprint') == fingerprint and self._is_fresh('outbox_scanned_at',
+                                                                                     FULL_SCAN_SECONDS)
+
+    def set_outbox_fingerprint(self, fingerprint):
+        self.data['outbox_fingerprint'] = fingerprint
+        self.data['outbox_scanned_at'] = time.time()
+
+    # jobs in flight --
+
+    def get_in_flight_jobs(self):
+        """
+        Returns the list of in-flight job records stored by a recent cycle, or None if they must be read from the
+        metadata again.
+        """
+        if not self._is_fresh('in_flight_refreshed_at', FULL_SCAN_SECONDS):
+            return None
+        return self.data.get('in_flight')
+
+    def set_in_flight_jobs(self, jobs):
+        """
+        Store the in-flight job records, as read from the metadata. Only the fields needed to poll the jobs are kept.
+        """
+        self.data['in_flight'] = [{'name': j['name'], 'additional_info': j['additional_info']} for j in jobs]
+        self.data['in_flight_refreshed_at'] = time.time()
+        # drop poll schedules for jobs that are no longer in flight
+        names = set(j['name'] for j in jobs)
+        self.data['poll_schedule'] = {k: v for k, v in self.data.get('poll_schedule', {}).items() if k in names}
+
+    def invalidate_in_flight_jobs(self):
+        """
+        Force the in-flight jobs to be read from the metadata again; e.g., after the metadata was changed outside
+        of the normal cycle.
+        """
+        self.data.pop('in_flight_refreshed_at', None)
+
+    def add_in_flight_job(self, name, additional_info):
+        if self.data.get('in_flight') is not None:
+            self.data['in_flight'].append({'name': name, 'additional_info': additional_info})
+
+    def update_in_flight_job(self, name, additional_info):
+        for j in self.data.get('in_flight') or []:
+            if j['name'] == name:
+                j['additional_info'] = additional_info
+
+    def remove_in_flight_job(self, name):
+        if self.data.get('in_flight') is not None:
+            self.data['in_flight'] = [j for j in self.data['in_flight'] if j['name'] != name]
+        self.data.get('poll_schedule', {}).pop(name, None)
+
+    # manifests waiting for their inputs --
+
+    def get_pending_manifests(self):
+        """
+        Returns the records of the manifests waiting for their inputs to settle, as a dictionary mapping remote_id to
+        record, or None if they must be read from the metadata again.
+        """
+        if not self._is_fresh('pending_refreshed_at', FULL_SCAN_SECONDS):
+            return None
+        return self.data.get('pending', {})
+
+    def set_pending_manifests(self, jobs):
+        """
+        Store the manifests waiting for their inputs, as read from the metadata, keeping the observations recorded
+        for the ones already known.
+        """
+        pending = self.data.get('pending', {})
+        self.data['pending'] = {}
+        for j in jobs:
+            self.data['pending'][j['name']] = pending.get(j['name']) or {
+                'manifest_file': j['additional_info']['manifest_file'], 'since': time.time()}
+        self.data['pending_refreshed_at'] = time.time()
+
+    def get_pending_manifest(self, name):
+        return self.data.get('pending', {}).get(name)
+
+    def set_pending_manifest(self, name, record):
+        self.data.setdefault('pending', {})[name] = record
+
+    def remove_pending_manifest(self, name):
+        self.data.get('pending', {}).pop(name, None)
+
+    # poll schedule --
+
+    def is_poll_due(self, name, now):
+        """
+        Returns True if the job with this name has no schedule yet or its next_poll_at has passed.
+        """
+        return self.data.get('poll_schedule', {}).get(name, {}).get('next_poll_at', 0) <= now
+
+    def record_poll(self, name, status, now):
+        """
+        Record that a poll observed the job in status. Returns the job's schedule entry, with status_since (when
+        the status was first observed) and polls_in_status (consecutive polls that observed it).
+        """
+        entry = self.data.setdefault('poll_schedule', {}).setdefault(name, {})
+        if entry.get('status') != status:
+            entry['status'] = status
+            entry['status_since'] = now
+            entry['polls_in_status'] = 0
+            entry.pop('flagged_stuck', None)
+        entry['polls_in_status'] += 1
+        entry['last_poll_at'] = now
+        return entry
+
+    def set_next_poll(self, name, next_poll_at):
+        self.data.setdefault('poll_schedule', {}).setdefault(name, {})['next_poll_at'] = next_poll_at
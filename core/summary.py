@@ -0,0 +1,206 @@
+"""
+Server-side aggregation of pipeline metadata. Builds a summary of a pipeline collection -- counts per status, the age
+of the oldest job in each status and p50/p95 durations between status transitions -- from Meta API aggregations so
+that callers do not need to pull every document in the collection. The percentiles are also computed by the server, so
+the size of an aggregation's result does not grow with the number of jobs.
+"""
+import hashlib
+import json
+import os
+import time
+from datetime import datetime, timezone
+
+from core.meta import is_not_found_error
+
+# base name of the aggregations registered on the pipeline's collection; see get_aggregation_name()
+STATUS_COUNTS_AGGREGATION = 'pipeline_status_counts'
+TRANSITION_DURATIONS_AGGREGATION = 'pipeline_transition_durations'
+
+# format used by MetadataHelper for last_update_time and the history update_time fields
+META_TIME_FORMAT = "%m/%d/%Y, %H:%M:%S"
+
+# how long a computed summary is reused before querying the Meta API again
+SUMMARY_CACHE_SECONDS = 60
+
+
+def _to_date(field):
+    return {"$dateFromString": {"dateString": field, "format": META_TIME_FORMAT}}
+
+
+# documents without a status, such as the locks held while updating an output index, are not pipeline jobs
+JOBS_ONLY_STAGE = {"$match": {"status": {"$exists": True}}}
+
+# counts per status and the oldest last_update_time within each status
+STATUS_COUNTS_STAGES = [
+    JOBS_ONLY_STAGE,
+    {"$group": {"_id": "$status",
+                "count": {"$sum": 1},
+                "oldest_update": {"$min": _to_date("$last_update_time")}}}
+]
+
+# percentiles of the transition durations reported by the summary
+DURATION_PERCENTILES = [50, 95]
+
+
+def _nearest_rank(values, count, p):
+    """
+    Returns the expression selecting the p-th percentile (0-100) of the sorted array values of length count using the
+    nearest-rank method.
+    """
+    rank = {"$max": [{"$subtract": [{"$ceil": {"$multiply": [p / 100.0, count]}}, 1]}, 0]}
+    return {"$arrayElemAt": [values, rank]}
+
+
+# one record per (from status, to status) pair with the number of transitions and the p50/p95 durations, in seconds,
+# between the two updates. The current status is appended to the history so the latest transition is included. The
+# sorted durations are only used within the server to select the percentiles and are not returned.
+TRANSITION_DURATIONS_STAGES = [
+    JOBS_ONLY_STAGE,
+    {"$project": {"updates": {"$concatArrays": [
+        {"$ifNull": ["$history", []]},
+        [{"status": "$status", "update_time": "$last_update_time"}]]}}},
+    {"$project": {"transitions": {"$map": {
+        "input": {"$range": [1, {"$size": "$updates"}]},
+        "as": "i",
+        "in": {
+            "from": {"$arrayElemAt": ["$updates.status", {"$subtract": ["$$i", 1]}]},
+            "to": {"$arrayElemAt": ["$updates.status", "$$i"]},
+            "seconds": {"$divide": [
+                {"$subtract": [_to_date({"$arrayElemAt": ["$updates.update_time", "$$i"]}),
+                               _to_date({"$arrayElemAt": ["$updates.update_time", {"$subtract": ["$$i", 1]}]})]},
+                1000]}
+        }}}}},
+    {"$unwind": "$transitions"},
+    {"$sort": {"transitions.seconds": 1}},
+    {"$group": {"_id": {"from": "$transitions.from", "to": "$transitions.to"},
+                "count": {"$sum": 1},
+                "durations": {"$push": "$transitions.seconds"}}},
+    {"$project": dict({"count": 1},
+                      **{f"p{p}_seconds": _nearest_rank("$durations", "$count", p) for p in DURATION_PERCENTILES})}
+]
+
+AGGREGATIONS = {
+    STATUS_COUNTS_AGGREGATION: STATUS_COUNTS_STAGES,
+    TRANSITION_DURATIONS_AGGREGATION: TRANSITION_DURATIONS_STAGES,
+}
+
+
+def get_aggregation_name(name):
+    """
+    Returns the name, which is also the uri, under which one of the AGGREGATIONS is registered: its base name followed
+    by a hash of its stages, so that a changed definition is registered anew instead of running the stale one.
+    """
+    stages = json.dumps(AGGREGATIONS[name], sort_keys=True)
+    return f"{name}_{hashlib.sha256(stages.encode('utf-8')).hexdigest()[:12]}"
+
+
+def _parse_date(value):
+    """
+    Convert a date returned by the Meta API (either {"$date": <millis>} or an ISO string) to epoch seconds.
+    MetadataHelper writes times in local time without a zone, which the server parses as UTC, so the parsed value is
+    converted back to the local zone.
+    """
+    if isinstance(value, dict):
+        value = value.get('$date')
+    if isinstance(value, (int, float)):
+        parsed = datetime.fromtimestamp(value / 1000.0, timezone.utc)
+    elif isinstance(value, str):
+        try:
+            parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+        except ValueError:
+            return None
+    else:
+        return None
+    return parsed.replace(tzinfo=None).timestamp()
+
+
+class PipelineSummary(object):
+    """
+    Class for computing and caching the summary of a pipeline's metadata collection.
+    """
+
+    def __init__(self, tapis_client, db, collection, state_dir, cache_seconds=SUMMARY_CACHE_SECONDS):
+        """
+        :param state_dir: The pipeline's local state directory, where the summary is cached.
+        """
+        self.tapis_client = tapis_client
+        self.db = db
+        self.collection = collection
+        self.cache_seconds = cache_seconds
+        self.cache_path = os.path.join(state_dir, f'tapis_pipelines_summary_{db}_{collection}.json')
+
+    def run_aggregation(self, name):
+        """
+        Run one of the AGGREGATIONS on the collection, registering it first if the Meta API reports that it does not
+        exist yet; any other error is raised.
+        """
+        uri = get_aggregation_name(name)
+        try:
+            result = self.tapis_client.meta.useAggregation(db=self.db, collection=self.collection, aggregation=uri)
+        except Exception as e:
+            if not is_not_found_error(e):
+                raise
+            self.tapis_client.meta.addAggregation(db=self.db,
+                                                  collection=self.collection,
+                                                  aggregation=uri,
+                                                  request_body={"type": "pipeline",
+                                                                "uri": uri,
+                                                                "stages": AGGREGATIONS[name]})
+            result = self.tapis_client.meta.useAggregation(db=self.db, collection=self.collection, aggregation=uri)
+        if type(result) == bytes:
+            result = json.loads(result)
+        return result
+
+    def read_cache(self):
+        """
+        Returns the cached summary if it is younger than cache_seconds, otherwise None.
+        """
+        try:
+            with open(self.cache_path, 'r') as f:
+                summary = json.load(f)
+        except Exception:
+            return None
+        if time.time() - summary.get('generated_at', 0) > self.cache_seconds:
+            return None
+        return summary
+
+    def write_cache(self, summary):
+        try:
+            tmp_path = f'{self.cache_path}.{os.getpid()}'
+            with open(tmp_path, 'w') as f:
+                json.dump(summary, f)
+            os.replace(tmp_path, self.cache_path)
+        except Exception as e:
+            print(f"Couldn't write pipeline summary cache to {self.cache_path}; exception: {e}")
+
+    def get(self):
+        """
+        Returns the summary of the collection, as a dictionary, from the cache when it is fresh and otherwise from
+        the Meta API aggregations.
+        """
+        summary = self.read_cache()
+        if summary:
+            return summary
+        now = time.time()
+        statuses = {}
+        for record in self.run_aggregation(STATUS_COUNTS_AGGREGATION):
+            oldest_update = _parse_date(record.get('oldest_update'))
+            statuses[record['_id']] = {
+                'count': record['count'],
+                'oldest_age_seconds': now - oldest_update if oldest_update else None
+            }
+        transitions = []
+        for record in self.run_aggregation(TRANSITION_DURATIONS_AGGREGATION):
+            transition = {'from': record['_id']['from'],
+                          'to': record['_id']['to'],
+                          'count': record['count']}
+            for p in DURATION_PERCENTILES:
+                transition[f'p{p}_seconds'] = record.get(f'p{p}_seconds')
+            transitions.append(transition)
+        summary = {'generated_at': now,
+                   'db': self.db,
+                   'collection': self.collection,
+                   'statuses': statuses,
+                   'transitions': transitions}
+        self.write_cache(summary)
+        return summary
@@ -0,0 +1,411 @@
+"""
+Lightweight, lazily built Tapis client for the pipeline software, used instead of tapipy's client when the pipeline
+config opts in with "client": "lazy" in its tapis_config. Importing tapipy.tapis unpickles the OpenAPI specs of every
+Tapis service, and instantiating tapipy's Tapis client builds a resource for each of them and looks up the tenants
+before making any call; for a cron run that usually finds nothing to do, that is most of the run's time.
+
+TapisClient builds a resource (meta, files, jobs, apps, actors) only when it is first accessed, from a spec bundle
+cached in the local state directory: a JSON file with just the operations of the resources used by the pipeline
+software, extracted once from the specs that ship with tapipy. The bundle entry of a resource is rebuilt when tapipy's
+spec for it changes (e.g., after upgrading tapipy). Operations are called with the same arguments as tapipy's and
+return the same shape of results: objects with attribute access for "result" documents and raw bytes otherwise.
+Multipart uploads (files.insert) are streamed from the file object instead of being read into memory. When the client
+has a password and a request is rejected with a 401 (e.g., because the access token expired), a new token is
+generated and the request is made again, once.
+
+The requests package is imported when the first client is created rather than when this module is imported.
+"""
+import importlib.util
+import io
+import json
+import os
+import pickle
+import uuid
+
+from core import errors
+from core.config import Config
+
+# the resources used by the pipeline software
+DEFAULT_RESOURCES = ['meta', 'files', 'jobs', 'apps', 'actors']
+
+# name of the spec bundle file in the local state directory
+SPEC_BUNDLE_FILENAME = 'tapis_pipelines_spec_bundle.json'
+
+# bump when the format of the bundle entries changes so that older bundles are rebuilt
+SPEC_BUNDLE_FORMAT = 1
+
+# request body content types supported by Operation
+SUPPORTED_CONTENT_TYPES = ['application/json', 'multipart/form-data']
+
+# size of the chunks written to the file object by TapisClient.download(), and read from the file uploaded by a
+# multipart request
+DOWNLOAD_CHUNK_BYTES = 1024 * 1024
+
+
+class TapisClientError(Exception):
+    """
+    Error raised when a Tapis API call fails. As with tapipy's errors, the request and the response (if one was
+    received) are attached.
+    """
+    def __init__(self, msg=None, request=None, response=None):
+        super().__init__(msg)
+        self.message = msg
+        self.request = request
+        self.response = response
+
+
+def to_result(value):
+    """
+    Convert a decoded JSON value to a result object: dictionaries, including nested ones, become Config objects so
+    that their keys can be read as attributes, as with tapipy's TapisResult.
+    """
+    if isinstance(value, dict):
+        return Config({k: to_result(v) for k, v in value.items()})
+    if isinstance(value, list):
+        return [to_result(v) for v in value]
+    return value
+
+
+class MultipartBody(object):
+    """
+    A multipart/form-data request body that is read from its fields as it is sent: file objects are read in chunks
+    rather than held in memory, as requests does with its files argument. The length of the body is computed up front
+    so that the request has a Content-Length.
+    """
+
+    def __init__(self, fields):
+        """
+        :param fields: dict mapping field name to a file object (read from its current position) or a value.
+        """
+        self.boundary = uuid.uuid4().hex
+        self.content_type = f'multipart/form-data; boundary={self.boundary}'
+        # each part is a (file object, start position) pair; headers and values are wrapped in BytesIO objects
+        self.parts = []
+        for name, value in fields.items():
+            if hasattr(value, 'read'):
+                filename = getattr(value, 'name', None)
+                filename = os.path.basename(filename) if isinstance(filename, str) else name
+                self.add_part(f'--{self.boundary}\r\nContent-Disposition: form-data; name="{name}"; '
+                              f'filename="{filename}"\r\nContent-Type: application/octet-stream\r\n\r\n')
+                self.parts.append((value, value.tell()))
+                self.add_part('\r\n')
+            else:
+                self.add_part(f'--{self.boundary}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n'
+                              f'{value}\r\n')
+        self.add_part(f'--{self.boundary}--\r\n')
+        self.length = 0
+        for f, start in self.parts:
+            self.length += f.seek(0, io.SEEK_END) - start
+        self.rewind()
+
+    def add_part(self, text):
+        self.parts.append((io.BytesIO(text.encode('utf-8')), 0))
+
+    def rewind(self):
+        """
+        Go back to the start of the body, e.g., to send the request again.
+        """
+        for f, start in self.parts:
+            f.seek(start)
+        self.current = 0
+
+    def __len__(self):
+        return self.length
+
+    def read(self, size=-1):
+        chunks = []
+        remaining = size if size >= 0 else self.length
+        while remaining > 0 and self.current < len(self.parts):
+            chunk = self.parts[self.current][0].read(remaining)
+            if not chunk:
+                self.current += 1
+                continue
+            chunks.append(chunk)
+            remaining -= len(chunk)
+        return b''.join(chunks)
+
+    def __iter__(self):
+        while True:
+            chunk = self.read(DOWNLOAD_CHUNK_BYTES)
+            if not chunk:
+                return
+            yield chunk
+
+
+def get_tapipy_spec_path(resource):
+    """
+    Returns the path of the pickled spec for resource shipped with tapipy, or None if tapipy is not installed. The
+    tapipy package is located without being imported.
+    """
+    spec = importlib.util.find_spec('tapipy')
+    if spec is None or not spec.submodule_search_locations:
+        return None
+    spec_dir = os.path.join(list(spec.submodule_search_locations)[0], 'specs')
+    try:
+        names = os.listdir(spec_dir)
+    except FileNotFoundError:
+        return None
+    for name in names:
+        if name.endswith(f'-openapi_v3-{resource}.pickle'):
+            return os.path.join(spec_dir, name)
+    return None
+
+
+def get_spec_source(path):
+    """
+    Returns the fingerprint of a spec file recorded in the bundle: its name, size and modification time.
+    """
+    st = os.stat(path)
+    return [SPEC_BUNDLE_FORMAT, os.path.basename(path), st.st_size, int(st.st_mtime)]
+
+
+def parse_operations(spec_dict):
+    """
+    Extract the operations of a dereferenced OpenAPI spec, keeping only what is needed to make the calls.
+    :return: dict mapping operationId to operation description.
+    """
+    operations = {}
+    for path, path_desc in spec_dict.get('paths', {}).items():
+        for method, op_desc in path_desc.items():
+            if not isinstance(op_desc, dict) or not op_desc.get('operationId'):
+                continue
+            parameters = op_desc.get('parameters', [])
+            body = None
+            content = op_desc.get('requestBody', {}).get('content', {})
+            for content_type in content.keys():
+                if content_type in SUPPORTED_CONTENT_TYPES:
+                    schema = content[content_type].get('schema', {})
+                    body = {'content_type': content_type,
+                            'properties': list(schema.get('properties', {}).keys()),
+                            'required': list(schema.get('required', []))}
+                    break
+            operations[op_desc['operationId']] = {
+                'method': method.upper(),
+                'path': path,
+                'path_params': [[p['name'], bool(p.get('required'))] for p in parameters if p['in'] == 'path'],
+                'query_params': [p['name'] for p in parameters if p['in'] == 'query'],
+                'body': body,
+            }
+    return operations
+
+
+class SpecBundle(object):
+    """
+    Class for reading and updating the spec bundle file.
+    """
+
+    def __init__(self, state_dir):
+        self.path = os.path.join(state_dir, SPEC_BUNDLE_FILENAME)
+        self.data = {}
+        try:
+            with open(self.path, 'r') as f:
+                self.data = json.load(f)
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            print(f"Couldn't read the spec bundle at {self.path}; rebuilding it. Exception: {e}")
+
+    def save(self):
+        """
+        Write the bundle to disk atomically.
+        """
+        try:
+            tmp_path = f'{self.path}.{os.getpid()}'
+            with open(tmp_path, 'w') as f:
+                json.dump(self.data, f)
+            os.replace(tmp_path, self.path)
+        except Exception as e:
+            print(f"Couldn't write the spec bundle to {self.path}; exception: {e}")
+
+    def get_operations(self, resource):
+        """
+        Returns the operations of resource from the bundle, first extracting them from tapipy's spec if the bundle
+        has no entry for the resource or the spec has changed since the entry was written.
+        """
+        entry = self.data.get(resource)
+        spec_path = get_tapipy_spec_path(resource)
+        if spec_path is None:
+            if entry:
+                return entry['operations']
+            raise errors.UnexpectedRuntimeError(f"No cached spec for the Tapis {resource} API was found in "
+                                                f"{self.path} and tapipy's specs are not available to build one; "
+                                                f"install it with: pip install tapipy")
+        source = get_spec_source(spec_path)
+        if entry and entry['source'] == source:
+            return entry['operations']
+        with open(spec_path, 'rb') as f:
+            spec_dict = pickle.load(f)
+        self.data[resource] = {'source': source, 'operations': parse_operations(spec_dict)}
+        self.save()
+        return self.data[resource]['operations']
+
+
+class Operation(object):
+    """
+    A callable Tapis API operation. Arguments are passed as kwargs named after the operation's parameters, as with
+    tapipy: path and query parameters by name, and the JSON body either by property name or, when the body schema
+    does not declare properties, as request_body.
+    """
+
+    def __init__(self, resource_name, operation_id, op_desc, tapis_client):
+        self.resource_name = resource_name
+        self.operation_id = operation_id
+        self.op_desc = op_desc
+        self.tapis_client = tapis_client
+
+    def get_body(self, kwargs):
+        body = self.op_desc['body']
+        if not body:
+            return {}
+        if not body['properties']:
+            data = kwargs.get('request_body', {})
+        else:
+            data = {}
+            for name in body['properties']:
+                if name in kwargs:
+                    data[name] = kwargs[name]
+                elif name in body['required']:
+                    raise TapisClientError(msg=f'{name} is a required argument.')
+        if body['content_type'] == 'multipart/form-data':
+            multipart_body = MultipartBody(data)
+            return {'data': multipart_body, 'headers': {'Content-Type': multipart_body.content_type}}
+        return {'data': json.dumps(data), 'headers': {'Content-Type': 'application/json'}}
+
+    def __call__(self, **kwargs):
+        path = self.op_desc['path']
+        url = f'{self.tapis_client.base_url}{path}' if path.startswith('/v3/') else \
+            f'{self.tapis_client.base_url}/v3{path}'
+        for name, required in self.op_desc['path_params']:
+            if name not in kwargs or (required and kwargs[name] in (None, '')):
+                raise TapisClientError(msg=f'{name} is a required argument.')
+            url = url.replace('{' + name + '}', str(kwargs[name]))
+        params = {name: kwargs[name] for name in self.op_desc['query_params'] if name in kwargs}
+        return self.tapis_client.request(self.op_desc['method'], url, params=params, **self.get_body(kwargs))
+
+
+class Resource(object):
+    """
+    A Tapis API resource; its operations are created the first time they are accessed.
+    """
+
+    def __init__(self, resource_name, operations, tapis_client):
+        self.resource_name = resource_name
+        self.operations = operations
+        self.tapis_client = tapis_client
+
+    def __getattr__(self, operation_id):
+        operations = self.__dict__.get('operations', {})
+        if operation_id not in operations:
+            raise AttributeError(f"The Tapis {self.__dict__.get('resource_name')} API has no operation "
+                                 f"{operation_id}")
+        operation = Operation(self.resource_name, operation_id, operations[operation_id], self.tapis_client)
+        setattr(self, operation_id, operation)
+        return operation
+
+
+class TapisClient(object):
+    """
+    Tapis client whose resources are built on first access from the spec bundle in state_dir.
+    """
+
+    def __init__(self, base_url, username, state_dir, access_token=None, password=None, resources=None):
+        import requests
+        self.base_url = base_url.rstrip('/')
+        self.username = username
+        self.password = password
+        self.access_token = access_token
+        self.resource_names = resources or DEFAULT_RESOURCES
+        self.spec_bundle = SpecBundle(state_dir)
+        self.requests_session = requests.Session()
+
+    def __getattr__(self, name):
+        if name not in self.__dict__.get('resource_names', []):
+            raise AttributeError(f"TapisClient has no attribute {name}")
+        resource = Resource(name, self.spec_bundle.get_operations(name), self)
+        setattr(self, name, resource)
+        return resource
+
+    def request(self, method, url, data=None, files=None, params=None, headers=None, stream=False,
+                refresh_token=True):
+        """
+        Make a request and return its result: the "result" of a Tapis JSON response converted with to_result(), the
+        decoded JSON if it has no result, or the raw response body otherwise.
+        :param stream: If True, return the requests response, whose body has not been read yet, instead.
+        :param refresh_token: If True and the client has a password, generate a new access token and make the
+        request again when it is rejected with a 401.
+        """
+        import requests
+        request_headers = dict(headers or {})
+        if self.access_token:
+            request_headers['X-Tapis-Token'] = self.access_token
+        request = requests.Request(method, url, params=params, data=data, files=files,
+                                   headers=request_headers).prepare()
+        try:
+            response = self.requests_session.send(request, stream=stream)
+        except Exception as e:
+            raise TapisClientError(msg=f"Unable to make request to Tapis server. Exception: {e}", request=request)
+        if response.status_code == 401 and refresh_token and self.password:
+            response.close()
+            self.get_tokens()
+            if isinstance(data, MultipartBody):
+                data.rewind()
+            return self.request(method, url, data=data, files=files, params=params, headers=headers, stream=stream,
+                                refresh_token=False)
+        if response.status_code >= 300:
+            try:
+                msg = response.json().get('message')
+            except Exception:
+                msg = response.content
+            raise TapisClientError(msg=f"{response.status_code}: {msg}", request=request, response=response)
+        if stream:
+            return response
+        content_type = response.headers.get('content-type') or ''
+        if content_type.lower() != 'application/json':
+            return response.content
+        try:
+            content = response.json()
+        except ValueError:
+            return response.content
+        # as with tapipy, JSON documents that are not Tapis responses (e.g., the lists returned by the Meta API)
+        # are returned as raw bytes
+        if not isinstance(content, dict):
+            return response.content
+        result = content.get('result')
+        if not result and result != [] and result != {}:
+            return content
+        return to_result(result)
+
+    def download(self, system_id, path, file):
+        """
+        Write the contents of a file on a Tapis system to a file object in chunks of DOWNLOAD_CHUNK_BYTES, so that
+        large files are never held in memory as files.getContents() does.
+        """
+        response = self.request('GET', f'{self.base_url}/v3/files/content/{system_id}/{path.lstrip("/")}',
+                                stream=True)
+        with response:
+            for chunk in response.iter_content(chunk_size=DOWNLOAD_CHUNK_BYTES):
+                file.write(chunk)
+
+    def get_tokens(self):
+        """
+        Generate an access token for the username and password of the client.
+        """
+        result = self.request('POST', f'{self.base_url}/v3/oauth2/tokens',
+                              data=json.dumps({'username': self.username,
+                                               'password': self.password,
+                                               'grant_type': 'password'}),
+                              headers={'Content-Type': 'application/json'},
+                              refresh_token=False)
+        self.access_token = result.access_token.access_token
+
+
+def get_tapipy_client(base_url, username, access_token=None, password=None):
+    """
+    Returns a tapipy Tapis client, importing tapipy only when this client is requested.
+    """
+    from tapipy.tapis import Tapis
+    if access_token:
+        return Tapis(base_url=base_url, username=username, access_token=access_token)
+    tapis_client = Tapis(base_url=base_url, username=username, password=password)
+    tapis_client.get_tokens()
+    return tapis_client
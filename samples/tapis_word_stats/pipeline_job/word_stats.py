@@ -5,8 +5,15 @@ When testing locally, be sure to
 $ export _tapisJobUUID=12345.out
 before running the program.
 
+To write one JSON record per input file (plus a final summary record) as each file finishes, instead of the
+text report written at the end of the run, set
+$ export TAPIS_OUTPUT_FORMAT=jsonl
+
 """
+import json
 import os
+import tarfile
+import time
 JOB_ID = os.environ.get('_tapisJobUUID')
 print(f"top of word_stats.py for JOB_ID: {JOB_ID}...")
 
@@ -18,11 +25,22 @@ MANIFEST_FILE_PATH = os.environ.get('TAPIS_MANIFEST_FILE_PATH', '/TapisInput/man
 if MANIFEST_FILE_PATH == 'null':
     MANIFEST_FILE_PATH = '/TapisInput/manifest.json'
 OUTPUT_DATA_CONTAINER_DIR = '/TapisOutput'
+# the format of the results file; either "text" (the default) or "jsonl" (JSON Lines, one record per input file).
+OUTPUT_FORMAT = os.environ.get('TAPIS_OUTPUT_FORMAT', 'text') or 'text'
+if OUTPUT_FORMAT not in ('text', 'jsonl'):
+    print(f"Unrecognized TAPIS_OUTPUT_FORMAT: {OUTPUT_FORMAT}; using text.")
+    OUTPUT_FORMAT = 'text'
+# when the pipeline stages inputs as a single archive, the name of the archive (relative to the input dir)
+INPUT_ARCHIVE = os.environ.get('TAPIS_PIPELINE_INPUT_ARCHIVE')
+if INPUT_ARCHIVE == 'null':
+    INPUT_ARCHIVE = None
 
 print(f"paths being used: \n"
       f"MANIFEST_FILE_PATH: {MANIFEST_FILE_PATH} \n"
       f"INPUT_DATA_CONTAINER_DIR: {INPUT_DATA_CONTAINER_DIR} \n"
-      f"OUTPUT_DATA_CONTAINER_DIR: {OUTPUT_DATA_CONTAINER_DIR} \n")
+      f"OUTPUT_DATA_CONTAINER_DIR: {OUTPUT_DATA_CONTAINER_DIR} \n"
+      f"OUTPUT_FORMAT: {OUTPUT_FORMAT} \n"
+      f"INPUT_ARCHIVE: {INPUT_ARCHIVE} \n")
 
 def get_stats_for_file(file_path):
     """
@@ -36,6 +54,16 @@ def get_stats_for_file(file_path):
     return {'word_count': len(text.split())}
 
 
+# unpack the input archive, if the pipeline staged one
+if INPUT_ARCHIVE:
+    print(f"unpacking input archive: {INPUT_ARCHIVE}")
+    with tarfile.open(os.path.join(INPUT_DATA_CONTAINER_DIR, INPUT_ARCHIVE), 'r:*') as archive:
+        if hasattr(tarfile, 'data_filter'):
+            archive.extractall(INPUT_DATA_CONTAINER_DIR, filter='data')
+        else:
+            archive.extractall(INPUT_DATA_CONTAINER_DIR)
+
+
 # parse the manifest file and get the list of files
 try:
     manifest = parse_manifest_file(MANIFEST_FILE_PATH)
@@ -46,20 +74,73 @@ except Exception as e:
     raise e
 
 
-# final stats result object; will be printed out to a file at the end
-stats = {}
 
-# for each file, do some basic processing...
-for f in files:
-    print(f"processing file: {f}")
-    full_input_path = os.path.join(INPUT_DATA_CONTAINER_DIR, f['file_path'])
-    stats[f['file_path']] = get_stats_for_file(full_input_path)
+def write_record(out, record):
+    """
+    Write a single JSON Lines record to the open output file, out, and flush it so that the record survives the job
+    being killed (e.g., when it hits maxMinutes).
+    :param out: open file object.
+    :param record: dictionary to serialize.
+    :return:
+    """
+    out.write(json.dumps(record) + '\n')
+    out.flush()
+
+
+def process_files_jsonl(files, full_output_path):
+    """
+    Process each file, writing one record per file to full_output_path as soon as it is done, followed by a summary
+    record.
+    :param files: list of file objects from the manifest.
+    :param full_output_path: path of the JSON Lines results file.
+    :return:
+    """
+    run_start = time.time()
+    total_bytes = 0
+    total_words = 0
+    with open(full_output_path, 'w') as out:
+        for f in files:
+            print(f"processing file: {f}")
+            full_input_path = os.path.join(INPUT_DATA_CONTAINER_DIR, f['file_path'])
+            start = time.time()
+            file_stats = get_stats_for_file(full_input_path)
+            elapsed = time.time() - start
+            size = os.path.getsize(full_input_path)
+            total_bytes += size
+            total_words += file_stats['word_count']
+            write_record(out, {'record_type': 'file',
+                               'job_id': JOB_ID,
+                               'file_path': f['file_path'],
+                               'word_count': file_stats['word_count'],
+                               'bytes': size,
+                               'elapsed_seconds': elapsed,
+                               'bytes_per_second': size / elapsed if elapsed > 0 else None})
+        elapsed = time.time() - run_start
+        write_record(out, {'record_type': 'summary',
+                           'job_id': JOB_ID,
+                           'file_count': len(files),
+                           'word_count': total_words,
+                           'bytes': total_bytes,
+                           'elapsed_seconds': elapsed,
+                           'bytes_per_second': total_bytes / elapsed if elapsed > 0 else None})
+
+
+if OUTPUT_FORMAT == 'jsonl':
+    process_files_jsonl(files, os.path.join(OUTPUT_DATA_CONTAINER_DIR, f'{JOB_ID}.jsonl'))
+else:
+    # final stats result object; will be printed out to a file at the end
+    stats = {}
 
-# write out results --
-full_output_path = os.path.join(OUTPUT_DATA_CONTAINER_DIR, f'{JOB_ID}.out')
-with open(full_output_path, 'w') as f:
-    for k, v in stats.items():
-        words = str(v['word_count'])
-        f.write(f'{k}\n******\n ')
-        f.write(f'words: {words}\n\n')
+    # for each file, do some basic processing...
+    for f in files:
+        print(f"processing file: {f}")
+        full_input_path = os.path.join(INPUT_DATA_CONTAINER_DIR, f['file_path'])
+        stats[f['file_path']] = get_stats_for_file(full_input_path)
 
+    # write out results --
+    full_output_path = os.path.join(OUTPUT_DATA_CONTAINER_DIR, f'{JOB_ID}.out')
+    with open(full_output_path, 'w') as f:
+        for k, v in stats.items():
+            words = str(v['word_count'])
+            f.write(f'{k}\n******\n ')
+            f.write(f'words: {words}\n\n')
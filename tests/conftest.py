@@ -0,0 +1,72 @@
+import json
+import os
+
+import pytest
+
+from core import pipelines
+from core.state import PipelineState
+from tests.fakes import FakeTapisClient
+
+PIPELINE_NAME = 'test'
+
+
+@pytest.fixture
+def tapis(monkeypatch):
+    """
+    The in-memory Tapis client every TapisPipelineClient created by the test uses.
+    """
+    client = FakeTapisClient()
+    monkeypatch.setattr(pipelines, 'get_tapipy_client', lambda **kwargs: client)
+    monkeypatch.setattr(pipelines, 'TapisClient', lambda **kwargs: client)
+    return client
+
+
+@pytest.fixture
+def pipeline_config(tmp_path, monkeypatch):
+    """
+    Writes a pipeline config using Tapis system boxes and points TAPIS_PIPELINES_CONFIG_FILE_PATH at it. Tests can
+    change the returned config and call write_config() again.
+    """
+    state_dir = tmp_path / 'state'
+    state_dir.mkdir()
+    config = {"pipeline_name": PIPELINE_NAME,
+              "remote_outbox": {"kind": "tapis", "box_definition": {"system_id": "outbox", "path": "/"}},
+              "remote_inbox": {"kind": "tapis", "box_definition": {"system_id": "inbox", "path": "/"}},
+              "pipeline_job": {"tapis_app_job": {"app_id": "app", "app_version": "1",
+                                                 "manifest_input_name": "manifest"}},
+              "tapis_config": {"base_url": "https://tapis.example.org", "username": "testuser",
+                               "access_token": "access-token-for-tests"},
+              "local_state_dir": str(state_dir),
+              "input_settling": {"settle_seconds": 0}}
+    monkeypatch.setenv('TAPIS_PIPELINES_CONFIG_FILE_PATH', str(tmp_path / 'pipeline_config.json'))
+    write_config(config)
+    return config
+
+
+def write_config(config):
+    with open(os.environ['TAPIS_PIPELINES_CONFIG_FILE_PATH'], 'w') as f:
+        json.dump(config, f)
+
+
+def add_manifest(tapis, remote_id, inputs, last_modified='2020-01-01T00:00:00+00:00'):
+    """
+    Upload a manifest listing inputs (a dict of path to contents), and the inputs, to the outbox.
+    """
+    for path, contents in inputs.items():
+        tapis.files.put('outbox', path, contents, last_modified=last_modified)
+    manifest = {"files": [{"file_path": path} for path in inputs]}
+    tapis.files.put('outbox', f'{pipelines.TAPIS_PIPELINE_MANIFEST_FILENAME_PREFIX}{remote_id}',
+                    json.dumps(manifest).encode('utf-8'), last_modified=last_modified)
+
+
+def get_metadata(tapis, remote_id):
+    return [d for d in tapis.meta.get_collection(f'testuser.{PIPELINE_NAME}') if d['name'] == remote_id][0]
+
+
+def make_polls_due(config):
+    """
+    Clear the poll schedule saved by the last cycle so that the next cycle polls every job in flight.
+    """
+    state = PipelineState(state_dir=config['local_state_dir'], pipeline_name=PIPELINE_NAME)
+    state.data.pop('poll_schedule', None)
+    state.save()
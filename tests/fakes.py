@@ -0,0 +1,172 @@
+"""
+An in-memory stand-in for the Tapis client, implementing the subset of the Meta, Files, Jobs and Apps APIs used by
+TapisPipelineClient, so that pipeline cycles can be run in tests without a Tapis tenant.
+"""
+import ast
+import itertools
+import json
+
+from core.config import Config
+
+
+class FakeMeta(object):
+    """
+    Meta API backed by a dict of collections; documents are matched on equality of every key in the filter, or with
+    $lt, and can be sorted.
+    """
+
+    def __init__(self):
+        self.collections = {}
+        self.ids = itertools.count()
+
+    def get_collection(self, collection):
+        return self.collections.setdefault(collection, [])
+
+    def listCollectionNames(self, db):
+        return json.dumps(list(self.collections)).encode('utf-8')
+
+    def createCollection(self, db, collection):
+        self.get_collection(collection)
+
+    def listIndexes(self, db, collection):
+        return json.dumps([{'_id': '_id_', 'key': {'_id': 1}}]).encode('utf-8')
+
+    def createIndex(self, db, collection, indexName, request_body):
+        pass
+
+    @staticmethod
+    def matches(value, condition):
+        if isinstance(condition, dict) and '$lt' in condition:
+            return value is not None and value < condition['$lt']
+        return value == condition
+
+    def listDocuments(self, db, collection, filter='{}', page=1, pagesize=10, sort=None, **kwargs):
+        query = ast.literal_eval(filter) if isinstance(filter, str) else filter
+        documents = [d for d in self.get_collection(collection)
+                     if all(self.matches(d.get(k), v) for k, v in query.items())]
+        for key, direction in reversed(list(ast.literal_eval(sort).items()) if sort else []):
+            documents.sort(key=lambda d: d.get(key), reverse=direction < 0)
+        return json.dumps(documents[(page - 1) * pagesize:page * pagesize]).encode('utf-8')
+
+    def createDocument(self, db, collection, request_body):
+        self.get_collection(collection).append(dict(request_body, _id={'$oid': str(next(self.ids))}))
+
+    def modifyDocument(self, db, collection, docId, request_body):
+        documents = self.get_collection(collection)
+        for i, document in enumerate(documents):
+            if document['_id']['$oid'] == docId:
+                documents[i] = dict(request_body, _id=document['_id'])
+
+    def deleteDocument(self, db, collection, docId):
+        documents = self.get_collection(collection)
+        documents[:] = [d for d in documents if not d['_id']['$oid'] == docId]
+
+
+class FakeFiles(object):
+    """
+    Files API backed by a dict mapping (system_id, path) to contents; paths are stored without a leading '/'.
+    """
+
+    def __init__(self):
+        self.files = {}
+        self.last_modified = {}
+        self.downloads = []
+        self.uploads = []
+
+    def put(self, system_id, path, contents, last_modified='2020-01-01T00:00:00+00:00'):
+        self.files[(system_id, path.strip('/'))] = contents
+        self.last_modified[(system_id, path.strip('/'))] = last_modified
+
+    def get(self, system_id, path):
+        return self.files.get((system_id, path.strip('/')))
+
+    def get_listing(self, system_id, path):
+        return Config(name=path.split('/')[-1],
+                      path=path,
+                      uri=f'tapis://{system_id}/{path}',
+                      size=len(self.files[(system_id, path)]),
+                      lastModified=self.last_modified[(system_id, path)],
+                      type='file')
+
+    def listFiles(self, systemId, path, recurse=False):
+        path = path.strip('/')
+        if (systemId, path) in self.files:
+            return [self.get_listing(systemId, path)]
+        prefix = f'{path}/' if path else ''
+        paths = [p for s, p in self.files if s == systemId and p.startswith(prefix)]
+        if not paths and path:
+            raise Exception(f'404: {systemId}/{path} not found')
+        if recurse:
+            return [self.get_listing(systemId, p) for p in sorted(paths)]
+        listings = []
+        for name in sorted(set(p[len(prefix):].split('/')[0] for p in paths)):
+            if (systemId, f'{prefix}{name}') in self.files:
+                listings.append(self.get_listing(systemId, f'{prefix}{name}'))
+            else:
+                listings.append(Config(name=name, path=f'{prefix}{name}', size=0, lastModified='', type='dir'))
+        return listings
+
+    def getContents(self, systemId, path):
+        if (systemId, path.strip('/')) not in self.files:
+            raise Exception(f'404: {systemId}/{path} not found')
+        self.downloads.append(path.strip('/'))
+        return self.files[(systemId, path.strip('/'))]
+
+    def insert(self, systemId, path, file):
+        self.uploads.append(path.strip('/'))
+        self.put(systemId, path, file.read(), last_modified='2030-01-01T00:00:00+00:00')
+
+    def moveCopy(self, systemId, path, operation, newPath):
+        self.files[(systemId, newPath.strip('/'))] = self.files.pop((systemId, path.strip('/')))
+        self.last_modified[(systemId, newPath.strip('/'))] = self.last_modified.pop((systemId, path.strip('/')))
+
+    def delete(self, systemId, path):
+        self.files.pop((systemId, path.strip('/')), None)
+
+
+class FakeJobs(object):
+    """
+    Jobs API backed by a dict of jobs by uuid; submitted jobs stay PENDING until a test sets their status.
+    """
+
+    def __init__(self):
+        self.jobs = {}
+        self.uuids = itertools.count()
+        self.submitted = []
+
+    def submitJob(self, **job):
+        uuid = f'job-{next(self.uuids)}'
+        self.submitted.append(job)
+        self.jobs[uuid] = Config(uuid=uuid,
+                                 name=job['name'],
+                                 appId=job['appId'],
+                                 status='PENDING',
+                                 maxMinutes=10,
+                                 created='2100-01-01T00:00:00Z',
+                                 archiveSystemId='archive',
+                                 archiveSystemDir=f'/jobs/{uuid}')
+        return self.jobs[uuid]
+
+    def getJob(self, jobUuid):
+        return self.jobs[jobUuid]
+
+    def getJobList(self, limit=100, orderBy=None):
+        return list(reversed(list(self.jobs.values())))[:limit]
+
+    def cancelJob(self, jobUuid):
+        self.jobs[jobUuid].status = 'CANCELLED'
+
+
+class FakeApps(object):
+
+    def getApp(self, appId, appVersion):
+        return Config(jobAttributes=Config(fileInputs=[Config(meta=Config(name='manifest'))]))
+
+
+class FakeTapisClient(object):
+
+    def __init__(self):
+        self.meta = FakeMeta()
+        self.files = FakeFiles()
+        self.jobs = FakeJobs()
+        self.apps = FakeApps()
@@ -0,0 +1,124 @@
+"""
+Cycles of the async pipeline client, served by the in-memory Tapis fake through an httpx mock transport, and the
+hand-off of completed jobs to the blocking client for delivery.
+"""
+import asyncio
+import json
+import os
+
+import pytest
+
+from core import errors, pipelines
+from core.journal import Journal, TRANSFER
+from tests.conftest import add_manifest, get_metadata, make_polls_due, write_config, PIPELINE_NAME
+
+httpx = pytest.importorskip('httpx')
+from core.async_pipelines import AsyncTapisPipelineClient  # noqa: E402
+
+
+def get_response(tapis, request):
+    """
+    Route a request to the Tapis API to the fake client.
+    """
+    parts = request.url.path.split('/')[2:]
+    service, method = parts[0], request.method
+    if service == 'meta':
+        db = parts[1]
+        if len(parts) == 2:
+            return tapis.meta.listCollectionNames(db=db)
+        collection = parts[2]
+        if len(parts) == 3 and method == 'PUT':
+            return tapis.meta.createCollection(db=db, collection=collection)
+        if len(parts) == 3 and method == 'GET':
+            return tapis.meta.listDocuments(db=db, collection=collection,
+                                            filter=json.loads(request.url.params['filter']),
+                                            pagesize=int(request.url.params['pagesize']))
+        if len(parts) == 3 and method == 'POST':
+            return tapis.meta.createDocument(db=db, collection=collection, request_body=json.loads(request.content))
+        if parts[3] == '_indexes':
+            if method == 'GET':
+                return tapis.meta.listIndexes(db=db, collection=collection)
+            return tapis.meta.createIndex(db=db, collection=collection, indexName=parts[4],
+                                          request_body=json.loads(request.content))
+        return tapis.meta.modifyDocument(db=db, collection=collection, docId=parts[3],
+                                         request_body=json.loads(request.content))
+    if service == 'files':
+        path = '/'.join(parts[3:])
+        if parts[1] == 'ops':
+            return {'result': tapis.files.listFiles(systemId=parts[2], path=path)}
+        return tapis.files.getContents(systemId=parts[2], path=path)
+    if service == 'apps':
+        return {'result': tapis.apps.getApp(appId=parts[1], appVersion=parts[2])}
+    if parts[1] == 'submit':
+        return {'result': tapis.jobs.submitJob(**json.loads(request.content))}
+    if parts[1] == 'list':
+        return {'result': tapis.jobs.getJobList(limit=int(request.url.params['limit']))}
+    return {'result': tapis.jobs.getJob(jobUuid=parts[1])}
+
+
+def get_transport(tapis):
+    def handler(request):
+        try:
+            result = get_response(tapis, request)
+        except Exception as e:
+            return httpx.Response(404, json={'message': str(e)})
+        if isinstance(result, bytes):
+            return httpx.Response(200, content=result)
+        return httpx.Response(200, json=result)
+    return httpx.MockTransport(handler)
+
+
+def run_async_cycle(tapis):
+    async def run():
+        async with httpx.AsyncClient(transport=get_transport(tapis)) as http_client:
+            client = await AsyncTapisPipelineClient.create(http_client=http_client)
+            return await client.run_cycle()
+    return asyncio.run(run())
+
+
+def get_unfinished(config):
+    return Journal(state_dir=config['local_state_dir'], pipeline_name=PIPELINE_NAME).get_unfinished()
+
+
+def test_async_cycle_submits_and_polls(tapis, pipeline_config):
+    add_manifest(tapis, '1', {'a.txt': b'aaa'})
+    assert run_async_cycle(tapis) == []
+    assert len(tapis.jobs.submitted) == 1
+    assert get_metadata(tapis, '1')['status'] == 'JOB_SUBMITTED_TO_TAPIS'
+    tapis.jobs.jobs['job-0'].status = 'FINISHED'
+    make_polls_due(pipeline_config)
+    assert [job.uuid for job in run_async_cycle(tapis)] == ['job-0']
+    assert get_metadata(tapis, '1')['status'] == 'FINISHED'
+    assert len(tapis.jobs.submitted) == 1
+
+
+def test_jobs_completed_by_the_async_client_are_delivered_by_the_blocking_client(tapis, pipeline_config):
+    add_manifest(tapis, '1', {'a.txt': b'aaa'})
+    run_async_cycle(tapis)
+    tapis.jobs.jobs['job-0'].status = 'FINISHED'
+    tapis.files.put('archive', 'jobs/job-0/result.txt', b'RESULT')
+    make_polls_due(pipeline_config)
+    run_async_cycle(tapis)
+    unfinished = get_unfinished(pipeline_config)
+    assert [(entry['op'], entry['tapis_job_uuid'], entry['remote_id']) for entry in unfinished.values()] == \
+        [(TRANSFER, 'job-0', '1')]
+    pipelines.main()
+    assert tapis.files.get('inbox', '1/result.txt') == b'RESULT'
+    assert get_metadata(tapis, '1')['status'] == 'Finished data transfer REMOTE'
+    assert get_unfinished(pipeline_config) == {}
+
+
+@pytest.mark.parametrize('change', [
+    lambda config: config.update(result_cache={"enabled": True}),
+    lambda config: config['pipeline_job']['tapis_app_job'].update(input_staging='archive'),
+    lambda config: config['pipeline_job']['tapis_app_job'].update(fan_out={"shard_count": 2}),
+    lambda config: config.update(remote_outbox={"kind": "local",
+                                                "box_definition": {"system_id": "outbox", "path": "/",
+                                                                   "root_dir": os.getcwd()}}),
+])
+def test_unsupported_configs_are_rejected(pipeline_config, change):
+    change(pipeline_config)
+    write_config(pipeline_config)
+    with pytest.raises(errors.PipelineConfigError) as e:
+        AsyncTapisPipelineClient()
+    assert 'does not support' in e.value.msg
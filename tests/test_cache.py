@@ -0,0 +1,86 @@
+"""
+Result cache keys and eviction, and cache lookups for manifests in a Tapis system outbox.
+"""
+import json
+import time
+
+from core import pipelines
+from core.cache import ResultCache
+from tests.conftest import make_polls_due, write_config
+from tests.fakes import FakeTapisClient
+
+CHECKSUMS = {'a.txt': 'aaa', 'b.txt': 'bbb'}
+
+
+def test_cache_key_depends_on_the_app_version_and_the_inputs_only():
+    key = ResultCache.get_cache_key('app', '1', CHECKSUMS)
+    assert ResultCache.get_cache_key('app', '1', dict(reversed(list(CHECKSUMS.items())))) == key
+    assert ResultCache.get_cache_key('app', '2', CHECKSUMS) != key
+    assert ResultCache.get_cache_key('app', '1', dict(CHECKSUMS, b='ccc')) != key
+    assert ResultCache.get_cache_key('app', '1', CHECKSUMS, input_observations=None) == key
+
+
+def test_cache_key_includes_the_observations_of_unverified_inputs():
+    observations = {'a.txt': [3, '2020-01-01T00:00:00Z'], 'b.txt': [3, '2020-01-01T00:00:00Z']}
+    key = ResultCache.get_cache_key('app', '1', CHECKSUMS, input_observations=observations)
+    assert key != ResultCache.get_cache_key('app', '1', CHECKSUMS)
+    reuploaded = dict(observations, **{'b.txt': [3, '2020-01-02T00:00:00Z']})
+    assert ResultCache.get_cache_key('app', '1', CHECKSUMS, input_observations=reuploaded) != key
+
+
+def get_cache(tapis, **kwargs):
+    return ResultCache(tapis_client=tapis, db='pipelines', collection='cache', **kwargs)
+
+
+def add_entry(tapis, cache_key, age_days):
+    tapis.meta.createDocument(db='pipelines', collection='cache',
+                              request_body={'cache_key': cache_key, 'tapis_job_uuid': f'job-{cache_key}',
+                                            'remote_id': cache_key,
+                                            'create_timestamp': time.time() - age_days * 86400})
+
+
+def get_cache_keys(tapis):
+    return sorted(entry['cache_key'] for entry in tapis.meta.get_collection('cache'))
+
+
+def test_entries_older_than_max_age_are_evicted_and_not_returned():
+    tapis = FakeTapisClient()
+    add_entry(tapis, 'old', age_days=10)
+    cache = get_cache(tapis, max_age_days=5)
+    assert cache.get('old') is None
+    cache.add('new', tapis_job_uuid='job-new', remote_id='new')
+    assert get_cache_keys(tapis) == ['new']
+    assert cache.get('new')['tapis_job_uuid'] == 'job-new'
+
+
+def test_oldest_entries_beyond_max_entries_are_evicted():
+    tapis = FakeTapisClient()
+    for i, key in enumerate(['k1', 'k2', 'k3']):
+        add_entry(tapis, key, age_days=10 - i)
+    get_cache(tapis, max_entries=2).add('k4', tapis_job_uuid='job-k4', remote_id='k4')
+    assert get_cache_keys(tapis) == ['k3', 'k4']
+
+
+def add_checksummed_manifest(tapis, remote_id, last_modified):
+    tapis.files.put('outbox', 'a.txt', b'aaa', last_modified=last_modified)
+    manifest = {"files": [{"file_path": "a.txt", "md5_checksum": "47bce5c74f589f4867dbd57e9ca9f808"}]}
+    tapis.files.put('outbox', f'{pipelines.TAPIS_PIPELINE_MANIFEST_FILENAME_PREFIX}{remote_id}',
+                    json.dumps(manifest).encode('utf-8'), last_modified=last_modified)
+
+
+def test_reuploaded_inputs_on_a_tapis_box_are_not_served_from_the_cache(tapis, pipeline_config):
+    pipeline_config['result_cache'] = {'enabled': True}
+    write_config(pipeline_config)
+    add_checksummed_manifest(tapis, '1', last_modified='2020-01-01T00:00:00+00:00')
+    pipelines.main()
+    tapis.jobs.jobs['job-0'].status = 'FINISHED'
+    make_polls_due(pipeline_config)
+    pipelines.main()
+    # the same input, unchanged: served from the cache
+    add_checksummed_manifest(tapis, '2', last_modified='2020-01-01T00:00:00+00:00')
+    pipelines.main()
+    assert len(tapis.jobs.submitted) == 1
+    # the input is replaced, with the same declared md5_checksum: a new job is submitted
+    add_checksummed_manifest(tapis, '3', last_modified='2020-01-02T00:00:00+00:00')
+    pipelines.main()
+    assert len(tapis.jobs.submitted) == 2
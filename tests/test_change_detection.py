@@ -0,0 +1,88 @@
+"""
+Cheap change detection between cycles: the setup checks and manifest discovery are skipped when nothing changed.
+"""
+import time
+
+from core import pipelines
+from core.config import Config
+from core.state import PipelineState, SETUP_CHECK_SECONDS
+from tests.conftest import add_manifest, write_config, PIPELINE_NAME
+
+
+def count_calls(monkeypatch, obj, name):
+    calls = []
+    original = getattr(obj, name)
+
+    def wrapper(*args, **kwargs):
+        calls.append(kwargs)
+        return original(*args, **kwargs)
+    monkeypatch.setattr(obj, name, wrapper)
+    return calls
+
+
+def get_state(config):
+    return PipelineState(state_dir=config['local_state_dir'], pipeline_name=PIPELINE_NAME)
+
+
+def test_outbox_fingerprint():
+    listing = [Config(name='a', lastModified='2020-01-01T00:00:00Z'), Config(name='b', lastModified='2021-01-01')]
+    assert PipelineState.get_outbox_fingerprint(listing) == [2, '2021-01-01']
+    assert PipelineState.get_outbox_fingerprint([]) == [0, '']
+
+
+def test_setup_is_verified_once_then_skipped(tapis, pipeline_config, monkeypatch):
+    collection_checks = count_calls(monkeypatch, tapis.meta, 'listCollectionNames')
+    app_checks = count_calls(monkeypatch, tapis.apps, 'getApp')
+    pipelines.main()
+    pipelines.main()
+    assert len(collection_checks) == 1
+    assert len(app_checks) == 1
+
+
+def test_setup_is_verified_again_after_setup_check_seconds(tapis, pipeline_config, monkeypatch):
+    collection_checks = count_calls(monkeypatch, tapis.meta, 'listCollectionNames')
+    pipelines.main()
+    verified_at = get_state(pipeline_config).data['setup_verified_at']
+    # a run that skipped the checks must not extend the verification
+    pipelines.main()
+    assert get_state(pipeline_config).data['setup_verified_at'] == verified_at
+    state = get_state(pipeline_config)
+    state.data['setup_verified_at'] = time.time() - SETUP_CHECK_SECONDS - 1
+    state.save()
+    pipelines.main()
+    assert len(collection_checks) == 2
+
+
+def test_setup_is_verified_again_when_the_config_changes(tapis, pipeline_config, monkeypatch):
+    app_checks = count_calls(monkeypatch, tapis.apps, 'getApp')
+    pipelines.main()
+    pipeline_config['pipeline_job']['tapis_app_job']['app_version'] = '2'
+    write_config(pipeline_config)
+    pipelines.main()
+    assert len(app_checks) == 2
+
+
+def test_discovery_is_skipped_while_the_outbox_is_unchanged(tapis, pipeline_config, monkeypatch):
+    add_manifest(tapis, '1', {'a.txt': b'aaa'})
+    pipelines.main()
+    claims = count_calls(monkeypatch, tapis.meta, 'listDocuments')
+    pipelines.main()
+    assert not [c for c in claims if 'name' in c.get('filter', '')]
+    add_manifest(tapis, '2', {'b.txt': b'bbb'}, last_modified='2021-01-01T00:00:00+00:00')
+    pipelines.main()
+    assert len(tapis.jobs.submitted) == 2
+
+
+def test_failed_claim_scans_the_outbox_again(tapis, pipeline_config, monkeypatch):
+    add_manifest(tapis, '1', {'a.txt': b'aaa'})
+    original = tapis.meta.createDocument
+
+    def create_document(**kwargs):
+        raise Exception('503 Service Unavailable')
+    monkeypatch.setattr(tapis.meta, 'createDocument', create_document)
+    pipelines.main()
+    assert tapis.jobs.submitted == []
+    assert 'outbox_fingerprint' not in get_state(pipeline_config).data
+    monkeypatch.setattr(tapis.meta, 'createDocument', original)
+    pipelines.main()
+    assert len(tapis.jobs.submitted) == 1
@@ -0,0 +1,71 @@
+import io
+import json
+from datetime import datetime, timezone
+
+from core.config import Config
+from core.delivery import append_index_entry, get_file_md5, get_index_segment_name, get_relative_path, \
+    is_unchanged, needs_download, needs_rotation, parse_output_manifest, OUTPUT_INDEX_FILENAME
+
+LISTING = Config(size=3, lastModified='2020-01-01T00:00:00Z')
+
+
+def get_entry(**kwargs):
+    return dict({"size": 3, "md5_checksum": "abc", "source": [3, '2020-01-01T00:00:00Z']}, **kwargs)
+
+
+def test_get_relative_path():
+    assert get_relative_path('/jobs/j1/out/a.txt', 'jobs/j1') == 'out/a.txt'
+    assert get_relative_path('jobs/j1/a.txt', '/jobs/j1/') == 'a.txt'
+    assert get_relative_path('/a.txt', '') == 'a.txt'
+
+
+def test_parse_output_manifest():
+    assert parse_output_manifest(None) == {'files': {}}
+    assert parse_output_manifest(b'not json') == {'files': {}}
+    assert parse_output_manifest(b'{"files": []}') == {'files': {}}
+    assert parse_output_manifest(json.dumps({'files': {'a': get_entry()}}))['files'] == {'a': get_entry()}
+
+
+def test_new_output_needs_download():
+    assert needs_download('a.txt', LISTING, None, {})
+
+
+def test_output_delivered_from_the_same_source_is_not_downloaded():
+    assert not needs_download('a.txt', LISTING, get_entry(), {'a.txt': 3})
+
+
+def test_changed_source_or_missing_inbox_copy_needs_download():
+    assert needs_download('a.txt', LISTING, get_entry(source=[3, '2021-01-01T00:00:00Z']), {'a.txt': 3})
+    assert needs_download('a.txt', LISTING, get_entry(), {})
+    assert needs_download('a.txt', LISTING, get_entry(), {'a.txt': 2})
+
+
+def test_is_unchanged():
+    assert is_unchanged('a.txt', 'abc', get_entry(), {'a.txt': 3})
+    assert not is_unchanged('a.txt', 'def', get_entry(), {'a.txt': 3})
+    assert not is_unchanged('a.txt', 'abc', get_entry(), {})
+    assert not is_unchanged('a.txt', 'abc', None, {'a.txt': 3})
+
+
+def test_get_file_md5():
+    assert get_file_md5(io.BytesIO(b'abc'), chunk_size=2) == ('900150983cd24fb0d6963f7d28e17f72', 3)
+
+
+def test_append_index_entry():
+    contents = append_index_entry(None, {'remote_id': '1'})
+    contents = append_index_entry(contents, {'remote_id': '2'})
+    assert [json.loads(line)['remote_id'] for line in contents.splitlines()] == ['1', '2']
+
+
+def test_needs_rotation():
+    assert not needs_rotation(None)
+    assert not needs_rotation(b'{}\n{}\n', max_entries=3)
+    assert needs_rotation(b'{}\n{}\n{}\n', max_entries=3)
+
+
+def test_index_segment_names_sort_by_rotation_time():
+    first = get_index_segment_name(datetime(2026, 1, 2, 3, 4, 5, 6, tzinfo=timezone.utc))
+    second = get_index_segment_name(datetime(2026, 1, 2, 3, 4, 5, 7, tzinfo=timezone.utc))
+    assert first == 'tapis_pipeline_output_index.20260102T030405000006Z.jsonl'
+    assert first < second
+    assert first != OUTPUT_INDEX_FILENAME
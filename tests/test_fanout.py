@@ -0,0 +1,91 @@
+import os
+
+import jsonschema
+import pytest
+
+from core import pipelines
+from core.config import parse_pipeline_config
+from core.fanout import split_inputs
+from tests.conftest import add_manifest, get_metadata, write_config
+from tests.test_recovery import crash_on
+
+
+def get_inputs(count):
+    return [{"file_path": f"f{i}"} for i in range(count)]
+
+
+def test_split_by_count_keeps_manifest_order():
+    inputs = get_inputs(5)
+    shards = split_inputs(inputs, shard_count=2)
+    assert shards == [inputs[:3], inputs[3:]]
+
+
+def test_no_empty_shards():
+    shards = split_inputs(get_inputs(2), shard_count=5)
+    assert len(shards) == 2
+    assert all(shards)
+    assert split_inputs(get_inputs(1), shard_count=0) == [get_inputs(1)]
+
+
+def test_min_files_per_shard_reduces_the_number_of_shards():
+    shards = split_inputs(get_inputs(10), shard_count=8, min_files_per_shard=4)
+    assert len(shards) == 3
+    assert sum(len(s) for s in shards) == 10
+
+
+def test_split_by_bytes_balances_shard_sizes():
+    inputs = get_inputs(4)
+    sizes = {"f0": 100, "f1": 60, "f2": 50, "f3": 10}
+    shards = split_inputs(inputs, shard_count=2, shard_by='bytes', input_sizes=sizes)
+    assert sorted(sum(sizes[i['file_path']] for i in s) for s in shards) == [110, 110]
+
+
+def test_split_by_bytes_without_sizes_splits_by_count():
+    inputs = get_inputs(4)
+    assert split_inputs(inputs, shard_count=2, shard_by='bytes') == [inputs[:2], inputs[2:]]
+
+
+def test_gather_app_id_requires_a_version(pipeline_config):
+    pipeline_config['pipeline_job']['tapis_app_job']['fan_out'] = {"shard_count": 2, "gather_app_id": "gather"}
+    write_config(pipeline_config)
+    with pytest.raises(jsonschema.ValidationError):
+        parse_pipeline_config(os.environ['TAPIS_PIPELINES_CONFIG_FILE_PATH'])
+
+
+def test_shards_of_an_interrupted_fan_out_submission_are_cancelled(tapis, pipeline_config, monkeypatch):
+    pipeline_config['pipeline_job']['tapis_app_job']['fan_out'] = {"shard_count": 2}
+    write_config(pipeline_config)
+    add_manifest(tapis, '1', {'a.txt': b'aaa', 'b.txt': b'bbb'})
+    submissions = []
+    crash_on(monkeypatch, pipelines.TapisPipelineClient, 'submit_tapis_job',
+             lambda job, manifest: submissions.append(job) or len(submissions) == 2)
+    with pytest.raises(KeyboardInterrupt):
+        pipelines.main()
+    assert len(tapis.jobs.submitted) == 1
+    pipelines.main()
+    assert len(tapis.jobs.submitted) == 1
+    assert tapis.jobs.jobs['job-0'].status == 'CANCELLED'
+    metadata = get_metadata(tapis, '1')
+    assert metadata['status'] == 'ERROR'
+    assert metadata['additional_info']['shards'] == [{"tapis_job_uuid": 'job-0', "tapis_job_status": 'CANCELLED'}]
+
+
+def get_staged_inputs(tapis):
+    return [[inp['sourceUrl'] for inp in job['fileInputs'][1:]] for job in tapis.jobs.submitted]
+
+
+def test_shards_stage_their_own_directory(tapis, pipeline_config):
+    pipeline_config['pipeline_job']['tapis_app_job'].update(input_staging='directory', fan_out={"shard_count": 2})
+    write_config(pipeline_config)
+    add_manifest(tapis, '1', {'data/a/1.txt': b'1', 'data/a/2.txt': b'2', 'data/b/3.txt': b'3', 'data/b/4.txt': b'4'})
+    pipelines.main()
+    assert get_staged_inputs(tapis) == [['tapis://outbox/data/a'], ['tapis://outbox/data/b']]
+
+
+def test_shards_sharing_a_directory_stage_their_files(tapis, pipeline_config):
+    pipeline_config['pipeline_job']['tapis_app_job'].update(input_staging='directory', fan_out={"shard_count": 2})
+    write_config(pipeline_config)
+    add_manifest(tapis, '1', {'data/1.txt': b'1', 'data/2.txt': b'2', 'data/3.txt': b'3'})
+    pipelines.main()
+    assert get_staged_inputs(tapis) == [['tapis://outbox/data/1.txt', 'tapis://outbox/data/2.txt'],
+                                        ['tapis://outbox/data/3.txt']]
@@ -0,0 +1,54 @@
+"""
+Manifests held until their inputs finish uploading.
+"""
+import pytest
+
+from core import pipelines
+from core.journal import Journal, SUBMIT
+from tests.conftest import add_manifest, get_metadata, write_config
+from tests.test_recovery import crash_on
+
+
+def test_manifest_is_held_until_its_inputs_settle(tapis, pipeline_config):
+    pipeline_config['input_settling'] = {'settle_seconds': 60}
+    write_config(pipeline_config)
+    add_manifest(tapis, '1', {'a.txt': b'aaa'}, last_modified='2100-01-01T00:00:00+00:00')
+    pipelines.main()
+    pipelines.main()
+    assert tapis.jobs.submitted == []
+    assert get_metadata(tapis, '1')['status'] == pipelines.WAITING_FOR_INPUTS_STATUS
+    tapis.files.put('outbox', 'a.txt', b'aaa', last_modified='2020-01-01T00:00:00+00:00')
+    pipelines.main()
+    assert len(tapis.jobs.submitted) == 1
+    assert get_metadata(tapis, '1')['status'] == 'JOB_SUBMITTED_TO_TAPIS'
+
+
+def test_held_manifest_is_submitted_once_after_a_crash(tapis, pipeline_config, monkeypatch):
+    pipeline_config['input_settling'] = {'settle_seconds': 60}
+    write_config(pipeline_config)
+    add_manifest(tapis, '1', {'a.txt': b'aaa'}, last_modified='2100-01-01T00:00:00+00:00')
+    pipelines.main()
+    assert tapis.jobs.submitted == []
+    assert get_metadata(tapis, '1')['status'] == pipelines.WAITING_FOR_INPUTS_STATUS
+    # the upload finishes; the run that submits the held manifest crashes before recording the job
+    tapis.files.put('outbox', 'a.txt', b'aaa', last_modified='2020-01-01T00:00:00+00:00')
+    crash_on(monkeypatch, Journal, 'done', lambda op, key, **data: op == SUBMIT)
+    with pytest.raises(KeyboardInterrupt):
+        pipelines.main()
+    pipelines.main()
+    pipelines.main()
+    assert len(tapis.jobs.submitted) == 1
+    assert get_metadata(tapis, '1')['status'] == 'JOB_SUBMITTED_TO_TAPIS'
+
+
+def test_manifest_is_held_when_an_input_listing_is_empty(tapis, pipeline_config, monkeypatch):
+    add_manifest(tapis, '1', {'a.txt': b'aaa'})
+    list_files = tapis.files.listFiles
+    monkeypatch.setattr(tapis.files, 'listFiles',
+                        lambda systemId, path, recurse=False: [] if path == 'a.txt' else list_files(systemId, path))
+    pipelines.main()
+    assert tapis.jobs.submitted == []
+    assert get_metadata(tapis, '1')['status'] == pipelines.WAITING_FOR_INPUTS_STATUS
+    monkeypatch.setattr(tapis.files, 'listFiles', list_files)
+    pipelines.main()
+    assert len(tapis.jobs.submitted) == 1
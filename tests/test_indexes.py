@@ -0,0 +1,45 @@
+from core import pipelines
+from core.indexes import MetaIndexManager, get_missing_indexes, index_matches, PIPELINE_INDEXES
+from tests.conftest import add_manifest, get_metadata
+
+DEFAULT_INDEX = {'_id': '_id_', 'key': {'_id': 1}}
+
+
+def test_all_indexes_missing_from_a_new_collection():
+    assert get_missing_indexes([DEFAULT_INDEX], PIPELINE_INDEXES) == list(PIPELINE_INDEXES)
+
+
+def test_indexes_are_matched_on_keys_not_names():
+    existing = [DEFAULT_INDEX,
+                {'_id': 'created_by_admin', 'key': {'name': 1}, 'unique': True},
+                {'_id': 'status_updated', 'key': {'status': 1, 'last_update_timestamp': 1}}]
+    assert get_missing_indexes(existing, PIPELINE_INDEXES) == []
+
+
+def test_key_order_matters():
+    spec = {"keys": {"status": 1, "last_update_timestamp": 1}}
+    assert not index_matches({'key': {'last_update_timestamp': 1, 'status': 1}}, spec)
+
+
+def test_non_unique_index_does_not_satisfy_a_unique_spec():
+    spec = {"keys": {"name": 1}, "ops": {"unique": True}}
+    assert not index_matches({'key': {'name': 1}}, spec)
+    assert index_matches({'key': {'name': 1}, 'unique': True}, {"keys": {"name": 1}})
+
+
+def test_status_index_uses_the_numeric_update_time(tapis, pipeline_config):
+    add_manifest(tapis, '1', {'a.txt': b'aaa'})
+    pipelines.main()
+    metadata = get_metadata(tapis, '1')
+    assert isinstance(metadata['last_update_timestamp'], float)
+    assert {"status": 1, "last_update_timestamp": 1} in [spec['keys'] for spec in PIPELINE_INDEXES.values()]
+
+
+def test_report_on_a_collection_whose_indexes_cannot_be_listed(tapis, capsys):
+    def list_indexes(db, collection):
+        raise Exception('404: collection not found')
+    tapis.meta.listIndexes = list_indexes
+    report = MetaIndexManager(tapis_client=tapis, db='pipelines').report('missing', PIPELINE_INDEXES)
+    assert report['collection'] == 'missing'
+    assert 'collection not found' in report['error']
+    assert 'Could not list the indexes on collection missing' in capsys.readouterr().out
@@ -0,0 +1,75 @@
+from core.journal import Journal, CLAIM, SUBMIT, STATUS_UPDATE, TRANSFER
+
+
+def get_journal(tmp_path):
+    return Journal(state_dir=str(tmp_path), pipeline_name='test')
+
+
+def test_empty_journal_has_no_unfinished_work(tmp_path):
+    assert get_journal(tmp_path).get_unfinished() == {}
+
+
+def test_unfinished_entry_is_merged_with_earlier_entries(tmp_path):
+    journal = get_journal(tmp_path)
+    journal.intent(CLAIM, '1', name='tapis_pipeline_manifest_1', path='tapis_pipeline_manifest_1')
+    journal.done(CLAIM, '1')
+    journal.intent(SUBMIT, '1', job_names=['job'], app_id='app')
+    unfinished = journal.get_unfinished()
+    assert list(unfinished) == ['1']
+    assert unfinished['1']['op'] == SUBMIT
+    assert unfinished['1']['phase'] == 'intent'
+    assert unfinished['1']['name'] == 'tapis_pipeline_manifest_1'
+    assert unfinished['1']['job_names'] == ['job']
+
+
+def test_claim_and_submit_are_not_final(tmp_path):
+    journal = get_journal(tmp_path)
+    journal.intent(CLAIM, '1', name='m1', path='m1')
+    journal.done(CLAIM, '1')
+    journal.intent(SUBMIT, '2', job_names=['job'], app_id='app')
+    journal.done(SUBMIT, '2', info={})
+    assert set(journal.get_unfinished()) == {'1', '2'}
+
+
+def test_final_ops_and_aborts_finish_a_key(tmp_path):
+    journal = get_journal(tmp_path)
+    journal.intent(SUBMIT, '1', job_names=['job'], app_id='app')
+    journal.done(SUBMIT, '1', info={})
+    journal.intent(STATUS_UPDATE, '1', statuskey='JOB_SUBMITTED_TO_TAPIS', info={})
+    journal.done(STATUS_UPDATE, '1', statuskey='JOB_SUBMITTED_TO_TAPIS')
+    journal.intent(TRANSFER, 'job-0', remote_id='1')
+    journal.done(TRANSFER, 'job-0')
+    journal.intent(CLAIM, '2', name='m2', path='m2')
+    journal.abort(CLAIM, '2')
+    assert journal.get_unfinished() == {}
+
+
+def test_new_claim_starts_the_key_over(tmp_path):
+    journal = get_journal(tmp_path)
+    journal.intent(CLAIM, '1', name='m1', path='m1')
+    journal.intent(SUBMIT, '1', job_names=['old'], app_id='app')
+    journal.abort(SUBMIT, '1')
+    journal.intent(CLAIM, '1', name='m1', path='m1')
+    unfinished = journal.get_unfinished()
+    assert unfinished['1']['op'] == CLAIM
+    assert 'job_names' not in unfinished['1']
+
+
+def test_partially_written_line_is_skipped(tmp_path):
+    journal = get_journal(tmp_path)
+    journal.intent(CLAIM, '1', name='m1', path='m1')
+    with open(journal.path, 'a') as f:
+        f.write('{"op": "submit", "pha')
+    assert list(journal.get_unfinished()) == ['1']
+
+
+def test_compact_keeps_only_unfinished_keys(tmp_path):
+    journal = get_journal(tmp_path)
+    journal.intent(CLAIM, '1', name='m1', path='m1')
+    journal.abort(CLAIM, '1')
+    journal.intent(CLAIM, '2', name='m2', path='m2')
+    journal.done(CLAIM, '2')
+    unfinished = journal.get_unfinished()
+    journal.compact()
+    assert [e['key'] for e in journal.read()] == ['2', '2']
+    assert journal.get_unfinished() == unfinished
@@ -0,0 +1,92 @@
+"""
+Path handling of local boxes: every path is resolved under the box's root_dir.
+"""
+import json
+import os
+
+import jsonschema
+import pytest
+
+from core import pipelines
+from core.config import parse_pipeline_config
+from core.errors import ManifestFormatError, PipelineConfigError
+from core.localbox import LocalBox
+from tests.conftest import get_metadata, write_config
+
+
+@pytest.fixture
+def box(tmp_path):
+    root = tmp_path / 'root'
+    (root / 'outbox').mkdir(parents=True)
+    (root / 'outbox' / 'a.txt').write_bytes(b'aaa')
+    (tmp_path / 'secret.txt').write_bytes(b'secret')
+    return LocalBox(system_id='hpc', path='/outbox', root_dir=str(root))
+
+
+def test_paths_are_resolved_under_the_root_dir(box):
+    assert box.get_local_path('/outbox/a.txt') == os.path.join(box.root_dir, 'outbox', 'a.txt')
+    assert box.get_local_path('outbox/a.txt') == os.path.join(box.root_dir, 'outbox', 'a.txt')
+    assert box.get_local_path('outbox/../outbox/a.txt') == os.path.join(box.root_dir, 'outbox', 'a.txt')
+    assert box.get_local_path('/') == box.root_dir
+    assert box.read('/outbox/a.txt') == b'aaa'
+
+
+def test_paths_outside_of_the_root_dir_are_rejected(box):
+    with pytest.raises(ManifestFormatError):
+        box.get_local_path('../secret.txt')
+    with pytest.raises(ManifestFormatError):
+        box.get_local_path('/outbox/../../secret.txt')
+    with pytest.raises(ManifestFormatError):
+        box.read('../../../../../../etc/passwd')
+
+
+def test_symbolic_links_out_of_the_root_dir_are_rejected(box, tmp_path):
+    os.symlink(tmp_path / 'secret.txt', os.path.join(box.root_dir, 'outbox', 'link.txt'))
+    with pytest.raises(ManifestFormatError):
+        box.list_files('/outbox/link.txt')
+
+
+def test_sibling_directory_with_the_same_prefix_is_rejected(box, tmp_path):
+    (tmp_path / 'root2').mkdir()
+    with pytest.raises(ManifestFormatError):
+        box.get_local_path('../root2')
+
+
+def test_local_box_requires_a_root_dir(pipeline_config):
+    pipeline_config['remote_outbox'] = {"kind": "local", "box_definition": {"system_id": "hpc", "path": "/outbox"}}
+    write_config(pipeline_config)
+    with pytest.raises(jsonschema.ValidationError):
+        parse_pipeline_config(os.environ['TAPIS_PIPELINES_CONFIG_FILE_PATH'])
+
+
+def test_box_definition_matches_a_single_kind(pipeline_config):
+    pipeline_config['remote_outbox']['box_definition'].update(client_id='c', endpoint_name='e', directory='d')
+    write_config(pipeline_config)
+    with pytest.raises(jsonschema.ValidationError):
+        parse_pipeline_config(os.environ['TAPIS_PIPELINES_CONFIG_FILE_PATH'])
+
+
+def test_archive_staging_requires_a_local_outbox(tapis, pipeline_config):
+    pipeline_config['pipeline_job']['tapis_app_job']['input_staging'] = 'archive'
+    write_config(pipeline_config)
+    with pytest.raises(PipelineConfigError) as e:
+        pipelines.TapisPipelineClient()
+    assert "requires a remote_outbox of kind 'local'" in e.value.msg
+
+
+def test_manifest_with_a_path_outside_of_the_box_is_rejected(tapis, pipeline_config, box):
+    pipeline_config['remote_outbox'] = {"kind": "local",
+                                        "box_definition": {"system_id": "hpc", "path": "/outbox",
+                                                           "root_dir": box.root_dir}}
+    write_config(pipeline_config)
+    manifest = {"files": [{"file_path": "/outbox/a.txt"}, {"file_path": "../secret.txt"}]}
+    with open(os.path.join(box.root_dir, 'outbox', 'tapis_pipeline_manifest_1'), 'w') as f:
+        json.dump(manifest, f)
+    pipelines.main()
+    assert tapis.jobs.submitted == []
+    metadata = get_metadata(tapis, '1')
+    assert metadata['status'] == 'ERROR'
+    assert 'outside of the root_dir' in metadata['additional_info']['debug_data']
+    # the manifest is not held, so later cycles don't check it again
+    pipelines.main()
+    assert get_metadata(tapis, '1')['status'] == 'ERROR'
@@ -0,0 +1,142 @@
+"""
+Delivery of the outputs of completed jobs to the remote inbox.
+"""
+import hashlib
+import json
+import time
+
+from core import meta, pipelines
+from core.delivery import MAX_INDEX_ENTRIES, OUTPUT_INDEX_FILENAME, OUTPUT_INDEX_LOCK_PREFIX, OUTPUT_MANIFEST_FILENAME
+from core.journal import Journal, TRANSFER
+from tests.conftest import add_manifest, get_metadata, make_polls_due, PIPELINE_NAME
+
+OUTPUTS = {'result.txt': b'RESULT', 'logs/run.log': b'log'}
+
+
+def run_job(tapis, config, status='FINISHED'):
+    """
+    Submit a job for a new manifest, let it reach status with OUTPUTS in its archive and run the cycle that
+    delivers them.
+    :return: the Tapis job.
+    """
+    add_manifest(tapis, '1', {'a.txt': b'aaa'})
+    pipelines.main()
+    tapis_job = tapis.jobs.jobs['job-0']
+    tapis_job.status = status
+    for path, contents in OUTPUTS.items():
+        tapis.files.put('archive', f'{tapis_job.archiveSystemDir}/{path}', contents)
+    make_polls_due(config)
+    pipelines.main()
+    return tapis_job
+
+
+def get_index(tapis):
+    return [json.loads(line) for line in tapis.files.get('inbox', OUTPUT_INDEX_FILENAME).splitlines()]
+
+
+def test_outputs_are_delivered_with_an_output_manifest(tapis, pipeline_config):
+    run_job(tapis, pipeline_config)
+    for path, contents in OUTPUTS.items():
+        assert tapis.files.get('inbox', f'1/{path}') == contents
+    output_manifest = json.loads(tapis.files.get('inbox', f'1/{OUTPUT_MANIFEST_FILENAME}'))
+    assert output_manifest['files']['result.txt']['md5_checksum'] == hashlib.md5(b'RESULT').hexdigest()
+    assert output_manifest['files']['result.txt']['size'] == len(b'RESULT')
+    assert output_manifest['indexed_job_uuids'] == ['job-0']
+    index = get_index(tapis)
+    assert len(index) == 1
+    assert index[0]['remote_id'] == '1'
+    assert sorted(index[0]['copied']) == sorted(OUTPUTS)
+    assert get_metadata(tapis, '1')['status'] == 'Finished data transfer REMOTE'
+
+
+def test_outputs_of_failed_jobs_are_not_delivered(tapis, pipeline_config):
+    run_job(tapis, pipeline_config, status='FAILED')
+    assert tapis.files.get('inbox', f'1/{OUTPUT_MANIFEST_FILENAME}') is None
+    assert get_metadata(tapis, '1')['status'] == 'FAILED'
+
+
+def test_unchanged_outputs_are_not_transferred_again(tapis, pipeline_config):
+    tapis_job = run_job(tapis, pipeline_config)
+    downloads = len(tapis.files.downloads)
+    uploads = len(tapis.files.uploads)
+    t = pipelines.TapisPipelineClient()
+    assert t.copy_completed_job_outputs_to_remote_inbox(pipelines.CompletedJob(remote_id='1', tapis_job=tapis_job))
+    # only the output manifest is read again
+    assert tapis.files.downloads[downloads:] == [f'1/{OUTPUT_MANIFEST_FILENAME}']
+    assert len(tapis.files.uploads) == uploads
+    assert len(get_index(tapis)) == 1
+
+
+def test_full_index_is_rotated(tapis, pipeline_config):
+    full_index = b''.join(b'{"remote_id": "old"}\n' for _ in range(MAX_INDEX_ENTRIES))
+    tapis.files.put('inbox', OUTPUT_INDEX_FILENAME, full_index)
+    run_job(tapis, pipeline_config)
+    segments = [p for s, p in tapis.files.files if s == 'inbox' and p.startswith('tapis_pipeline_output_index.')
+                and p != OUTPUT_INDEX_FILENAME]
+    assert len(segments) == 1
+    assert tapis.files.get('inbox', segments[0]) == full_index
+    assert [entry['remote_id'] for entry in get_index(tapis)] == ['1']
+
+
+def test_failed_delivery_is_retried_by_the_next_run(tapis, pipeline_config, monkeypatch):
+    original = tapis.files.insert
+
+    def insert(systemId, path, file):
+        if path.endswith('result.txt'):
+            raise Exception('inbox unavailable')
+        return original(systemId=systemId, path=path, file=file)
+    monkeypatch.setattr(tapis.files, 'insert', insert)
+    run_job(tapis, pipeline_config)
+    assert get_metadata(tapis, '1')['status'] == 'ERROR'
+    unfinished = Journal(state_dir=pipeline_config['local_state_dir'], pipeline_name=PIPELINE_NAME).get_unfinished()
+    assert [entry['tapis_job_uuid'] for entry in unfinished.values()] == ['job-0']
+    monkeypatch.setattr(tapis.files, 'insert', original)
+    pipelines.main()
+    assert tapis.files.get('inbox', '1/result.txt') == b'RESULT'
+    assert get_metadata(tapis, '1')['status'] == 'Finished data transfer REMOTE'
+    assert [entry['tapis_job_uuid'] for entry in get_index(tapis)] == ['job-0']
+
+
+def test_transfers_of_one_job_for_several_manifests_are_recovered_separately(tapis, pipeline_config):
+    tapis_job = run_job(tapis, pipeline_config)
+    journal = Journal(state_dir=pipeline_config['local_state_dir'], pipeline_name=PIPELINE_NAME)
+    # the outputs of a job are delivered again for another manifest on a result cache hit
+    for remote_id in ['1', '2']:
+        job = pipelines.CompletedJob(remote_id=remote_id, tapis_job=tapis_job)
+        journal.intent(TRANSFER, job.transfer_key, tapis_job_uuid=job.uuid, remote_id=remote_id,
+                       output_dir=job.output_dir, status=job.status, attempt=1)
+    t = pipelines.TapisPipelineClient()
+    recovered = t.recover_from_journal()
+    assert sorted(job.remote_id for job in recovered) == ['1', '2']
+    assert all(job.uuid == 'job-0' for job in recovered)
+
+
+def add_index_lock(tapis, locked_at):
+    tapis.meta.createDocument(db='pipelines', collection=f'testuser.{PIPELINE_NAME}',
+                              request_body={'name': f'{OUTPUT_INDEX_LOCK_PREFIX}inbox:/{OUTPUT_INDEX_FILENAME}',
+                                            'kind': 'lock', 'owner': 'another run', 'locked_at': locked_at})
+
+
+def get_index_locks(tapis):
+    return [d for d in tapis.meta.get_collection(f'testuser.{PIPELINE_NAME}') if d.get('kind') == 'lock']
+
+
+def test_index_held_by_another_run_is_not_updated(tapis, pipeline_config, monkeypatch):
+    monkeypatch.setattr(meta.time, 'sleep', lambda seconds: None)
+    add_index_lock(tapis, locked_at=time.time())
+    run_job(tapis, pipeline_config)
+    assert tapis.files.get('inbox', OUTPUT_INDEX_FILENAME) is None
+    assert get_metadata(tapis, '1')['status'] == 'ERROR'
+    # the other run releases the index
+    tapis.meta.deleteDocument(db='pipelines', collection=f'testuser.{PIPELINE_NAME}',
+                              docId=get_index_locks(tapis)[0]['_id']['$oid'])
+    pipelines.main()
+    assert [entry['tapis_job_uuid'] for entry in get_index(tapis)] == ['job-0']
+    assert get_index_locks(tapis) == []
+
+
+def test_stale_index_lock_is_taken_over(tapis, pipeline_config):
+    add_index_lock(tapis, locked_at=0)
+    run_job(tapis, pipeline_config)
+    assert [entry['tapis_job_uuid'] for entry in get_index(tapis)] == ['job-0']
+    assert get_index_locks(tapis) == []
@@ -0,0 +1,30 @@
+from core.polling import get_poll_interval, get_stuck_deadline_minutes, DEFAULT_MAX_QUEUE_MINUTES, \
+    MAX_POLL_SECONDS, MAX_TRANSIENT_STATE_MINUTES, QUEUED_BASE_POLL_SECONDS, RUNNING_GRACE_MINUTES, \
+    RUNNING_MAX_POLL_SECONDS, RUNNING_MIN_POLL_SECONDS, TRANSIENT_STATE_POLL_SECONDS
+
+
+def test_queued_jobs_back_off_exponentially():
+    intervals = [get_poll_interval('QUEUED', polls) for polls in range(1, 6)]
+    assert intervals[:3] == [QUEUED_BASE_POLL_SECONDS, 2 * QUEUED_BASE_POLL_SECONDS, 4 * QUEUED_BASE_POLL_SECONDS]
+    assert intervals == sorted(intervals)
+    assert get_poll_interval('QUEUED', 100) == MAX_POLL_SECONDS
+
+
+def test_running_jobs_are_polled_at_a_fraction_of_max_minutes():
+    assert get_poll_interval('RUNNING', 1, max_minutes=20) == 20 * 60 // 4
+    assert get_poll_interval('RUNNING', 1, max_minutes=1) == RUNNING_MIN_POLL_SECONDS
+    assert get_poll_interval('RUNNING', 1, max_minutes=24 * 60) == RUNNING_MAX_POLL_SECONDS
+    assert get_poll_interval('RUNNING', 1) == RUNNING_MAX_POLL_SECONDS
+
+
+def test_transient_and_unknown_states():
+    assert get_poll_interval('STAGING_INPUTS', 5) == TRANSIENT_STATE_POLL_SECONDS
+    assert get_poll_interval('SOME_NEW_STATE', 1) == QUEUED_BASE_POLL_SECONDS
+
+
+def test_stuck_deadlines():
+    assert get_stuck_deadline_minutes('QUEUED') == DEFAULT_MAX_QUEUE_MINUTES
+    assert get_stuck_deadline_minutes('QUEUED', max_queue_minutes=30) == 30
+    assert get_stuck_deadline_minutes('RUNNING', max_minutes=60) == 60 + RUNNING_GRACE_MINUTES
+    assert get_stuck_deadline_minutes('RUNNING') == MAX_TRANSIENT_STATE_MINUTES
+    assert get_stuck_deadline_minutes('STAGING_INPUTS') == MAX_TRANSIENT_STATE_MINUTES
@@ -0,0 +1,78 @@
+"""
+Runs of the pipeline interrupted at each step of a manifest's life-cycle, recovered by the next run from the journal.
+"""
+import pytest
+
+from core import pipelines
+from core.journal import Journal, SUBMIT
+from core.meta import MetadataHelper
+from tests.conftest import add_manifest, get_metadata, PIPELINE_NAME
+
+
+def crash_on(monkeypatch, cls, name, should_crash):
+    """
+    Make cls.name raise KeyboardInterrupt, once, the first time should_crash(*args, **kwargs) is True.
+    """
+    original = getattr(cls, name)
+    crashed = []
+
+    def wrapper(self, *args, **kwargs):
+        if not crashed and should_crash(*args, **kwargs):
+            crashed.append(True)
+            raise KeyboardInterrupt()
+        return original(self, *args, **kwargs)
+    monkeypatch.setattr(cls, name, wrapper)
+
+
+def get_unfinished(config):
+    return Journal(state_dir=config['local_state_dir'], pipeline_name=PIPELINE_NAME).get_unfinished()
+
+
+def test_cycle_submits_new_manifest(tapis, pipeline_config):
+    add_manifest(tapis, '1', {'a.txt': b'aaa'})
+    pipelines.main()
+    assert len(tapis.jobs.submitted) == 1
+    assert get_metadata(tapis, '1')['status'] == 'JOB_SUBMITTED_TO_TAPIS'
+    pipelines.main()
+    assert len(tapis.jobs.submitted) == 1
+    assert get_unfinished(pipeline_config) == {}
+
+
+def test_claimed_manifest_is_submitted_by_the_next_run(tapis, pipeline_config, monkeypatch):
+    add_manifest(tapis, '1', {'a.txt': b'aaa'})
+    crash_on(monkeypatch, pipelines.TapisPipelineClient, 'validate_manifest', lambda manifest_file: True)
+    with pytest.raises(KeyboardInterrupt):
+        pipelines.main()
+    assert tapis.jobs.submitted == []
+    pipelines.main()
+    assert len(tapis.jobs.submitted) == 1
+    assert get_metadata(tapis, '1')['status'] == 'JOB_SUBMITTED_TO_TAPIS'
+    assert get_unfinished(pipeline_config) == {}
+
+
+def test_submitted_job_is_recorded_and_not_submitted_again(tapis, pipeline_config, monkeypatch):
+    add_manifest(tapis, '1', {'a.txt': b'aaa'})
+    crash_on(monkeypatch, Journal, 'done', lambda op, key, **data: op == SUBMIT)
+    with pytest.raises(KeyboardInterrupt):
+        pipelines.main()
+    assert len(tapis.jobs.submitted) == 1
+    assert get_metadata(tapis, '1')['status'] != 'JOB_SUBMITTED_TO_TAPIS'
+    pipelines.main()
+    assert len(tapis.jobs.submitted) == 1
+    metadata = get_metadata(tapis, '1')
+    assert metadata['status'] == 'JOB_SUBMITTED_TO_TAPIS'
+    assert metadata['additional_info']['tapis_job_uuid'] == 'job-0'
+    assert metadata['additional_info']['recovered']
+    assert get_unfinished(pipeline_config) == {}
+
+
+def test_interrupted_status_update_is_reapplied(tapis, pipeline_config, monkeypatch):
+    add_manifest(tapis, '1', {'a.txt': b'aaa'})
+    crash_on(monkeypatch, MetadataHelper, 'update', lambda statuskey, **kwargs: statuskey == 'JOB_SUBMITTED_TO_TAPIS')
+    with pytest.raises(KeyboardInterrupt):
+        pipelines.main()
+    assert get_metadata(tapis, '1')['status'] == 'METADATA_CREATED'
+    pipelines.main()
+    assert len(tapis.jobs.submitted) == 1
+    assert get_metadata(tapis, '1')['status'] == 'JOB_SUBMITTED_TO_TAPIS'
+    assert get_unfinished(pipeline_config) == {}
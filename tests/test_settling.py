@@ -0,0 +1,34 @@
+from core.config import Config
+from core.settling import get_observation, is_settled
+
+# 2020-01-01T00:00:00+00:00
+LAST_MODIFIED = 1577836800.0
+
+
+def test_observation_is_size_and_last_modified():
+    listing = Config(size=3, lastModified='2020-01-01T00:00:00Z')
+    assert get_observation(listing) == [3, '2020-01-01T00:00:00Z']
+
+
+def test_settling_disabled():
+    assert is_settled([3, '2020-01-01T00:00:00Z'], None, None, LAST_MODIFIED, settle_seconds=0)
+
+
+def test_input_not_modified_for_settle_seconds_is_settled():
+    assert is_settled([3, '2020-01-01T00:00:00Z'], None, None, LAST_MODIFIED + 60, settle_seconds=60)
+
+
+def test_recently_modified_input_is_not_settled():
+    assert not is_settled([3, '2020-01-01T00:00:00Z'], None, None, LAST_MODIFIED + 10, settle_seconds=60)
+
+
+def test_input_observed_unchanged_for_settle_seconds_is_settled():
+    # without a usable lastModified, the input must be observed unchanged across cycles
+    observation = [3, 'unknown']
+    assert not is_settled(observation, None, None, 1000, settle_seconds=60)
+    assert not is_settled(observation, observation, 1000, 1030, settle_seconds=60)
+    assert is_settled(observation, observation, 1000, 1060, settle_seconds=60)
+
+
+def test_input_that_changed_is_not_settled():
+    assert not is_settled([4, 'unknown'], [3, 'unknown'], 1000, 2000, settle_seconds=60)
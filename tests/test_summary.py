@@ -0,0 +1,108 @@
+import json
+import math
+import os
+
+import pytest
+
+from core.summary import PipelineSummary, get_aggregation_name, AGGREGATIONS, STATUS_COUNTS_AGGREGATION, \
+    TRANSITION_DURATIONS_AGGREGATION, TRANSITION_DURATIONS_STAGES
+
+
+class Response(object):
+    def __init__(self, status_code):
+        self.status_code = status_code
+        self.content = b''
+
+
+class MetaError(Exception):
+    def __init__(self, status_code):
+        super().__init__(f'{status_code}')
+        self.response = Response(status_code)
+
+
+class AggregationMeta(object):
+    """
+    Meta API returning canned results for the aggregations registered on it; using an unregistered aggregation
+    fails with error_status.
+    """
+
+    def __init__(self, results, error_status=404):
+        self.results = results
+        self.error_status = error_status
+        self.registered = {}
+
+    def useAggregation(self, db, collection, aggregation):
+        if aggregation not in self.registered:
+            raise MetaError(self.error_status)
+        return json.dumps(self.results[self.registered[aggregation]]).encode('utf-8')
+
+    def addAggregation(self, db, collection, aggregation, request_body):
+        assert request_body['uri'] == aggregation
+        name = [n for n, stages in AGGREGATIONS.items() if stages == request_body['stages']][0]
+        self.registered[aggregation] = name
+
+
+class Client(object):
+    def __init__(self, meta):
+        self.meta = meta
+
+
+RESULTS = {
+    STATUS_COUNTS_AGGREGATION: [{'_id': 'COMPLETED', 'count': 3, 'oldest_update': None}],
+    TRANSITION_DURATIONS_AGGREGATION: [{'_id': {'from': 'SUBMITTED', 'to': 'COMPLETED'}, 'count': 3,
+                                        'p50_seconds': 20.0, 'p95_seconds': 30.0}],
+}
+
+
+def evaluate(expression, document):
+    """
+    Evaluate the subset of MongoDB expressions used to select the percentiles.
+    """
+    if isinstance(expression, str) and expression.startswith('$'):
+        return document[expression[1:]]
+    if not isinstance(expression, dict):
+        return expression
+    (operator, args), = expression.items()
+    if operator == '$ceil':
+        return math.ceil(evaluate(args, document))
+    values = [evaluate(a, document) for a in args]
+    return {'$max': lambda: max(values),
+            '$subtract': lambda: values[0] - values[1],
+            '$multiply': lambda: values[0] * values[1],
+            '$arrayElemAt': lambda: values[0][values[1]]}[operator]()
+
+
+def test_aggregations_are_registered_under_a_hash_of_their_stages_on_404(tmp_path):
+    meta = AggregationMeta(RESULTS)
+    summary = PipelineSummary(tapis_client=Client(meta), db='db', collection='c', state_dir=str(tmp_path)).get()
+    assert set(meta.registered) == {get_aggregation_name(name) for name in AGGREGATIONS}
+    assert all(uri != name for uri, name in meta.registered.items())
+    assert summary['statuses'] == {'COMPLETED': {'count': 3, 'oldest_age_seconds': None}}
+    assert summary['transitions'] == [{'from': 'SUBMITTED', 'to': 'COMPLETED', 'count': 3,
+                                       'p50_seconds': 20.0, 'p95_seconds': 30.0}]
+
+
+def test_other_errors_are_raised_without_registering(tmp_path):
+    meta = AggregationMeta(RESULTS, error_status=500)
+    with pytest.raises(MetaError):
+        PipelineSummary(tapis_client=Client(meta), db='db', collection='c', state_dir=str(tmp_path)).get()
+    assert meta.registered == {}
+
+
+def test_summary_is_cached_in_the_state_dir(tmp_path):
+    meta = AggregationMeta(RESULTS)
+    summary = PipelineSummary(tapis_client=Client(meta), db='db', collection='c', state_dir=str(tmp_path))
+    first = summary.get()
+    assert os.path.dirname(summary.cache_path) == str(tmp_path)
+    meta.registered = {}
+    meta.error_status = 500
+    assert summary.get() == first
+
+
+def test_percentiles_use_the_nearest_rank():
+    project = TRANSITION_DURATIONS_STAGES[-1]['$project']
+    record = {'durations': [float(s) for s in range(1, 21)], 'count': 20}
+    assert evaluate(project['p50_seconds'], record) == 10.0
+    assert evaluate(project['p95_seconds'], record) == 19.0
+    assert evaluate(project['p95_seconds'], {'durations': [7.0], 'count': 1}) == 7.0
+    assert 'durations' not in project
@@ -0,0 +1,164 @@
+import io
+import json
+
+import pytest
+
+requests = pytest.importorskip('requests')
+from core.tapis_client import MultipartBody, Operation, TapisClient, TapisClientError, parse_operations  # noqa: E402
+
+SPEC = {"paths": {
+    "/v3/meta/{db}/{collection}": {
+        "get": {"operationId": "listDocuments",
+                "parameters": [{"name": "db", "in": "path", "required": True},
+                               {"name": "collection", "in": "path", "required": True},
+                               {"name": "filter", "in": "query"},
+                               {"name": "pagesize", "in": "query"}]},
+        "post": {"operationId": "createDocument",
+                 "parameters": [{"name": "db", "in": "path", "required": True},
+                                {"name": "collection", "in": "path", "required": True}],
+                 "requestBody": {"content": {"application/json": {"schema": {"type": "object"}}}}}},
+    "/jobs/submit": {
+        "post": {"operationId": "submitJob",
+                 "parameters": [],
+                 "requestBody": {"content": {"application/json": {"schema": {
+                     "properties": {"name": {}, "appId": {}, "appVersion": {}},
+                     "required": ["name", "appId"]}}}}}},
+    "/v3/files/ops/{systemId}/{path}": {
+        "post": {"operationId": "insert",
+                 "parameters": [{"name": "systemId", "in": "path", "required": True},
+                                {"name": "path", "in": "path", "required": True}],
+                 "requestBody": {"content": {"multipart/form-data": {"schema": {
+                     "properties": {"file": {}}, "required": ["file"]}}}}}},
+}}
+
+
+class RecordingClient(object):
+    base_url = 'https://tapis.example.org'
+
+    def __init__(self):
+        self.requests = []
+
+    def request(self, method, url, **kwargs):
+        self.requests.append(dict(kwargs, method=method, url=url))
+
+
+def call(operation_id, **kwargs):
+    client = RecordingClient()
+    operations = parse_operations(SPEC)
+    Operation('test', operation_id, operations[operation_id], client)(**kwargs)
+    return client.requests[0]
+
+
+def test_path_and_query_parameters():
+    request = call('listDocuments', db='pipelines', collection='user.p', filter='{"status": "FAILED"}')
+    assert request['method'] == 'GET'
+    assert request['url'] == 'https://tapis.example.org/v3/meta/pipelines/user.p'
+    assert request['params'] == {'filter': '{"status": "FAILED"}'}
+
+
+def test_missing_path_parameter_is_rejected():
+    with pytest.raises(TapisClientError):
+        call('listDocuments', db='pipelines')
+
+
+def test_json_body_by_property_or_request_body():
+    request = call('submitJob', name='job', appId='app', maxMinutes=10)
+    assert request['url'] == 'https://tapis.example.org/v3/jobs/submit'
+    assert json.loads(request['data']) == {'name': 'job', 'appId': 'app'}
+    assert request['headers'] == {'Content-Type': 'application/json'}
+    request = call('createDocument', db='pipelines', collection='c', request_body={'name': '1'})
+    assert json.loads(request['data']) == {'name': '1'}
+    with pytest.raises(TapisClientError):
+        call('submitJob', name='job')
+
+
+def test_multipart_body_is_streamed_from_the_file():
+    request = call('insert', systemId='inbox', path='1/out.txt', file=io.BytesIO(b'x' * 10))
+    body = request['data']
+    assert isinstance(body, MultipartBody)
+    assert request['headers']['Content-Type'] == body.content_type
+    contents = body.read(4) + body.read()
+    assert len(contents) == len(body)
+    assert f'--{body.boundary}\r\nContent-Disposition: form-data; name="file"'.encode('utf-8') in contents
+    assert b'\r\n\r\n' + b'x' * 10 + b'\r\n' in contents
+    assert contents.endswith(f'--{body.boundary}--\r\n'.encode('utf-8'))
+    body.rewind()
+    assert b''.join(body) == contents
+
+
+def make_response(status_code, content, content_type='application/json'):
+    response = requests.Response()
+    response.status_code = status_code
+    response._content = content
+    response._content_consumed = True
+    response.headers['content-type'] = content_type
+    return response
+
+
+class FakeSession(object):
+    """
+    Returns the queued responses in order, recording the token and body of each request.
+    """
+
+    def __init__(self, *responses):
+        self.responses = list(responses)
+        self.sent = []
+
+    def send(self, request, stream=False):
+        body = request.body
+        if hasattr(body, 'read'):
+            body = body.read()
+        self.sent.append((request.url, request.headers.get('X-Tapis-Token'), body))
+        return self.responses.pop(0)
+
+
+def get_client(tmp_path, *responses, password=None):
+    client = TapisClient(base_url='https://tapis.example.org/', username='testuser', state_dir=str(tmp_path),
+                         access_token='old-token', password=password)
+    client.requests_session = FakeSession(*responses)
+    return client
+
+
+def test_response_mapping(tmp_path):
+    client = get_client(tmp_path,
+                        make_response(200, b'{"result": {"uuid": "job-0", "nested": {"status": "PENDING"}}}'),
+                        make_response(200, b'[{"name": "1"}]'),
+                        make_response(200, b'contents', content_type='application/octet-stream'),
+                        make_response(200, b'{"status": "success", "result": []}'),
+                        make_response(404, b'{"message": "not found"}'))
+    result = client.request('GET', 'https://tapis.example.org/v3/jobs/job-0')
+    assert result.uuid == 'job-0' and result.nested.status == 'PENDING'
+    assert client.request('GET', 'https://tapis.example.org/v3/meta/db/c') == b'[{"name": "1"}]'
+    assert client.request('GET', 'https://tapis.example.org/v3/files/content/s/f') == b'contents'
+    assert client.request('GET', 'https://tapis.example.org/v3/files/ops/s/') == []
+    with pytest.raises(TapisClientError) as e:
+        client.request('GET', 'https://tapis.example.org/v3/jobs/missing')
+    assert e.value.response.status_code == 404
+    assert 'not found' in e.value.message
+    assert all(token == 'old-token' for url, token, body in client.requests_session.sent)
+
+
+def test_expired_token_is_refreshed_once(tmp_path):
+    body = MultipartBody({'file': io.BytesIO(b'data')})
+    expected = body.read()
+    body.rewind()
+    client = get_client(tmp_path,
+                        make_response(401, b'{"message": "expired"}'),
+                        make_response(200, b'{"result": {"access_token": {"access_token": "new-token"}}}'),
+                        make_response(200, b'{"result": {"name": "out.txt"}}'),
+                        password='secret')
+    result = client.request('POST', 'https://tapis.example.org/v3/files/ops/s/out.txt', data=body)
+    assert result.name == 'out.txt'
+    sent = client.requests_session.sent
+    assert [url for url, token, body in sent] == ['https://tapis.example.org/v3/files/ops/s/out.txt',
+                                                  'https://tapis.example.org/v3/oauth2/tokens',
+                                                  'https://tapis.example.org/v3/files/ops/s/out.txt']
+    assert sent[0][2] == sent[2][2] == expected
+    assert sent[2][1] == 'new-token'
+
+
+def test_401_without_a_password_is_raised(tmp_path):
+    client = get_client(tmp_path, make_response(401, b'{"message": "expired"}'))
+    with pytest.raises(TapisClientError) as e:
+        client.request('GET', 'https://tapis.example.org/v3/jobs/job-0')
+    assert e.value.response.status_code == 401